@@ -14,11 +14,13 @@ This is the single entry point that orchestrates all Flatpack tools.
 import subprocess
 import sys
 import os
-import argparse
-import json
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import shutil
+import threading
+import time
+
+from flatpack_startup import StartupTimer
 
 # Colors for output
 class Colors:
@@ -32,10 +34,78 @@ class Colors:
     GRAY = '\033[0;37m'
     NC = '\033[0m'  # No Color
 
+class PrefixedOutput:
+    """Stdout proxy that prefixes each line with the writing thread's phase name
+    
+    Used while update phases run concurrently so their interleaved progress
+    stays attributable. Output of child processes that inherit the terminal
+    is not prefixed.
+    """
+    
+    def __init__(self):
+        self.stream = sys.stdout
+        self.lock = threading.Lock()
+        self.local = threading.local()
+    
+    def __enter__(self):
+        sys.stdout = self
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.flush()
+        sys.stdout = self.stream
+    
+    def write(self, text: str) -> int:
+        prefix = getattr(self.local, 'prefix', '')
+        pending = getattr(self.local, 'pending', '') + text
+        *lines, self.local.pending = pending.split('\n')
+        if lines:
+            with self.lock:
+                for line in lines:
+                    self.stream.write(f"{prefix}{line}\n")
+                self.stream.flush()
+        return len(text)
+    
+    def flush(self):
+        pending = getattr(self.local, 'pending', '')
+        if pending:
+            self.local.pending = ''
+            with self.lock:
+                self.stream.write(f"{getattr(self.local, 'prefix', '')}{pending}\n")
+        self.stream.flush()
+    
+    def run(self, prefix: str, step) -> Tuple[bool, float]:
+        """Run a phase with its output prefixed; returns (success, seconds)"""
+        self.local.prefix = prefix
+        start_time = time.time()
+        try:
+            success = step()
+        except Exception as e:
+            print(f"{Colors.RED}[ERROR]{Colors.NC} {e}")
+            success = False
+        finally:
+            self.flush()
+        return success, time.time() - start_time
+
 class FlatpackManager:
+    # Python tools are imported and run in this process instead of re-exec'ing python3
+    PYTHON_TOOLS = {
+        'updater': 'flatpack',
+        'pkgmgr': 'package_manager_integration',
+    }
+    
     def __init__(self):
         self.script_dir = Path(__file__).parent
         self.tools = self.check_tool_availability()
+        self._session = None
+    
+    @property
+    def session(self):
+        """API session sharing config, logger and inventory across all steps"""
+        if self._session is None:
+            from flatpack_api import FlatpackSession
+            self._session = FlatpackSession()
+        return self._session
         
     def run_command(self, cmd: List[str], capture_output: bool = False) -> subprocess.CompletedProcess:
         """Run a command and return the result"""
@@ -52,6 +122,30 @@ class FlatpackManager:
             print(f"{Colors.RED}[ERROR]{Colors.NC} Failed to run command {' '.join(cmd)}: {e}")
             return subprocess.CompletedProcess(cmd, 1, "", str(e))
     
+    def dispatch(self, tool: str, args: List[str]) -> int:
+        """Run a Python tool's main() in-process and return its exit code
+        
+        The tool's --timing startup phase starts here, not at the start of
+        this process.
+        """
+        import importlib
+        
+        started = time.perf_counter()
+        module = importlib.import_module(self.PYTHON_TOOLS[tool])
+        try:
+            module.main(args, started)
+        except SystemExit as e:
+            if e.code is None:
+                return 0
+            if isinstance(e.code, int):
+                return e.code
+            print(e.code)
+            return 1
+        except Exception as e:
+            print(f"{Colors.RED}[ERROR]{Colors.NC} {tool} failed: {e}")
+            return 1
+        return 0
+    
     def check_tool_availability(self) -> Dict[str, bool]:
         """Check which Flatpack tools are available"""
         tools = {}
@@ -109,31 +203,39 @@ class FlatpackManager:
         
         success = True
         
-        # Step 1: Install native packages
-        if self.tools['pkgmgr']:
-            print(f"{Colors.BLUE}[STEP 1/3]{Colors.NC} Installing native packages...")
-            result = self.run_command(['python3', 'package_manager_integration.py', '--install-all'])
-            if result.returncode != 0:
-                print(f"{Colors.RED}[FAILED]{Colors.NC} Native package installation failed")
+        # Native packages download in the background while Flatpak apps
+        # install; the native install then only unpacks from the cache
+        native_available = bool(self.tools['pkgmgr'])
+        if native_available:
+            print(f"{Colors.BLUE}[PREFETCH]{Colors.NC} Refreshing the package database...")
+            self.session.native.update_database()
+            print(f"{Colors.BLUE}[PREFETCH]{Colors.NC} Downloading native packages in the background")
+            self.session.native.start_prefetch()
+            print()
+        
+        # Step 1: Install Flatpak apps
+        if shutil.which('flatpak'):
+            print(f"{Colors.BLUE}[STEP 1/3]{Colors.NC} Installing Flatpak applications...")
+            if not self.session.installer.install().success:
+                print(f"{Colors.RED}[FAILED]{Colors.NC} Flatpak installation failed")
                 success = False
             else:
-                print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Native packages installed")
+                print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Flatpak applications installed")
             print()
         else:
-            print(f"{Colors.YELLOW}[SKIP]{Colors.NC} Package manager integration not available")
+            print(f"{Colors.YELLOW}[SKIP]{Colors.NC} Flatpak is not installed")
         
-        # Step 2: Install Flatpak apps
-        if self.tools['installer']:
-            print(f"{Colors.BLUE}[STEP 2/3]{Colors.NC} Installing Flatpak applications...")
-            result = self.run_command(['bash', 'install_flatpaks.sh'])
-            if result.returncode != 0:
-                print(f"{Colors.RED}[FAILED]{Colors.NC} Flatpak installation failed")
+        # Step 2: Install native packages from the prefetched cache
+        if native_available:
+            print(f"{Colors.BLUE}[STEP 2/3]{Colors.NC} Installing native packages...")
+            if not self.session.native.install_categories(update_database=False).success:
+                print(f"{Colors.RED}[FAILED]{Colors.NC} Native package installation failed")
                 success = False
             else:
-                print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Flatpak applications installed")
+                print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Native packages installed")
             print()
         else:
-            print(f"{Colors.YELLOW}[SKIP]{Colors.NC} Flatpak installer not available")
+            print(f"{Colors.YELLOW}[SKIP]{Colors.NC} Package manager integration not available")
         
         # Step 3: Install update manager system-wide
         if self.tools['update_installer']:
@@ -158,38 +260,98 @@ class FlatpackManager:
         
         return True
     
-    def update_system(self):
-        """Update both native packages and Flatpak apps"""
+    def preflight_health_check(self) -> bool:
+        """Gate an operation on SystemHealthMonitor; returns True if safe to proceed"""
+        from flatpack_health import SystemHealthMonitor
+        
+        monitor = SystemHealthMonitor(self.session.config)
+        health_status = monitor.check_health_status(monitor.get_current_metrics())
+        
+        for warning in health_status['warnings']:
+            print(f"{Colors.YELLOW}[HEALTH]{Colors.NC} {warning}")
+        
+        if health_status['safe_to_proceed']:
+            print(f"{Colors.GREEN}[HEALTH]{Colors.NC} System health: {health_status['status']}")
+            print()
+            return True
+        
+        for issue in health_status['issues']:
+            print(f"{Colors.RED}[HEALTH]{Colors.NC} {issue}")
+        for recommendation in monitor.recommend_action(health_status)[:5]:
+            print(f"  • {recommendation}")
+        print(f"{Colors.RED}[ABORTED]{Colors.NC} Pre-flight health check failed (use --force to override)")
+        return False
+    
+    def update_native(self) -> bool:
+        """Native package phase of a system update"""
+        print(f"{Colors.BLUE}[NATIVE]{Colors.NC} Updating native package database...")
+        if self.session.native.update_database().success:
+            print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Native package database updated")
+            return True
+        print(f"{Colors.YELLOW}[WARNING]{Colors.NC} Native package update failed")
+        return False
+    
+    def update_flatpak(self) -> bool:
+        """Flatpak phase of a system update"""
+        print(f"{Colors.BLUE}[FLATPAK]{Colors.NC} Updating Flatpak applications...")
+        if self.session.updater.smart_update().success:
+            print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Flatpak applications updated")
+            return True
+        print(f"{Colors.RED}[FAILED]{Colors.NC} Flatpak update failed")
+        return False
+    
+    def update_system(self, concurrent: Optional[bool] = None, force: bool = False):
+        """Update both native packages and Flatpak apps
+        
+        With concurrent=True the native and Flatpak phases run in parallel,
+        as they touch different package stores; each API step still holds
+        its own store lock.
+        """
         self.show_banner()
         print(f"{Colors.MAGENTA}[UPDATE]{Colors.NC} Updating complete system...")
         print()
         
-        success = True
+        if not force and not self.preflight_health_check():
+            return False
         
-        # Update native packages
-        if self.tools['pkgmgr']:
-            print(f"{Colors.BLUE}[NATIVE]{Colors.NC} Updating native package database...")
-            result = self.run_command(['python3', 'package_manager_integration.py', '--update'])
-            if result.returncode == 0:
-                print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Native package database updated")
-            else:
-                print(f"{Colors.YELLOW}[WARNING]{Colors.NC} Native package update failed")
-                success = False
-            print()
+        if concurrent is None:
+            concurrent = self.session.config.get('performance.concurrent_update_phases', False)
         
-        # Update Flatpak apps
+        phases = {}
+        if self.tools['pkgmgr']:
+            phases['native'] = self.update_native
         if self.tools['updater']:
-            print(f"{Colors.BLUE}[FLATPAK]{Colors.NC} Updating Flatpak applications...")
-            result = self.run_command(['python3', 'flatpack.py', '--smart-update'])
-            if result.returncode == 0:
-                print(f"{Colors.GREEN}[SUCCESS]{Colors.NC} Flatpak applications updated")
-            else:
-                print(f"{Colors.RED}[FAILED]{Colors.NC} Flatpak update failed")
-                success = False
-            print()
+            phases['flatpak'] = self.update_flatpak
         else:
             print(f"{Colors.YELLOW}[SKIP]{Colors.NC} Flatpak update manager not available")
         
+        start_time = time.time()
+        results = {}
+        
+        if concurrent and len(phases) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            
+            print(f"{Colors.CYAN}[INFO]{Colors.NC} Running {', '.join(phases)} phases concurrently")
+            print()
+            with PrefixedOutput() as output, ThreadPoolExecutor(max_workers=len(phases)) as executor:
+                futures = {
+                    name: executor.submit(output.run, f"{Colors.GRAY}[{name}]{Colors.NC} ", phase)
+                    for name, phase in phases.items()
+                }
+                results = {name: future.result() for name, future in futures.items()}
+            print()
+        else:
+            for name, phase in phases.items():
+                phase_start = time.time()
+                results[name] = (phase(), time.time() - phase_start)
+                print()
+        
+        total_duration = time.time() - start_time
+        success = all(phase_success for phase_success, _ in results.values())
+        
+        timings = ', '.join(f"{name} {duration:.1f}s" for name, (_, duration) in results.items())
+        print(f"{Colors.CYAN}[TIMING]{Colors.NC} {timings} | total wall time {total_duration:.1f}s")
+        
         if success:
             print(f"{Colors.GREEN}[COMPLETE]{Colors.NC} System update completed successfully!")
         else:
@@ -204,11 +366,9 @@ class FlatpackManager:
             
         tool_commands = {
             'installer': ['bash', 'install_flatpaks.sh'] + args,
-            'updater': ['python3', 'flatpack.py'] + args,
-            'pkgmgr': ['python3', 'package_manager_integration.py'] + args,
         }
         
-        if tool not in tool_commands:
+        if tool not in tool_commands and tool not in self.PYTHON_TOOLS:
             print(f"{Colors.RED}[ERROR]{Colors.NC} Unknown tool: {tool}")
             return False
             
@@ -216,6 +376,9 @@ class FlatpackManager:
             print(f"{Colors.RED}[ERROR]{Colors.NC} Tool not available: {tool}")
             return False
         
+        if tool in self.PYTHON_TOOLS:
+            return self.dispatch(tool, args) == 0
+        
         result = self.run_command(tool_commands[tool])
         return result.returncode == 0
     
@@ -250,19 +413,19 @@ class FlatpackManager:
             return self.update_system()
         elif choice == "3":
             if self.tools['pkgmgr']:
-                return self.run_tool('pkgmgr', ['--install-all'])
+                return self.session.native.install_categories().success
             else:
                 print(f"{Colors.RED}[ERROR]{Colors.NC} Package manager integration not available")
                 return False
         elif choice == "4":
-            if self.tools['installer']:
-                return self.run_tool('installer')
+            if shutil.which('flatpak'):
+                return self.session.installer.install().success
             else:
-                print(f"{Colors.RED}[ERROR]{Colors.NC} Flatpak installer not available")
+                print(f"{Colors.RED}[ERROR]{Colors.NC} Flatpak is not installed")
                 return False
         elif choice == "5":
             if self.tools['updater']:
-                return self.run_tool('updater', ['--smart-update'])
+                return self.session.updater.smart_update().success
             else:
                 print(f"{Colors.RED}[ERROR]{Colors.NC} Update manager not available")
                 return False
@@ -314,7 +477,11 @@ class FlatpackManager:
                 print(f"  Features: {', '.join(info['features'])}")
                 print()
 
-def main():
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    
+    timer = StartupTimer('flatpack-manager')
+    
     parser = argparse.ArgumentParser(
         description="Flatpack Manager - Unified Linux Application Management",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -323,6 +490,7 @@ Examples:
   %(prog)s                           Launch interactive mode
   %(prog)s --setup                   Run complete system setup
   %(prog)s --update                  Update everything  
+  %(prog)s --update --concurrent     Update native packages and Flatpak apps in parallel
   %(prog)s --status                  Show system status
   %(prog)s --install-native          Install native packages only
   %(prog)s --install-flatpak         Install Flatpak apps only
@@ -372,14 +540,42 @@ Examples:
         help='Force interactive mode (default when no args)'
     )
     
+    parser.add_argument(
+        '--concurrent',
+        action='store_true',
+        help='With --update: run the native and Flatpak phases in parallel'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='With --update: skip the pre-flight system health check'
+    )
+    
+    parser.add_argument(
+        '--timing',
+        action='store_true',
+        help='Report startup and per-phase timing on stderr'
+    )
+    
     parser.add_argument(
         '--version', '-v',
         action='version',
         version='Flatpack Manager 2.0.0'
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    timer.mark('argument parsing')
     
+    try:
+        run(args)
+    finally:
+        if args.timing:
+            timer.mark('command')
+            timer.report(argv)
+
+def run(args):
+    """Run the command selected on the command line"""
     # Initialize manager
     manager = FlatpackManager()
     
@@ -388,19 +584,19 @@ Examples:
         success = manager.setup_complete_system()
         sys.exit(0 if success else 1)
     elif args.update:
-        success = manager.update_system() 
+        success = manager.update_system(concurrent=args.concurrent or None, force=args.force)
         sys.exit(0 if success else 1)
     elif args.status:
         manager.show_banner()
         manager.show_status()
     elif args.install_native:
-        success = manager.run_tool('pkgmgr', ['--install-all'])
+        success = manager.session.native.install_categories().success
         sys.exit(0 if success else 1)
     elif args.install_flatpak:
-        success = manager.run_tool('installer')
+        success = manager.session.installer.install().success
         sys.exit(0 if success else 1)
     elif args.update_flatpak:
-        success = manager.run_tool('updater', ['--smart-update'])
+        success = manager.session.updater.smart_update().success
         sys.exit(0 if success else 1)
     else:
         # Interactive mode (default)
@@ -10,10 +10,10 @@ A comprehensive tool for managing Flatpak application updates with features for:
 """
 
 import subprocess
-import argparse
 import sys
 from typing import List, Dict, Optional
-from datetime import datetime
+
+from flatpack_startup import StartupTimer
 
 
 def run_command(cmd: List[str], suppress_stderr: bool = False) -> subprocess.CompletedProcess:
@@ -47,30 +47,64 @@ def check_flatpak_available() -> bool:
 
 
 def list_installed_apps() -> List[Dict[str, str]]:
-    """List all installed Flatpak applications"""
-    cmd = ["flatpak", "list", "--app", "--columns=application,name,version,branch"]
-    result = run_command(cmd)
+    """List all installed Flatpak applications (through the query backend)"""
+    from flatpack_backend import get_backend, FlatpakBackendError
     
-    if result.returncode != 0:
-        print(f"Error listing installed apps: {result.stderr}")
+    try:
+        return get_backend().list_installed()
+    except FlatpakBackendError as e:
+        print(f"Error listing installed apps: {e}")
         return []
+
+
+def check_for_updates(method: Optional[str] = None, refresh: bool = False) -> List[str]:
+    """Check which apps have updates available
     
-    apps = []
-    for line in result.stdout.strip().split('\n'):
-        if line.strip():
-            parts = line.split('\t')
-            if len(parts) >= 3:
-                apps.append({
-                    'id': parts[0],
-                    'name': parts[1], 
-                    'version': parts[2],
-                    'branch': parts[3] if len(parts) > 3 else 'stable'
-                })
+    The 'commit' method (default, performance.update_detection) compares
+    deployed commits with the remotes' cached summaries; 'backend' asks the
+    query backend (libflatpak or `flatpak remote-ls --updates`); 'dry-run'
+    resolves a full update transaction and is also used if the other
+    methods fail.
+    
+    An identical check already running in another flatpack process is
+    waited for and its result reused instead of starting a second one.
+    
+    Apps matching excluded_packages are left out and apps matching
+    priority_packages are listed first.
+    """
+    from flatpack_config import get_config
+    from flatpack_lock import single_flight
+    from flatpack_patterns import get_package_filter
+    
+    config = get_config()
+    method = method or config.get('performance.update_detection', 'commit')
+    key = f"update-check-{method}" + ("-refresh" if refresh else "")
+    updates = single_flight(key, lambda: detect_updates(config, method, refresh))
+    updates, excluded = get_package_filter(config).apply(updates)
+    if excluded:
+        print(f"Skipping {len(excluded)} excluded app(s): {', '.join(excluded)}")
+    return updates
+
+
+def detect_updates(config, method: str, refresh: bool) -> List[str]:
+    """Run one update check with the given method (see check_for_updates)"""
+    if method == 'commit':
+        from flatpack_updates import UpdateDetector, UpdateDetectionError
+        try:
+            return UpdateDetector(config).check(refresh=refresh)
+        except UpdateDetectionError as e:
+            print(f"Commit comparison failed ({e}), falling back to a dry-run check")
+    elif method == 'backend':
+        from flatpack_backend import get_backend, FlatpakBackendError
+        try:
+            return get_backend(config).list_updates()
+        except FlatpakBackendError as e:
+            print(f"Update query failed ({e}), falling back to a dry-run check")
     
-    return apps
+    return check_for_updates_dry_run()
 
 
-def check_for_updates() -> List[str]:
+def check_for_updates_dry_run() -> List[str]:
     """Check which apps have updates available using --no-deploy flag"""
     print("Checking for updates (this may take a moment)...")
     
@@ -78,34 +112,48 @@ def check_for_updates() -> List[str]:
     cmd = ["flatpak", "update", "--no-deploy", "--noninteractive"]
     result = run_command(cmd, suppress_stderr=True)
     
-    # Parse output to find apps with updates
-    updatable_apps = []
-    for line in result.stdout.split('\n'):
-        if line.startswith("Updating app/"):
-            # Extract app ID from "Updating app/com.example.App/x86_64/stable"
-            app_info = line.replace("Updating app/", "")
-            app_id = app_info.split('/')[0]
-            updatable_apps.append(app_id)
-    
-    return updatable_apps
+    # Apps from the "Updating app/com.example.App/x86_64/stable" lines
+    from flatpack_parser import parse_update_output
+    return parse_update_output(result.stdout)
 
 
 def get_app_info(app_id: str) -> Optional[Dict[str, str]]:
     """Get detailed information about a specific app"""
-    apps = list_installed_apps()
-    for app in apps:
-        if app['id'] == app_id:
-            return app
-    return None
+    from flatpack_backend import get_backend, FlatpakBackendError
+    
+    try:
+        return get_backend().get_info(app_id)
+    except FlatpakBackendError:
+        return None
 
 
 def update_apps(app_ids: Optional[List[str]] = None, interactive: bool = False) -> bool:
-    """Update specified apps or all apps if none specified"""
+    """Update specified apps or all apps if none specified
+    
+    Apps matching excluded_packages are never updated: with exclusions
+    configured, "all apps" means the apps check_for_updates reports.
+    """
+    from flatpack_patterns import get_package_filter
+    
     cmd = ["flatpak", "update"]
     
     if not interactive:
         cmd.append("--noninteractive")
     
+    package_filter = get_package_filter()
+    if app_ids:
+        app_ids, excluded = package_filter.apply(app_ids)
+        if excluded:
+            print(f"Skipping excluded app(s): {', '.join(excluded)}")
+            if not app_ids:
+                print("No valid apps to update.")
+                return False
+    elif package_filter.excluded:
+        app_ids = check_for_updates()
+        if not app_ids:
+            print("No apps need updating.")
+            return True
+    
     if app_ids:
         # Validate that specified apps are actually installed
         installed_apps = [app['id'] for app in list_installed_apps()]
@@ -119,10 +167,27 @@ def update_apps(app_ids: Optional[List[str]] = None, interactive: bool = False)
                 print("No valid apps to update.")
                 return False
         
+        from flatpack_config import get_config
+        
+        config = get_config()
+        if config.get('update_behavior.check_disk_space', True):
+            from flatpack_preflight import get_disk_planner
+            
+            plan = get_disk_planner(config).plan_updates(app_ids)
+            for line in plan.report():
+                print(line)
+            if not plan.accepted:
+                print("Update cancelled: not enough disk space.")
+                return False
+        
         cmd.extend(app_ids)
     
-    print(f"Running: {' '.join(cmd)}")
-    result = run_command(cmd)
+    # Updates from concurrent flatpack processes queue instead of colliding
+    from flatpack_lock import get_store_lock
+    
+    with get_store_lock('flatpak'):
+        print(f"Running: {' '.join(cmd)}")
+        result = run_command(cmd)
     
     if result.returncode == 0:
         print("\nUpdate completed successfully!")
@@ -159,7 +224,11 @@ def update_specific_apps(updatable_apps: List[str], interactive: bool = False) -
     return update_apps(updatable_apps, interactive)
 
 
-def main():
+def main(argv: Optional[List[str]] = None, started: Optional[float] = None):
+    import argparse
+    
+    timer = StartupTimer('flatpack', started)
+    
     parser = argparse.ArgumentParser(
         description="Flatpack: A comprehensive Flatpak update manager",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -212,13 +281,106 @@ Examples:
         help="Run in interactive mode (show prompts and confirmations)"
     )
     
+    parser.add_argument(
+        "--dry-run-check",
+        action="store_true",
+        help="Detect updates with a full dry-run transaction instead of comparing commits"
+    )
+    
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached remote summaries when checking for updates"
+    )
+    
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Query Flatpak directly even if flatpackd is running"
+    )
+    
+    parser.add_argument(
+        "--timing",
+        action="store_true",
+        help="Report startup and per-phase timing on stderr"
+    )
+    
     parser.add_argument(
         "--version", "-v",
         action="version",
         version="Flatpack 1.0.0"
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    timer.mark("argument parsing")
+    
+    try:
+        run(args, parser)
+    finally:
+        if args.timing:
+            timer.mark("command")
+            timer.report(argv)
+
+
+def detection_method(args) -> Optional[str]:
+    """Update detection method selected on the command line (None: configured default)"""
+    return 'dry-run' if args.dry_run_check else None
+
+
+def print_installed_apps(apps: List[Dict[str, str]]):
+    if apps:
+        print(f"\nInstalled Flatpak Applications ({len(apps)} total):")
+        print("=" * 80)
+        for app in apps:
+            print(f"ID:      {app['id']}")
+            print(f"Name:    {app['name']}")
+            print(f"Version: {app['version']}")
+            print(f"Branch:  {app['branch']}")
+            print("-" * 40)
+    else:
+        print("No Flatpak applications found.")
+
+
+def print_updates(updatable_apps: List[Dict[str, str]]):
+    """Print apps with updates (installed-app records, or just {'id'} if unknown)"""
+    if updatable_apps:
+        print(f"\n✓ Updates available for {len(updatable_apps)} app(s):")
+        print("=" * 50)
+        for app in updatable_apps:
+            if app.get('name'):
+                print(f"  {app['id']} ({app['name']})")
+                print(f"    Current version: {app.get('version', '')}")
+            else:
+                print(f"  {app['id']}")
+            print()
+        print(f"Run 'flatpack --smart-update' to update these apps.")
+    else:
+        print("\n✓ All apps are up to date!")
+
+
+def answer_from_daemon(args) -> bool:
+    """Answer --list/--check from a running flatpackd (False if none answered)"""
+    from flatpack_daemon import query_daemon
+    
+    if args.list:
+        response = query_daemon('list')
+        if response is None:
+            return False
+        print_installed_apps(response['result'])
+    else:
+        response = query_daemon('check', refresh=args.refresh)
+        if response is None:
+            return False
+        print_updates(response['result'])
+    return True
+
+
+def run(args, parser):
+    """Run the command selected on the command line"""
+    # Queries are served from flatpackd's warm caches when it is running
+    if (args.list or args.check) and not (args.no_daemon or args.dry_run_check):
+        if answer_from_daemon(args):
+            return
     
     # Check if Flatpak is available
     if not check_flatpak_available():
@@ -226,38 +388,14 @@ Examples:
         sys.exit(1)
     
     if args.list:
-        apps = list_installed_apps()
-        if apps:
-            print(f"\nInstalled Flatpak Applications ({len(apps)} total):")
-            print("=" * 80)
-            for app in apps:
-                print(f"ID:      {app['id']}")
-                print(f"Name:    {app['name']}")
-                print(f"Version: {app['version']}")
-                print(f"Branch:  {app['branch']}")
-                print("-" * 40)
-        else:
-            print("No Flatpak applications found.")
+        print_installed_apps(list_installed_apps())
     
     elif args.check:
-        updatable_apps = check_for_updates()
-        if updatable_apps:
-            print(f"\n✓ Updates available for {len(updatable_apps)} app(s):")
-            print("=" * 50)
-            for app_id in updatable_apps:
-                app_info = get_app_info(app_id)
-                if app_info:
-                    print(f"  {app_id} ({app_info['name']})")
-                    print(f"    Current version: {app_info['version']}")
-                else:
-                    print(f"  {app_id}")
-                print()
-            print(f"Run 'flatpack --smart-update' to update these apps.")
-        else:
-            print("\n✓ All apps are up to date!")
+        updatable_apps = check_for_updates(detection_method(args), args.refresh)
+        print_updates([get_app_info(app_id) or {'id': app_id} for app_id in updatable_apps])
     
     elif args.smart_update:
-        updatable_apps = check_for_updates()
+        updatable_apps = check_for_updates(detection_method(args), args.refresh)
         if updatable_apps:
             print(f"\nSmart update: Found {len(updatable_apps)} app(s) with updates available.")
             update_specific_apps(updatable_apps, args.interactive)
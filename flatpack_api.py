@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Flatpack Programmatic API
+
+In-process API for the Flatpack tools, used by flatpack-manager instead of
+re-executing flatpack.py, package_manager_integration.py and
+install_flatpaks.sh as child processes (the installer's core path lives in
+flatpack_installer.py). A FlatpackSession shares one
+configuration, one logger and one installed-app inventory across all steps.
+"""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Set
+
+import flatpack
+from flatpack_config import get_config
+from flatpack_journal import OperationJournal
+from flatpack_lock import get_store_lock
+from flatpack_logger import FlatpackLogger
+
+@dataclass
+class StepResult:
+    """Outcome of a single API step"""
+    success: bool
+    succeeded: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    duration: float = 0.0
+    error: str = ""
+
+class FlatpakInventory:
+    """Cached snapshot of installed Flatpak applications
+
+    Every step of a session reads the same snapshot; steps that change the
+    installation call invalidate() so the next read lists apps again.
+    """
+
+    def __init__(self):
+        self._apps: Optional[Dict[str, Dict[str, str]]] = None
+
+    def apps(self) -> Dict[str, Dict[str, str]]:
+        """Installed apps keyed by app ID"""
+        if self._apps is None:
+            self._apps = {app['id']: app for app in flatpack.list_installed_apps()}
+        return self._apps
+
+    def installed_ids(self) -> Set[str]:
+        return set(self.apps())
+
+    def is_installed(self, app_id: str) -> bool:
+        return app_id in self.apps()
+
+    def get(self, app_id: str) -> Optional[Dict[str, str]]:
+        return self.apps().get(app_id)
+
+    def invalidate(self):
+        self._apps = None
+
+class FlatpakUpdater:
+    """Flatpak application updates (the API behind flatpack.py)"""
+
+    def __init__(self, session: 'FlatpackSession'):
+        self.session = session
+
+    def check_for_updates(self) -> List[str]:
+        """App IDs with updates available"""
+        return flatpack.check_for_updates()
+
+    def update(self, app_ids: Optional[List[str]] = None) -> StepResult:
+        """Update the given installed apps, or everything if none are given
+
+        Specific apps are updated through ParallelOperationManager's
+        two-phase pipeline (concurrent pulls feeding a small deploy stage)
+        when performance.split_download_deploy is enabled. With
+        excluded_packages configured, "everything" is the apps
+        check_for_updates reports, so excluded apps are never updated.
+        """
+        from flatpack_patterns import get_package_filter
+
+        if not app_ids and get_package_filter(self.session.config).excluded:
+            app_ids = self.check_for_updates()
+            if not app_ids:
+                return StepResult(success=True)
+
+        if app_ids and self.session.config.get('performance.split_download_deploy', True):
+            return self.update_two_phase(app_ids)
+
+        with self.session.locks['flatpak']:
+            start_time = time.time()
+            inventory = self.session.inventory
+            cmd = ["flatpak", "update", "--noninteractive"]
+            skipped = []
+
+            if app_ids:
+                skipped = [app_id for app_id in app_ids if not inventory.is_installed(app_id)]
+                app_ids = [app_id for app_id in app_ids if inventory.is_installed(app_id)]
+                if skipped:
+                    print(f"Warning: The following apps are not installed: {', '.join(skipped)}")
+                if not app_ids:
+                    return StepResult(success=False, skipped=skipped, error="No valid apps to update")
+                cmd.extend(app_ids)
+
+            result = flatpack.run_command(cmd)
+            success = result.returncode == 0
+            duration = time.time() - start_time
+            inventory.invalidate()
+
+            self.session.logger.log_package_operation(
+                "update", "flatpak", app_ids or ["all"], success, duration,
+                error_msg=None if success else result.stderr.strip()
+            )
+
+            return StepResult(
+                success=success,
+                succeeded=list(app_ids or []) if success else [],
+                failed=[] if success else list(app_ids or []),
+                skipped=skipped,
+                duration=duration,
+                error="" if success else result.stderr.strip()
+            )
+
+    def update_two_phase(self, app_ids: List[str]) -> StepResult:
+        """Update apps with separate concurrent pull and deploy stages"""
+        from flatpack_parallel import ParallelOperationManager
+
+        with self.session.locks['flatpak']:
+            start_time = time.time()
+            inventory = self.session.inventory
+            skipped = [app_id for app_id in app_ids if not inventory.is_installed(app_id)]
+            app_ids = [app_id for app_id in app_ids if inventory.is_installed(app_id)]
+            if skipped:
+                print(f"Warning: The following apps are not installed: {', '.join(skipped)}")
+            if not app_ids:
+                return StepResult(success=False, skipped=skipped, error="No valid apps to update")
+
+            manager = ParallelOperationManager(self.session.config)
+            for operation in manager.create_flatpak_operations(app_ids, "update"):
+                manager.add_operation(operation)
+            results = manager.execute_operations_batch()
+            inventory.invalidate()
+
+            succeeded = [result.operation.package_name for result in results['results']['completed']]
+            failed = [result.operation.package_name for result in results['results']['failed']]
+            errors = [result.error.strip() for result in results['results']['failed'] if result.error.strip()]
+            duration = time.time() - start_time
+
+            self.session.logger.log_package_operation(
+                "update", "flatpak", app_ids, not failed, duration,
+                error_msg="; ".join(errors)[:500] if failed else None
+            )
+
+            return StepResult(
+                success=not failed,
+                succeeded=succeeded,
+                failed=failed,
+                skipped=skipped,
+                duration=duration,
+                error="; ".join(errors)
+            )
+
+    def smart_update(self) -> StepResult:
+        """Update only the apps that have updates available"""
+        with self.session.locks['flatpak']:
+            updatable_apps = self.check_for_updates()
+            if not updatable_apps:
+                print("\n✓ All apps are already up to date!")
+                return StepResult(success=True)
+
+            print(f"\nSmart update: Found {len(updatable_apps)} app(s) with updates available.")
+            return self.update(updatable_apps)
+
+class NativePackageInstaller:
+    """Native package management (the API behind package_manager_integration.py)"""
+
+    def __init__(self, session: 'FlatpackSession'):
+        self.session = session
+        self._integration = None
+        self._prefetch: Optional[Future] = None
+
+    @property
+    def integration(self):
+        """Distribution and package manager detection runs once per session"""
+        if self._integration is None:
+            from package_manager_integration import PackageManagerIntegration
+            self._integration = PackageManagerIntegration()
+        return self._integration
+
+    def update_database(self) -> StepResult:
+        with self.session.locks['native']:
+            start_time = time.time()
+            success = self.integration.update_package_database()
+            return StepResult(success=success, duration=time.time() - start_time)
+
+    def prefetch(self, categories: Optional[List[str]] = None) -> StepResult:
+        """Download the packages of the given categories without installing them
+
+        Runs without the native lock so it can overlap with Flatpak work
+        and other native steps; the package database should be current.
+        """
+        from package_manager_integration import PACKAGE_CATEGORIES
+
+        start_time = time.time()
+        categories = categories or list(PACKAGE_CATEGORIES.keys())
+        packages = self.integration.get_category_packages(categories)
+        success = self.integration.prefetch_packages(packages)
+        return StepResult(success=success, succeeded=packages if success else [],
+                          failed=[] if success else packages, duration=time.time() - start_time)
+
+    def start_prefetch(self, categories: Optional[List[str]] = None) -> Future:
+        """Start prefetch() in the background; install_categories() waits for it"""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='native-prefetch')
+        self._prefetch = executor.submit(self.prefetch, categories)
+        executor.shutdown(wait=False)
+        return self._prefetch
+
+    def wait_for_prefetch(self) -> Optional[StepResult]:
+        """Wait for a background prefetch, if one was started"""
+        if self._prefetch is None:
+            return None
+        try:
+            result = self._prefetch.result()
+        except Exception as e:
+            result = StepResult(success=False, error=str(e))
+        self._prefetch = None
+
+        if result.success:
+            print(f"[PREFETCH] Native packages downloaded in {result.duration:.1f}s")
+        else:
+            # Not fatal: the install downloads whatever is missing from the cache
+            print("[PREFETCH] Native package download failed, installing with downloads")
+        return result
+
+    def install_categories(self, categories: Optional[List[str]] = None,
+                           update_database: bool = True) -> StepResult:
+        """Install package categories (all categories if none are given)
+
+        If a prefetch was started, it is awaited before taking the native
+        lock, so the lock is only held while installing from the cache.
+        """
+        self.wait_for_prefetch()
+
+        with self.session.locks['native']:
+            from package_manager_integration import PACKAGE_CATEGORIES
+
+            start_time = time.time()
+            pmi = self.integration
+            categories = categories or list(PACKAGE_CATEGORIES.keys())
+
+            pmi.show_system_info()
+            if update_database:
+                pmi.update_package_database()
+                print()
+
+            succeeded, failed = [], []
+            for category in categories:
+                if pmi.install_category(category):
+                    succeeded.append(category)
+                else:
+                    failed.append(category)
+                print()
+
+            duration = time.time() - start_time
+            self.session.logger.log_package_operation(
+                "install", "native", succeeded + failed, not failed, duration,
+                error_msg=f"Failed categories: {', '.join(failed)}" if failed else None
+            )
+
+            return StepResult(success=not failed, succeeded=succeeded, failed=failed, duration=duration)
+
+class FlatpackSession:
+    """One configuration, logger, inventory and journal shared by every API step"""
+
+    def __init__(self, config=None, logger: Optional[FlatpackLogger] = None,
+                 journal: Optional[OperationJournal] = None):
+        self.config = config or get_config()
+        self.logger = logger or FlatpackLogger(self.config)
+        self.inventory = FlatpakInventory()
+        self.journal = journal or OperationJournal()
+        
+        # One lock per package store: steps on the same store run one at a
+        # time, in this process and across concurrent flatpack processes,
+        # while native and Flatpak steps may run concurrently
+        self.locks = {
+            'native': get_store_lock('native'),
+            'flatpak': get_store_lock('flatpak')
+        }
+
+        from flatpack_installer import FlatpakInstaller
+
+        self.updater = FlatpakUpdater(self)
+        self.native = NativePackageInstaller(self)
+        self.installer = FlatpakInstaller(self)
+
+def create_session(config=None) -> FlatpackSession:
+    """Factory function to create an API session"""
+    return FlatpackSession(config)
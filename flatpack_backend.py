@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Flatpack Query Backends
+
+One inventory interface for read-only Flatpak queries (installed refs,
+remotes, app info, updates) with interchangeable implementations:
+
+- LibFlatpakBackend queries libflatpak in-process through GObject
+  introspection (gi.repository.Flatpak), so a query costs a library call
+  instead of spawning the flatpak CLI. Any call that fails falls back to
+  the CLI backend.
+- CliBackend runs the flatpak CLI and parses its output.
+- StubBackend serves fixed data, for testing on hosts without Flatpak.
+
+get_backend() picks one per process from performance.flatpak_backend
+("auto", "libflatpak", "cli" or "stub"); the FLATPACK_BACKEND environment
+variable overrides it, and FLATPACK_STUB_FILE points the stub at a JSON file.
+Changes (install, update, remove) always go through the flatpak CLI.
+"""
+
+import json
+import os
+import subprocess
+import threading
+from typing import List, Dict, Optional, Tuple
+
+from flatpack_parser import (InstalledRef, Remote, INSTALLED_COLUMNS, columns_arg,
+                             parse_installed, parse_names, parse_remote_refs, parse_remotes, parse_size)
+
+BACKEND_CHOICES = ('auto', 'libflatpak', 'cli', 'stub')
+
+class FlatpakBackendError(Exception):
+    """A Flatpak query failed"""
+
+def run_flatpak(args: List[str]) -> str:
+    """Run a flatpak query and return its stdout"""
+    try:
+        result = subprocess.run(['flatpak'] + args, capture_output=True, text=True, check=False)
+    except OSError as e:
+        raise FlatpakBackendError(str(e))
+    if result.returncode != 0:
+        raise FlatpakBackendError(result.stderr.strip() or f"flatpak {args[0]} failed")
+    return result.stdout
+
+class FlatpakBackend:
+    """Read-only Flatpak queries
+
+    Installed refs are flatpack_parser.InstalledRef records (id, name,
+    version, branch, arch, origin, commit, kind 'app' or 'runtime' and,
+    where the listing has them, installed_size and runtime) and remotes
+    are Remote records (name, url).
+    """
+
+    name = 'base'
+
+    def list_installed(self, apps_only: bool = True) -> List[InstalledRef]:
+        raise NotImplementedError
+
+    def list_remotes(self) -> List[Remote]:
+        raise NotImplementedError
+
+    def remote_refs(self, remote: str) -> Dict[str, str]:
+        """Commit the remote advertises for each app ref (app/ID/arch/branch)"""
+        raise NotImplementedError
+
+    def list_updates(self) -> List[str]:
+        """IDs of installed apps with updates available"""
+        raise NotImplementedError
+
+    def remote_sizes(self, remote: str) -> Dict[str, Tuple[int, int]]:
+        """(download, installed) size in bytes of each app ref the remote offers"""
+        raise NotImplementedError
+
+    def installed_sizes(self) -> Dict[str, int]:
+        """Size in bytes of the current deployment of each installed app"""
+        raise NotImplementedError
+
+    def runtime_sizes(self) -> Dict[str, int]:
+        """Size in bytes of each installed runtime (ID/arch/branch)"""
+        raise NotImplementedError
+
+    def app_runtimes(self) -> Dict[str, str]:
+        """Runtime (ID/arch/branch) each installed app uses"""
+        raise NotImplementedError
+
+    def get_info(self, app_id: str) -> Optional[InstalledRef]:
+        for ref in self.list_installed():
+            if ref.id == app_id:
+                return ref
+        return None
+
+class CliBackend(FlatpakBackend):
+    """Queries through the flatpak CLI"""
+
+    name = 'cli'
+    REMOTE_REF_COLUMNS = ('ref', 'commit')
+    REMOTE_SIZE_COLUMNS = ('ref', 'download-size', 'installed-size')
+    INSTALLED_SIZE_COLUMNS = ('application', 'size')
+    RUNTIME_SIZE_COLUMNS = ('application', 'arch', 'branch', 'size')
+    APP_RUNTIME_COLUMNS = ('application', 'runtime')
+
+    def list_installed(self, apps_only: bool = True) -> List[InstalledRef]:
+        kinds = ['app'] if apps_only else ['app', 'runtime']
+        refs = []
+        for kind in kinds:
+            output = run_flatpak(['list', f'--{kind}', columns_arg(INSTALLED_COLUMNS)])
+            refs.extend(parse_installed(output, INSTALLED_COLUMNS, kind))
+        return refs
+
+    def list_remotes(self) -> List[Remote]:
+        return parse_remotes(run_flatpak(['remotes', '--columns=name,url']))
+
+    def remote_refs(self, remote: str) -> Dict[str, str]:
+        output = run_flatpak(['remote-ls', '--app', columns_arg(self.REMOTE_REF_COLUMNS), remote])
+        return {ref.ref: ref.commit for ref in parse_remote_refs(output, self.REMOTE_REF_COLUMNS) if ref.ref}
+
+    def list_updates(self) -> List[str]:
+        return parse_names(run_flatpak(['remote-ls', '--updates', '--app', '--columns=application']))
+
+    def remote_sizes(self, remote: str) -> Dict[str, Tuple[int, int]]:
+        output = run_flatpak(['remote-ls', '--app', columns_arg(self.REMOTE_SIZE_COLUMNS), remote])
+        return {ref.ref: (parse_size(ref.download_size), parse_size(ref.installed_size))
+                for ref in parse_remote_refs(output, self.REMOTE_SIZE_COLUMNS) if ref.ref}
+
+    def installed_sizes(self) -> Dict[str, int]:
+        output = run_flatpak(['list', '--app', columns_arg(self.INSTALLED_SIZE_COLUMNS)])
+        sizes = {}
+        for ref in parse_installed(output, self.INSTALLED_SIZE_COLUMNS):
+            # An app in both installations counts with its larger deployment
+            sizes[ref.id] = max(sizes.get(ref.id, 0), parse_size(ref.installed_size))
+        return sizes
+
+    def runtime_sizes(self) -> Dict[str, int]:
+        output = run_flatpak(['list', '--runtime', columns_arg(self.RUNTIME_SIZE_COLUMNS)])
+        return {f"{ref.id}/{ref.arch}/{ref.branch}": parse_size(ref.installed_size)
+                for ref in parse_installed(output, self.RUNTIME_SIZE_COLUMNS, 'runtime') if ref.id}
+
+    def app_runtimes(self) -> Dict[str, str]:
+        output = run_flatpak(['list', '--app', columns_arg(self.APP_RUNTIME_COLUMNS)])
+        return {ref.id: ref.runtime for ref in parse_installed(output, self.APP_RUNTIME_COLUMNS) if ref.id}
+
+class LibFlatpakBackend(FlatpakBackend):
+    """In-process queries through libflatpak (gi.repository.Flatpak)"""
+
+    name = 'libflatpak'
+
+    def __init__(self, fallback: Optional[FlatpakBackend] = None):
+        import gi
+        gi.require_version('Flatpak', '1.0')
+        from gi.repository import Flatpak
+
+        self.Flatpak = Flatpak
+        self.fallback = fallback or CliBackend()
+        self.installations = list(Flatpak.get_system_installations(None))
+        try:
+            self.installations.append(Flatpak.Installation.new_user(None))
+        except Exception:
+            pass  # No user installation
+
+    def installed_record(self, ref, kind: str) -> InstalledRef:
+        return InstalledRef(
+            ref.get_name(),
+            ref.get_appdata_name() or ref.get_name(),
+            ref.get_appdata_version() or '',
+            ref.get_branch(),
+            ref.get_arch(),
+            ref.get_origin(),
+            ref.get_commit(),
+            kind,
+            str(ref.get_installed_size())
+        )
+
+    def list_installed(self, apps_only: bool = True) -> List[InstalledRef]:
+        kinds = [('app', self.Flatpak.RefKind.APP)]
+        if not apps_only:
+            kinds.append(('runtime', self.Flatpak.RefKind.RUNTIME))
+        try:
+            refs = []
+            for installation in self.installations:
+                for kind, ref_kind in kinds:
+                    for ref in installation.list_installed_refs_by_kind(ref_kind, None):
+                        refs.append(self.installed_record(ref, kind))
+            return refs
+        except Exception:
+            return self.fallback.list_installed(apps_only)
+
+    def list_remotes(self) -> List[Remote]:
+        try:
+            remotes, seen = [], set()
+            for installation in self.installations:
+                for remote in installation.list_remotes(None):
+                    if remote.get_disabled() or remote.get_name() in seen:
+                        continue
+                    seen.add(remote.get_name())
+                    remotes.append(Remote(remote.get_name(), remote.get_url() or ''))
+            return remotes
+        except Exception:
+            return self.fallback.list_remotes()
+
+    def remote_refs(self, remote: str) -> Dict[str, str]:
+        try:
+            for installation in self.installations:
+                names = [r.get_name() for r in installation.list_remotes(None)]
+                if remote not in names:
+                    continue
+                commits = {}
+                for ref in installation.list_remote_refs_sync(remote, None):
+                    if ref.get_kind() == self.Flatpak.RefKind.APP:
+                        commits[ref.format_ref()] = ref.get_commit()
+                return commits
+            raise FlatpakBackendError(f"Unknown remote: {remote}")
+        except FlatpakBackendError:
+            raise
+        except Exception:
+            return self.fallback.remote_refs(remote)
+
+    def remote_sizes(self, remote: str) -> Dict[str, Tuple[int, int]]:
+        try:
+            for installation in self.installations:
+                names = [r.get_name() for r in installation.list_remotes(None)]
+                if remote not in names:
+                    continue
+                sizes = {}
+                for ref in installation.list_remote_refs_sync(remote, None):
+                    if ref.get_kind() == self.Flatpak.RefKind.APP:
+                        sizes[ref.format_ref()] = (ref.get_download_size(), ref.get_installed_size())
+                return sizes
+            raise FlatpakBackendError(f"Unknown remote: {remote}")
+        except FlatpakBackendError:
+            raise
+        except Exception:
+            return self.fallback.remote_sizes(remote)
+
+    def installed_sizes(self) -> Dict[str, int]:
+        try:
+            sizes = {}
+            for installation in self.installations:
+                for ref in installation.list_installed_refs_by_kind(self.Flatpak.RefKind.APP, None):
+                    sizes[ref.get_name()] = max(sizes.get(ref.get_name(), 0), ref.get_installed_size())
+            return sizes
+        except Exception:
+            return self.fallback.installed_sizes()
+
+    def runtime_sizes(self) -> Dict[str, int]:
+        try:
+            sizes = {}
+            for installation in self.installations:
+                for ref in installation.list_installed_refs_by_kind(self.Flatpak.RefKind.RUNTIME, None):
+                    sizes[f"{ref.get_name()}/{ref.get_arch()}/{ref.get_branch()}"] = ref.get_installed_size()
+            return sizes
+        except Exception:
+            return self.fallback.runtime_sizes()
+
+    def app_runtimes(self) -> Dict[str, str]:
+        try:
+            runtimes = {}
+            for installation in self.installations:
+                for ref in installation.list_installed_refs_by_kind(self.Flatpak.RefKind.APP, None):
+                    # The [Application] group of the deployed metadata names the runtime
+                    metadata = ref.load_metadata(None).get_data().decode('utf-8', 'replace')
+                    for line in metadata.splitlines():
+                        if line.startswith('runtime='):
+                            runtimes[ref.get_name()] = line.split('=', 1)[1].strip()
+                            break
+            return runtimes
+        except Exception:
+            return self.fallback.app_runtimes()
+
+    def list_updates(self) -> List[str]:
+        try:
+            updates = []
+            for installation in self.installations:
+                for ref in installation.list_installed_refs_for_update(None):
+                    if ref.get_kind() == self.Flatpak.RefKind.APP:
+                        updates.append(ref.get_name())
+            return updates
+        except Exception:
+            return self.fallback.list_updates()
+
+class StubBackend(FlatpakBackend):
+    """Fixed data, for testing without Flatpak
+
+    The data has the keys installed (InstalledRef fields; id is required),
+    remotes (Remote fields), remote_refs (remote -> {ref: commit}),
+    remote_sizes (remote -> {ref: [download, installed]}) and updates (app
+    IDs); installed sizes are the installed_size field (bytes) of the
+    installed refs and app runtimes their runtime field (ID/arch/branch).
+    """
+
+    name = 'stub'
+
+    def __init__(self, data: Optional[Dict] = None):
+        self.data = data or {}
+
+    @classmethod
+    def from_file(cls, path: str) -> 'StubBackend':
+        with open(path, 'r') as f:
+            return cls(json.load(f))
+
+    def list_installed(self, apps_only: bool = True) -> List[InstalledRef]:
+        defaults = {'branch': 'stable', 'arch': 'x86_64', 'origin': 'flathub', 'kind': 'app'}
+        refs = [InstalledRef(**{**defaults, 'name': ref.get('id', ''), **ref})
+                for ref in self.data.get('installed', [])]
+        return [ref for ref in refs if ref.kind == 'app'] if apps_only else refs
+
+    def list_remotes(self) -> List[Remote]:
+        return [Remote(**remote) for remote in self.data.get('remotes', [])]
+
+    def remote_refs(self, remote: str) -> Dict[str, str]:
+        return dict(self.data.get('remote_refs', {}).get(remote, {}))
+
+    def list_updates(self) -> List[str]:
+        return list(self.data.get('updates', []))
+
+    def remote_sizes(self, remote: str) -> Dict[str, Tuple[int, int]]:
+        return {ref: tuple(sizes) for ref, sizes in self.data.get('remote_sizes', {}).get(remote, {}).items()}
+
+    def installed_sizes(self) -> Dict[str, int]:
+        return {ref.id: parse_size(str(ref.installed_size)) for ref in self.list_installed()}
+
+    def runtime_sizes(self) -> Dict[str, int]:
+        return {f"{ref.id}/{ref.arch}/{ref.branch}": parse_size(str(ref.installed_size))
+                for ref in self.list_installed(apps_only=False) if ref.kind == 'runtime'}
+
+    def app_runtimes(self) -> Dict[str, str]:
+        return {ref.id: ref.runtime for ref in self.list_installed() if ref.runtime}
+
+_backend_instance: Optional[FlatpakBackend] = None
+_backend_lock = threading.Lock()
+
+def create_backend(choice: str = 'auto') -> FlatpakBackend:
+    """Create a backend; 'auto' prefers libflatpak and falls back to the CLI"""
+    if choice == 'stub':
+        stub_file = os.environ.get('FLATPACK_STUB_FILE')
+        return StubBackend.from_file(stub_file) if stub_file else StubBackend()
+    if choice == 'cli':
+        return CliBackend()
+    try:
+        return LibFlatpakBackend()
+    except (ImportError, ValueError, AttributeError):
+        # PyGObject or the Flatpak typelib is not installed
+        if choice == 'libflatpak':
+            print("Warning: libflatpak is not available, using the flatpak CLI")
+        return CliBackend()
+
+def get_backend(config=None) -> FlatpakBackend:
+    """Get the process-wide query backend"""
+    global _backend_instance
+    if _backend_instance is None:
+        with _backend_lock:
+            if _backend_instance is None:
+                choice = os.environ.get('FLATPACK_BACKEND')
+                if not choice:
+                    if config is None:
+                        from flatpack_config import get_config
+                        config = get_config()
+                    choice = config.get('performance.flatpak_backend', 'auto')
+                _backend_instance = create_backend(choice if choice in BACKEND_CHOICES else 'auto')
+    return _backend_instance
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Flatpack Query Backends")
+    parser.add_argument("--backend", choices=BACKEND_CHOICES, help="Backend to query (default: configured)")
+    parser.add_argument("--list", action="store_true", help="List installed apps")
+    parser.add_argument("--remotes", action="store_true", help="List configured remotes")
+    parser.add_argument("--updates", action="store_true", help="List apps with updates available")
+
+    args = parser.parse_args()
+    backend = create_backend(args.backend) if args.backend else get_backend()
+    print(f"Backend: {backend.name}")
+
+    start_time = time.perf_counter()
+    try:
+        if args.remotes:
+            for remote in backend.list_remotes():
+                print(f"{remote['name']:<20} {remote['url']}")
+        elif args.updates:
+            for app_id in backend.list_updates():
+                print(app_id)
+        else:
+            for ref in backend.list_installed():
+                print(f"{ref['id']:<45} {ref['version']:<15} {ref['branch']:<10} {ref['origin']}")
+    except FlatpakBackendError as e:
+        print(f"Error: {e}")
+    print(f"Query took {(time.perf_counter() - start_time) * 1000:.2f} ms")
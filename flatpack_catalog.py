@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Flatpack Catalog Index
+
+Locally cached index of the apps each configured Flatpak remote provides,
+built from `flatpak remote-ls`. Each remote is stored as one compact file
+under ~/.cache/flatpack/catalog/ and refreshed on its own: it is re-checked
+once performance.catalog_ttl expires and re-listed only if its summary
+fingerprint changed.
+
+Once loaded, the index answers prefix and token searches and resolves an
+app ID to the remotes that provide it without running flatpak, so app IDs
+can be validated and routed to the right remote before any operation is
+queued.
+"""
+
+import bisect
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import List, Dict, Optional, Set, Tuple
+
+from flatpack_backend import FlatpakBackendError, run_flatpak
+from flatpack_parser import columns_arg, parse_remote_refs
+from flatpack_updates import UpdateDetector
+
+CATALOG_DIR = Path.home() / '.cache' / 'flatpack' / 'catalog'
+CATALOG_FORMAT = 1
+DEFAULT_TTL = 6 * 3600
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens of an app ID or name"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class FlatpackCatalog:
+    """Search and resolution over the cached app listings of every remote"""
+
+    def __init__(self, config=None, catalog_dir: Optional[Path] = None):
+        self.config = config
+        self.catalog_dir = Path(catalog_dir) if catalog_dir else CATALOG_DIR
+        self.ttl = DEFAULT_TTL
+        if config:
+            self.ttl = config.get('performance.catalog_ttl', DEFAULT_TTL)
+
+        self.remotes: Dict[str, Dict] = {}
+        self._apps: Dict[str, Dict] = {}  # app ID -> {'id', 'name', 'remotes'}
+        self._ids: List[str] = []  # Sorted lower-case app IDs, for prefix search
+        self._id_case: Dict[str, str] = {}
+        self._tokens: List[str] = []  # Sorted tokens, for token-prefix search
+        self._token_ids: Dict[str, Set[str]] = {}
+        self._loaded = False
+
+    def remote_file(self, remote: str) -> Path:
+        return self.catalog_dir / f"{remote}.json"
+
+    def load(self):
+        """Load every cached remote listing and build the in-memory index"""
+        self.remotes = {}
+        try:
+            files = sorted(self.catalog_dir.glob('*.json'))
+        except OSError:
+            files = []
+        for path in files:
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            if data.get('format') == CATALOG_FORMAT:
+                self.remotes[path.stem] = data
+        self.build_index()
+        self._loaded = True
+
+    def ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def build_index(self):
+        apps = {}
+        token_ids = {}
+        for remote, data in self.remotes.items():
+            # Rows are [app_id, name, branch]
+            for app_id, name, _branch in data.get('apps', []):
+                entry = apps.setdefault(app_id, {'id': app_id, 'name': name, 'remotes': []})
+                if remote not in entry['remotes']:
+                    entry['remotes'].append(remote)
+                for token in set(tokenize(app_id) + tokenize(name)):
+                    token_ids.setdefault(token, set()).add(app_id)
+
+        self._apps = apps
+        self._id_case = {app_id.lower(): app_id for app_id in apps}
+        self._ids = sorted(self._id_case)
+        self._token_ids = token_ids
+        self._tokens = sorted(token_ids)
+
+    def save_remote(self, remote: str, data: Dict):
+        try:
+            self.catalog_dir.mkdir(parents=True, exist_ok=True)
+            path = self.remote_file(remote)
+            tmp_file = path.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_file, path)
+        except OSError:
+            pass
+
+    LISTING_COLUMNS = ('application', 'name', 'branch')
+
+    def list_remote(self, remote: str) -> List[List[str]]:
+        output = run_flatpak(['remote-ls', '--app', columns_arg(self.LISTING_COLUMNS), remote])
+        return [[ref.id, ref.name, ref.branch] for ref in parse_remote_refs(output, self.LISTING_COLUMNS)]
+
+    def refresh(self, remotes: Optional[List[str]] = None, force: bool = False) -> Dict[str, bool]:
+        """Re-list the remotes whose listing is stale; returns remote -> refreshed
+
+        A remote is stale once its TTL has expired and its summary
+        fingerprint differs from the one its listing was built from.
+        """
+        self.ensure_loaded()
+        detector = UpdateDetector(self.config)
+        urls = detector.remote_urls()
+        remotes = remotes or list(urls)
+        now = time.time()
+        refreshed = {}
+
+        for remote in remotes:
+            data = self.remotes.get(remote)
+            if not force and data and now - data.get('checked', 0) < self.ttl:
+                refreshed[remote] = False
+                continue
+
+            fingerprint = detector.summary_fingerprint(urls.get(remote, ''))
+            if not force and data and fingerprint and data.get('fingerprint') == fingerprint:
+                data['checked'] = now
+                self.save_remote(remote, data)
+                refreshed[remote] = False
+                continue
+
+            try:
+                rows = self.list_remote(remote)
+            except FlatpakBackendError:
+                refreshed[remote] = False
+                continue
+            data = {
+                'format': CATALOG_FORMAT,
+                'fingerprint': fingerprint,
+                'checked': now,
+                'apps': rows
+            }
+            self.remotes[remote] = data
+            self.save_remote(remote, data)
+            refreshed[remote] = True
+
+        if any(refreshed.values()):
+            self.build_index()
+        return refreshed
+
+    def covers(self, remotes: List[str]) -> bool:
+        """Whether every given remote has a cached listing"""
+        self.ensure_loaded()
+        return bool(remotes) and all(remote in self.remotes for remote in remotes)
+
+    def get(self, app_id: str) -> Optional[Dict]:
+        """Catalog entry of an app ID, matched exactly (flatpak IDs are case-sensitive)"""
+        self.ensure_loaded()
+        return self._apps.get(app_id)
+
+    def resolve(self, app_id: str, preferred: Optional[List[str]] = None) -> List[str]:
+        """Remotes providing an app, ordered by the preferred remotes first"""
+        entry = self.get(app_id)
+        if not entry:
+            return []
+        remotes = entry['remotes']
+        if not preferred:
+            return list(remotes)
+        order = {remote: index for index, remote in enumerate(preferred)}
+        return sorted(remotes, key=lambda remote: order.get(remote, len(order)))
+
+    def validate(self, app_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """Split app IDs into (known, unknown)"""
+        known, unknown = [], []
+        for app_id in app_ids:
+            (known if self.get(app_id) else unknown).append(app_id)
+        return known, unknown
+
+    def prefix_search(self, prefix: str, limit: int = 20) -> List[str]:
+        """App IDs starting with prefix (case-insensitive)"""
+        self.ensure_loaded()
+        prefix = prefix.lower()
+        results = []
+        index = bisect.bisect_left(self._ids, prefix)
+        while index < len(self._ids) and self._ids[index].startswith(prefix) and len(results) < limit:
+            results.append(self._id_case[self._ids[index]])
+            index += 1
+        return results
+
+    def token_matches(self, token: str) -> Set[str]:
+        """App IDs with an ID or name token starting with token"""
+        matches = set()
+        index = bisect.bisect_left(self._tokens, token)
+        while index < len(self._tokens) and self._tokens[index].startswith(token):
+            matches |= self._token_ids[self._tokens[index]]
+            index += 1
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """App IDs matching a query: ID prefix matches first, then apps
+        matching every query token"""
+        self.ensure_loaded()
+        results = self.prefix_search(query, limit)
+
+        tokens = tokenize(query)
+        if tokens and len(results) < limit:
+            matches = self.token_matches(tokens[0])
+            for token in tokens[1:]:
+                matches &= self.token_matches(token)
+            for app_id in sorted(matches):
+                if app_id not in results:
+                    results.append(app_id)
+                    if len(results) >= limit:
+                        break
+        return results
+
+    def suggest(self, app_id: str, limit: int = 3) -> List[str]:
+        """Likely intended app IDs for an unknown one (the correctly cased ID first)"""
+        self.ensure_loaded()
+        cased = self._id_case.get(app_id.lower())
+        if cased:
+            return [cased] + [match for match in self.search(app_id, limit) if match != cased][:limit - 1]
+        suggestions = self.search(app_id, limit)
+        if not suggestions:
+            # Fall back to the last component, e.g. "Firefox" of org.mozilla.Firefox
+            suggestions = self.search(app_id.rsplit('.', 1)[-1], limit)
+        if not suggestions:
+            # Misspelled IDs
+            import difflib
+            matches = difflib.get_close_matches(app_id.lower(), self._ids, n=limit, cutoff=0.8)
+            suggestions = [self._id_case[match] for match in matches]
+        return suggestions
+
+def get_catalog(config=None) -> FlatpackCatalog:
+    """Factory function to open the catalog index"""
+    return FlatpackCatalog(config)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Catalog Index")
+    parser.add_argument("--refresh", action="store_true", help="Refresh stale remote listings")
+    parser.add_argument("--force", action="store_true", help="With --refresh: re-list every remote")
+    parser.add_argument("--search", metavar="QUERY", help="Search app IDs and names")
+    parser.add_argument("--resolve", nargs="+", metavar="APP_ID", help="Show the remotes providing each app")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of search results")
+
+    args = parser.parse_args()
+    catalog = get_catalog()
+
+    if args.refresh:
+        for remote, refreshed in catalog.refresh(force=args.force).items():
+            print(f"{remote}: {'refreshed' if refreshed else 'up to date'}")
+
+    catalog.ensure_loaded()
+    if args.search:
+        start_time = time.perf_counter()
+        results = catalog.search(args.search, args.limit)
+        elapsed = (time.perf_counter() - start_time) * 1e6
+        for app_id in results:
+            entry = catalog.get(app_id)
+            print(f"{app_id:<45} {entry['name']:<30} {', '.join(entry['remotes'])}")
+        print(f"{len(results)} result(s) in {elapsed:.0f} µs")
+    elif args.resolve:
+        for app_id in args.resolve:
+            remotes = catalog.resolve(app_id)
+            if remotes:
+                print(f"{app_id}: {', '.join(remotes)}")
+            else:
+                suggestions = catalog.suggest(app_id)
+                hint = f" (did you mean {', '.join(suggestions)}?)" if suggestions else ""
+                print(f"{app_id}: not found{hint}")
+    elif not args.refresh:
+        for remote, data in sorted(catalog.remotes.items()):
+            age = time.time() - data.get('checked', 0)
+            print(f"{remote:<20} {len(data.get('apps', [])):>6} apps  checked {age:.0f}s ago")
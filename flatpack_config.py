@@ -7,16 +7,30 @@ Handles user preferences, custom package lists, and system-specific optimization
 
 import json
 import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional
-import subprocess
+from typing import Dict, List, Any, Optional, Tuple
+
+# Seconds between checks of config.json for changes made by other processes
+RELOAD_CHECK_INTERVAL = 1.0
+
+# Distribution detection result, shared by every FlatpackConfig in the process
+_detected_distro: Optional[str] = None
 
 class FlatpackConfig:
     def __init__(self):
         self.config_dir = Path.home() / '.config' / 'flatpack'
         self.config_file = self.config_dir / 'config.json'
         self.custom_packages_file = self.config_dir / 'custom_packages.json'
+        
+        # Dot-notation key -> value index over self.config, rebuilt on (re)load
+        self._index: Dict[str, Any] = {}
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._next_reload_check = 0.0
+        
         self.config = self.load_config()
+        self.rebuild_index()
         
         # Ensure config directory exists
         self.config_dir.mkdir(parents=True, exist_ok=True)
@@ -40,7 +54,8 @@ class FlatpackConfig:
                 "interactive_timeouts": 10,
                 "show_progress": True,
                 "colored_output": True,
-                "log_level": "info"
+                "log_level": "info",
+                "log_format": "text"
             },
             "update_behavior": {
                 "smart_update_default": True,
@@ -58,16 +73,56 @@ class FlatpackConfig:
             "performance": {
                 "use_mirrors": True,
                 "parallel_operations": True,
+                "concurrent_update_phases": False,
+                "split_download_deploy": True,
+                "pull_workers": 6,
+                "deploy_workers": 2,
+                "flatpak_backend": "auto",
+                "update_detection": "commit",
+                "update_check_ttl": 300,
+                "catalog_ttl": 21600,
+                "scheduling_policy": "priority",
+                "remote_selection": "fastest",
+                "probe_ttl": 60,
+                "probe_timeout": 5.0,
+                "connectivity_endpoints": ["dl.flathub.org:443", "1.1.1.1:53", "8.8.8.8:53"],
                 "cache_cleanup_days": 7,
                 "optimize_for_ssd": True
             },
+            "installer": {
+                "max_retries": 3,
+                "skip_already_installed": True,
+                "repository_priority": "flathub",
+                "custom_apps": [],
+                "validate_app_ids": True
+            },
+            "plugins": {
+                "lazy_loading": True,
+                "coprocess_timeout": 30,
+                "hook_timeout": 10,
+                "observer_workers": 4,
+                "auto_disable_slow": False,
+                "slow_hook_limit": 3
+            },
+            "daemon": {
+                "refresh_interval": 300,
+                "health_interval": 60,
+                "watch_interval": 2,
+                "reclaim_interval": 0
+            },
             "custom_repositories": [],
             "excluded_packages": [],
             "priority_packages": []
         }
     
     def detect_cachyos(self) -> str:
-        """Detect if running on CachyOS or other Arch-based distros"""
+        """Detect if running on CachyOS or other Arch-based distros (cached per process)"""
+        global _detected_distro
+        if _detected_distro is None:
+            _detected_distro = self._detect_distro()
+        return _detected_distro
+    
+    def _detect_distro(self) -> str:
         try:
             # Check /etc/os-release
             if os.path.exists('/etc/os-release'):
@@ -113,9 +168,18 @@ class FlatpackConfig:
                 "use_color": "never"
             }
     
+    def get_file_signature(self) -> Optional[Tuple[int, int]]:
+        """(mtime, size) of the config file, or None if it does not exist"""
+        try:
+            stat = self.config_file.stat()
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+    
     def load_config(self) -> Dict[str, Any]:
         """Load configuration from file or create default"""
-        if self.config_file.exists():
+        self._file_signature = self.get_file_signature()
+        if self._file_signature is not None:
             try:
                 with open(self.config_file, 'r') as f:
                     config = json.load(f)
@@ -140,11 +204,40 @@ class FlatpackConfig:
                 result[key] = value
         return result
     
+    def rebuild_index(self):
+        """Flatten the config into a dot-notation index used by get()"""
+        index = {}
+        
+        def flatten(prefix: str, value: Any):
+            index[prefix] = value
+            if isinstance(value, dict):
+                for key, child in value.items():
+                    flatten(f"{prefix}.{key}", child)
+        
+        for key, value in self.config.items():
+            flatten(key, value)
+        self._index = index
+    
+    def reload(self):
+        """Re-read the config file and rebuild the key index"""
+        self.config = self.load_config()
+        self.rebuild_index()
+    
+    def reload_if_changed(self):
+        """Reload when config.json's mtime or size changed (checked at most once per interval)"""
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        self._next_reload_check = now + RELOAD_CHECK_INTERVAL
+        if self.get_file_signature() != self._file_signature:
+            self.reload()
+    
     def save_config(self) -> bool:
         """Save current configuration to file"""
         try:
             with open(self.config_file, 'w') as f:
                 json.dump(self.config, f, indent=2)
+            self._file_signature = self.get_file_signature()
             return True
         except Exception as e:
             print(f"Error saving config: {e}")
@@ -152,16 +245,8 @@ class FlatpackConfig:
     
     def get(self, key_path: str, default: Any = None) -> Any:
         """Get configuration value using dot notation (e.g., 'preferences.auto_confirm')"""
-        keys = key_path.split('.')
-        value = self.config
-        
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                return default
-        
-        return value
+        self.reload_if_changed()
+        return self._index.get(key_path, default)
     
     def set(self, key_path: str, value: Any) -> bool:
         """Set configuration value using dot notation"""
@@ -176,6 +261,7 @@ class FlatpackConfig:
         
         # Set the value
         config_ref[keys[-1]] = value
+        self.rebuild_index()
         return self.save_config()
     
     def add_custom_package_list(self, name: str, packages: List[str], description: str = "") -> bool:
@@ -282,9 +368,17 @@ class FlatpackConfig:
         print()
 
 # Convenience functions for other modules
+_config_instance: Optional[FlatpackConfig] = None
+_config_lock = threading.Lock()
+
 def get_config() -> FlatpackConfig:
-    """Get global config instance"""
-    return FlatpackConfig()
+    """Get global config instance (loaded once per process, reloaded when the file changes)"""
+    global _config_instance
+    if _config_instance is None:
+        with _config_lock:
+            if _config_instance is None:
+                _config_instance = FlatpackConfig()
+    return _config_instance
 
 def get_setting(key: str, default: Any = None) -> Any:
     """Quick access to configuration settings"""
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Flatpack Daemon (flatpackd)
+
+Optional user-level daemon that keeps the installed-app inventory, the
+latest update-check result, the configuration and recent health samples in
+memory and serves them over a UNIX socket, so `flatpack --list/--check`
+answer without loading config, detecting the distro or running flatpak.
+
+The daemon watches the installations' change markers and re-reads the
+inventory as soon as anything is deployed or removed; update checks and
+health samples are refreshed every daemon.refresh_interval and
+daemon.health_interval seconds. With daemon.reclaim_interval set (0, the
+default, disables it) and update_behavior.cleanup_after_update on, the
+flatpack_reclaim stages run every daemon.reclaim_interval seconds.
+
+Requests and responses are one JSON object per line:
+
+    {"command": "check", "refresh": false}
+    {"ok": true, "result": [...], "updated": 1700000000.0}
+
+The client side (query_daemon) only needs the standard library, and
+returns None whenever no daemon answers so callers can fall back to
+querying directly.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+SOCKET_NAME = 'flatpackd.sock'
+CLIENT_TIMEOUT = 2.0
+REFRESH_TIMEOUT = 120.0  # Requests with refresh=True wait for the daemon's network refresh
+COMMANDS = ('ping', 'status', 'list', 'check', 'config', 'refresh', 'shutdown')
+
+DEFAULT_REFRESH_INTERVAL = 300
+DEFAULT_HEALTH_INTERVAL = 60
+DEFAULT_WATCH_INTERVAL = 2.0
+DEFAULT_RECLAIM_INTERVAL = 0  # Unattended reclamation is opt-in
+HEALTH_HISTORY = 60
+
+def socket_path() -> Path:
+    """Socket location: $FLATPACKD_SOCKET, else under $XDG_RUNTIME_DIR or ~/.cache"""
+    override = os.environ.get('FLATPACKD_SOCKET')
+    if override:
+        return Path(override)
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    base = Path(runtime_dir) / 'flatpack' if runtime_dir else Path.home() / '.cache' / 'flatpack'
+    return base / SOCKET_NAME
+
+def query_daemon(command: str, timeout: Optional[float] = None,
+                 path: Optional[Path] = None, **params) -> Optional[Dict[str, Any]]:
+    """Send one request to a running daemon
+
+    Returns the response, or None if no daemon is listening, it did not
+    answer in time, or it reported an error (FLATPACK_NO_DAEMON=1 disables
+    the lookup). The timeout defaults to CLIENT_TIMEOUT, or REFRESH_TIMEOUT
+    for refresh=True requests, which the daemon answers only after
+    re-checking the remotes; giving up on those early would just repeat
+    the same network work in the direct fallback.
+    """
+    if os.environ.get('FLATPACK_NO_DAEMON'):
+        return None
+    if timeout is None:
+        timeout = REFRESH_TIMEOUT if params.get('refresh') else CLIENT_TIMEOUT
+    path = Path(path) if path else socket_path()
+    if not path.exists():
+        return None
+
+    request = dict(params, command=command)
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        response = json.loads(data)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(response, dict) or not response.get('ok'):
+        return None
+    return response
+
+def daemon_running(path: Optional[Path] = None) -> bool:
+    return query_daemon('ping', timeout=0.5, path=path) is not None
+
+class FlatpackDaemon:
+    """Warm caches behind a UNIX-socket request server"""
+
+    def __init__(self, config=None, path: Optional[Path] = None):
+        from flatpack_config import get_config
+        from flatpack_health import SystemHealthMonitor
+        from flatpack_updates import UpdateDetector
+
+        self.config = config or get_config()
+        self.path = Path(path) if path else socket_path()
+        self.refresh_interval = self.config.get('daemon.refresh_interval', DEFAULT_REFRESH_INTERVAL)
+        self.health_interval = self.config.get('daemon.health_interval', DEFAULT_HEALTH_INTERVAL)
+        self.watch_interval = self.config.get('daemon.watch_interval', DEFAULT_WATCH_INTERVAL)
+        self.reclaim_interval = self.config.get('daemon.reclaim_interval', DEFAULT_RECLAIM_INTERVAL)
+        self.reclaim_thread: Optional[threading.Thread] = None
+
+        self.detector = UpdateDetector(self.config)
+        self.backend = self.detector.backend
+        self.health = SystemHealthMonitor(self.config)
+
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()  # One inventory/update refresh at a time
+        self.stop_event = threading.Event()
+        self.server = None
+        self.started = time.time()
+        self.requests = 0
+
+        self.inventory: Optional[List[Dict]] = None
+        self.inventory_updated = 0.0
+        self.signature = None
+        self.updates: Optional[List[str]] = None
+        self.updates_updated = 0.0
+        self.updates_error: Optional[str] = None
+        self.health_samples: List[Dict] = []
+
+    # Warm state
+
+    def refresh_inventory(self):
+        from flatpack_backend import FlatpakBackendError
+
+        signature = self.detector.installation_signature()
+        try:
+            inventory = [ref.to_dict() for ref in self.backend.list_installed()]
+        except FlatpakBackendError as e:
+            print(f"⚠️  Inventory refresh failed: {e}")
+            return
+        with self.lock:
+            self.inventory = inventory
+            self.inventory_updated = time.time()
+            self.signature = signature
+
+    def refresh_updates(self, refresh: bool = False):
+        from flatpack_backend import FlatpakBackendError
+
+        method = self.config.get('performance.update_detection', 'commit')
+        try:
+            if method == 'commit':
+                updates, error = self.detector.check(refresh=refresh), None
+            elif method == 'backend':
+                updates, error = self.backend.list_updates(), None
+            else:
+                # Dry-run transactions are left to the CLI
+                updates, error = None, f"update detection method '{method}' is not served"
+        except FlatpakBackendError as e:
+            updates, error = None, str(e)
+        if updates is not None:
+            from flatpack_patterns import get_package_filter
+            updates = get_package_filter(self.config).apply(updates)[0]
+        with self.lock:
+            if updates is not None:
+                self.updates = updates
+                self.updates_updated = time.time()
+            self.updates_error = error
+
+    def sample_health(self):
+        from dataclasses import asdict
+
+        metrics = self.health.get_current_metrics()
+        sample = asdict(metrics)
+        status = self.health.check_health_status(metrics)
+        sample.update(status=status['status'], issues=status['issues'], warnings=status['warnings'])
+        with self.lock:
+            self.health_samples.append(sample)
+            del self.health_samples[:-HEALTH_HISTORY]
+
+    def reclaim(self):
+        from flatpack_reclaim import get_reclaimer
+
+        report = get_reclaimer(self.config).run()
+        print(f"🧹 Reclaimed {report.reclaimed / 1024 ** 2:.1f} MB in {report.duration:.1f}s")
+
+    def start_reclaim_if_due(self):
+        """Run the reclamation stage in the background every daemon.reclaim_interval seconds"""
+        from flatpack_reclaim import reclaim_due
+
+        if not self.config.get('update_behavior.cleanup_after_update', True):
+            return
+        if self.reclaim_thread and self.reclaim_thread.is_alive():
+            return
+        if reclaim_due(self.reclaim_interval):
+            self.reclaim_thread = threading.Thread(target=self.reclaim, daemon=True)
+            self.reclaim_thread.start()
+
+    def refresh_all(self, refresh: bool = False):
+        with self.refresh_lock:
+            self.refresh_inventory()
+            self.refresh_updates(refresh)
+
+    def refresh_loop(self):
+        """Re-read whatever is stale until the daemon stops"""
+        next_updates = next_health = 0.0
+        while not self.stop_event.is_set():
+            now = time.time()
+            try:
+                if self.detector.installation_signature() != self.signature:
+                    # Something was deployed or removed: re-read the inventory
+                    # and re-compare commits (remote listings stay cached)
+                    with self.refresh_lock:
+                        self.refresh_inventory()
+                        self.refresh_updates()
+                    next_updates = now + self.refresh_interval
+                elif now >= next_updates:
+                    with self.refresh_lock:
+                        self.refresh_updates()
+                    next_updates = now + self.refresh_interval
+                if now >= next_health:
+                    self.sample_health()
+                    next_health = now + self.health_interval
+                    self.start_reclaim_if_due()
+            except Exception as e:
+                print(f"⚠️  Background refresh error: {e}")
+            self.stop_event.wait(self.watch_interval)
+
+    # Requests
+
+    def inventory_by_id(self) -> Dict[str, Dict]:
+        return {app['id']: app for app in self.inventory or []}
+
+    def handle_request(self, request: Dict) -> Dict[str, Any]:
+        command = request.get('command')
+        with self.lock:
+            self.requests += 1
+
+        if command == 'ping':
+            return {'ok': True, 'result': 'pong', 'pid': os.getpid()}
+
+        if command == 'list':
+            if self.inventory is None:
+                self.refresh_all()
+            with self.lock:
+                if self.inventory is None:
+                    return {'ok': False, 'error': 'inventory unavailable'}
+                return {'ok': True, 'result': self.inventory, 'updated': self.inventory_updated}
+
+        if command == 'check':
+            if request.get('refresh') or self.updates is None:
+                self.refresh_all(refresh=bool(request.get('refresh')))
+            with self.lock:
+                if self.updates is None:
+                    return {'ok': False, 'error': self.updates_error or 'update check unavailable'}
+                apps = self.inventory_by_id()
+                result = [apps.get(app_id, {'id': app_id}) for app_id in self.updates]
+                return {'ok': True, 'result': result, 'updated': self.updates_updated}
+
+        if command == 'config':
+            key = request.get('key')
+            if not key:
+                return {'ok': False, 'error': 'config requires a key'}
+            return {'ok': True, 'result': self.config.get(key)}
+
+        if command == 'status':
+            return {'ok': True, 'result': self.status()}
+
+        if command == 'refresh':
+            threading.Thread(target=self.refresh_all, args=(True,), daemon=True).start()
+            return {'ok': True, 'result': 'refresh started'}
+
+        if command == 'shutdown':
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {'ok': True, 'result': 'shutting down'}
+
+        return {'ok': False, 'error': f"unknown command: {command}"}
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'socket': str(self.path),
+                'uptime': time.time() - self.started,
+                'requests': self.requests,
+                'backend': self.backend.name,
+                'distro': self.config.get('distro_info.detected'),
+                'installed': len(self.inventory) if self.inventory is not None else None,
+                'inventory_updated': self.inventory_updated,
+                'updates': len(self.updates) if self.updates is not None else None,
+                'updates_updated': self.updates_updated,
+                'updates_error': self.updates_error,
+                'health': self.health_samples[-1] if self.health_samples else None
+            }
+
+    # Server
+
+    def bind(self):
+        """Create the server socket, replacing a stale one"""
+        import socketserver
+
+        daemon = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        response = daemon.handle_request(request if isinstance(request, dict) else {})
+                    except ValueError:
+                        response = {'ok': False, 'error': 'malformed request'}
+                    except Exception as e:
+                        response = {'ok': False, 'error': str(e)}
+                    self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+                    self.wfile.flush()
+
+        class Server(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        if self.path.exists():
+            if daemon_running(self.path):
+                raise RuntimeError(f"flatpackd is already running on {self.path}")
+            self.path.unlink()
+        self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+        old_umask = os.umask(0o077)  # Socket is only accessible to this user
+        try:
+            self.server = Server(str(self.path), RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def serve(self):
+        """Warm the caches and serve until stopped"""
+        import signal
+
+        self.bind()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: threading.Thread(target=self.stop, daemon=True).start())
+
+        refresher = threading.Thread(target=self.refresh_loop, daemon=True)
+        refresher.start()
+        print(f"🚀 flatpackd listening on {self.path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop_event.set()
+            self.server.server_close()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            print("👋 flatpackd stopped")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.server:
+            self.server.shutdown()
+
+def get_daemon(config=None) -> FlatpackDaemon:
+    """Factory function to create the daemon"""
+    return FlatpackDaemon(config)
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Flatpack Daemon (flatpackd)")
+    parser.add_argument("--status", action="store_true", help="Show the status of the running daemon")
+    parser.add_argument("--refresh", action="store_true", help="Ask the running daemon to refresh its caches")
+    parser.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    parser.add_argument("--socket", type=Path, help=f"Socket path (default: {socket_path()})")
+
+    args = parser.parse_args()
+
+    if args.status or args.refresh or args.stop:
+        command = 'status' if args.status else 'refresh' if args.refresh else 'shutdown'
+        response = query_daemon(command, path=args.socket)
+        if response is None:
+            print("❌ flatpackd is not running")
+            sys.exit(1)
+        if not args.status:
+            print(f"✅ {response['result']}")
+            sys.exit(0)
+
+        status = response['result']
+        now = time.time()
+        print(f"✅ flatpackd running (pid {status['pid']}, up {status['uptime']:.0f}s, "
+              f"{status['requests']} requests)")
+        print(f"   Socket:    {status['socket']}")
+        print(f"   Backend:   {status['backend']} on {status['distro']}")
+        if status['installed'] is not None:
+            print(f"   Installed: {status['installed']} apps "
+                  f"(read {now - status['inventory_updated']:.0f}s ago)")
+        if status['updates'] is not None:
+            print(f"   Updates:   {status['updates']} available "
+                  f"(checked {now - status['updates_updated']:.0f}s ago)")
+        if status['updates_error']:
+            print(f"   ⚠️  Last update check failed: {status['updates_error']}")
+        health = status['health']
+        if health:
+            icon = '✅' if health['status'] == 'healthy' else '⚠️ '
+            print(f"   Health:    {icon} {health['status']}, {health['disk_free_gb']:.1f} GB free, "
+                  f"network {'up' if health['network_connected'] else 'down'}")
+        sys.exit(0)
+
+    sys.stdout.reconfigure(line_buffering=True)  # Log lines reach journald/log files promptly
+    try:
+        FlatpackDaemon(path=args.socket).serve()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
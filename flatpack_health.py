@@ -8,19 +8,16 @@ network connectivity, memory usage, and performance metrics.
 
 import os
 import shutil
-import subprocess
 import time
 import threading
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 import json
+import importlib.util
 
-try:
-    import psutil
-    HAS_PSUTIL = True
-except ImportError:
-    HAS_PSUTIL = False
+# psutil is optional and slow to import, so it is only imported where used
+HAS_PSUTIL = importlib.util.find_spec('psutil') is not None
 
 @dataclass
 class HealthMetrics:
@@ -79,6 +76,7 @@ class SystemHealthMonitor:
         """Check if temperature sensors are available"""
         if HAS_PSUTIL:
             try:
+                import psutil
                 temps = psutil.sensors_temperatures()
                 return len(temps) > 0
             except:
@@ -105,6 +103,7 @@ class SystemHealthMonitor:
         # Memory and CPU (with psutil if available)
         if HAS_PSUTIL:
             try:
+                import psutil
                 memory = psutil.virtual_memory()
                 memory_available_gb = memory.available / (1024**3)
                 memory_used_percent = memory.percent
@@ -161,31 +160,21 @@ class SystemHealthMonitor:
         return 0.0
     
     def check_network_connectivity(self) -> bool:
-        """Check network connectivity"""
-        try:
-            # Try to ping a reliable DNS server
-            result = subprocess.run(
-                ['ping', '-c', '1', '-W', '2', '8.8.8.8'],
-                capture_output=True, text=True, timeout=5
-            )
-            return result.returncode == 0
-        except:
-            return False
+        """Check network connectivity (concurrent TCP connects, no ping binary needed)"""
+        from flatpack_probe import get_prober
+        
+        return get_prober(self.config).check_connectivity()
     
     def check_flatpak_repos(self) -> bool:
-        """Check if Flatpak repositories are accessible"""
+        """Check if any configured Flatpak remote answers an HTTP HEAD"""
         if not shutil.which('flatpak'):
             return False
         
-        try:
-            # Try to list remotes (should be fast)
-            result = subprocess.run(
-                ['flatpak', 'remotes', '--columns=name'],
-                capture_output=True, text=True, timeout=10
-            )
-            return result.returncode == 0 and len(result.stdout.strip()) > 0
-        except:
-            return False
+        from flatpack_probe import get_prober
+        
+        # All remotes are probed at once; results are cached for performance.probe_ttl
+        probes = get_prober(self.config).probe_remotes()
+        return any(probe.reachable for probe in probes.values())
     
     def get_temperature_readings(self) -> Optional[Dict[str, float]]:
         """Get system temperature readings"""
@@ -193,6 +182,7 @@ class SystemHealthMonitor:
         
         if HAS_PSUTIL:
             try:
+                import psutil
                 temps = psutil.sensors_temperatures()
                 for name, entries in temps.items():
                     if entries:
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Flatpack Installation Engine
+
+Python port of the core install path of install_flatpaks.sh, built on
+ParallelOperationManager. install_flatpaks.sh hands its app list to this
+engine and keeps only the presentation and post-install features.
+"""
+
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
+
+import flatpack
+from flatpack_api import StepResult
+from flatpack_parallel import ParallelOperationManager, PackageOperation
+from flatpack_parser import parse_names
+from flatpack_remotes import get_remote_selector, selection_enabled
+
+if TYPE_CHECKING:
+    from flatpack_api import FlatpackSession
+
+# Mirrors the application list of install_flatpaks.sh
+DEFAULT_APPLICATIONS = [
+    # Original gaming/media apps
+    "media.emby.EmbyTheater",
+    "com.stremio.Stremio",
+    "io.mrarm.mcpelauncher",
+    "org.vinegarhq.Sober",
+    "io.github.kolunmi.Bazaar",
+    "org.vinegarhq.Vinegar",
+
+    # SteamDeck/Bazzite essentials
+    "net.lutris.Lutris",
+    "com.heroicgameslauncher.hgl",
+    "com.discordapp.Discord",
+    "com.spotify.Client",
+    "org.keepassxc.KeePassXC",
+    "com.github.tchx84.Flatseal"
+]
+
+# Essential app set installed on desktop Linux systems
+DESKTOP_APPLICATIONS = [
+    "com.discordapp.Discord",
+    "com.spotify.Client",
+    "org.keepassxc.KeePassXC",
+    "com.github.tchx84.Flatseal",
+    "net.lutris.Lutris",
+    "com.heroicgameslauncher.hgl"
+]
+
+APP_NAMES = {
+    "media.emby.EmbyTheater": "Emby Theater",
+    "com.stremio.Stremio": "Stremio",
+    "io.mrarm.mcpelauncher": "Minecraft PE Launcher",
+    "org.vinegarhq.Sober": "Sober (Roblox Client)",
+    "io.github.kolunmi.Bazaar": "Bazaar Game Launcher",
+    "org.vinegarhq.Vinegar": "Vinegar (Roblox Studio)",
+    "net.lutris.Lutris": "Lutris (Wine Game Manager)",
+    "com.heroicgameslauncher.hgl": "Heroic Games Launcher",
+    "com.discordapp.Discord": "Discord",
+    "com.spotify.Client": "Spotify",
+    "org.keepassxc.KeePassXC": "KeePassXC (Password Manager)",
+    "com.github.tchx84.Flatseal": "Flatseal (Permissions Manager)"
+}
+
+FLATHUB_URL = "https://flathub.org/repo/flathub.flatpakrepo"
+
+class FlatpakInstaller:
+    """Python port of the core install path of install_flatpaks.sh
+
+    Picks the app set for the detected system, skips apps that are already
+    installed (from one inventory snapshot) and installs the rest in parallel
+    through ParallelOperationManager, retrying each app on every candidate
+    repository. The shell script's presentation features (title screens,
+    shortcuts, Steam integration) are not part of the port.
+    """
+
+    def __init__(self, session: 'FlatpackSession'):
+        self.session = session
+        self._remote_selector = None
+
+    def get_setting(self, key: str, default: Any) -> Any:
+        return self.session.config.get(f'installer.{key}', default)
+
+    def detect_system_type(self) -> str:
+        """Detect SteamOS/Bazzite/gaming distributions like the shell installer"""
+        os_release = {}
+        try:
+            with open('/etc/os-release', 'r') as f:
+                for line in f:
+                    if '=' in line:
+                        key, value = line.strip().split('=', 1)
+                        os_release[key] = value.strip('"')
+        except OSError:
+            return "desktop_linux"
+
+        os_id = os_release.get('ID', '')
+        name = os_release.get('NAME', '')
+        if os_id == 'steamos' or 'SteamOS' in name:
+            return "steamdeck"
+        if 'Bazzite' in name or 'bazzite' in os_id:
+            return "bazzite"
+        if 'ChimeraOS' in name or 'HoloISO' in name:
+            return "gaming_distro"
+        return "desktop_linux"
+
+    def get_applications(self) -> List[str]:
+        """App set for this system plus the configured custom apps"""
+        if self.detect_system_type() == "desktop_linux":
+            applications = list(DESKTOP_APPLICATIONS)
+        else:
+            applications = list(DEFAULT_APPLICATIONS)
+
+        for app_spec in self.get_setting('custom_apps', []):
+            if app_spec not in applications:
+                applications.append(app_spec)
+        return applications
+
+    def parse_app_spec(self, app_spec: str) -> Tuple[Optional[str], str]:
+        """Split a 'repo:app.id' specification into repository and app ID"""
+        if ':' in app_spec:
+            repo, app_id = app_spec.split(':', 1)
+            return repo, app_id
+        return None, app_spec
+
+    def get_custom_repositories(self) -> Dict[str, str]:
+        """Custom repositories from config as name -> .flatpakrepo URL"""
+        repositories = {}
+        for entry in self.session.config.get('custom_repositories', []):
+            if isinstance(entry, dict):
+                name, url = entry.get('name'), entry.get('url')
+            elif entry.startswith(('http://', 'https://')):
+                # Bare URL: name the repository after the .flatpakrepo file
+                url = entry
+                name = os.path.basename(url).replace('.flatpakrepo', '').lower()
+            else:
+                name, url = entry.split(':', 1)
+            if name and url:
+                repositories[name] = url
+        return repositories
+
+    def get_installation_repositories(self) -> List[str]:
+        """Repositories to try, ordered by installer.repository_priority"""
+        priority = self.get_setting('repository_priority', 'flathub')
+        custom = list(self.get_custom_repositories())
+
+        if priority == 'flathub':
+            return ['flathub']
+        if priority == 'custom':
+            return custom
+        return ['flathub'] + custom
+
+    def ensure_repositories(self) -> bool:
+        """Add Flathub and the configured custom repositories if missing"""
+        result = flatpack.run_command(['flatpak', 'remotes', '--columns=name'])
+        existing = set(parse_names(result.stdout)) if result.returncode == 0 else set()
+
+        repositories = {'flathub': FLATHUB_URL}
+        repositories.update(self.get_custom_repositories())
+
+        success = True
+        for name, url in repositories.items():
+            if name in existing:
+                continue
+            print(f"[REPO] Adding Flatpak repository: {name}")
+            added = flatpack.run_command(['flatpak', 'remote-add', '--if-not-exists', name, url])
+            if added.returncode != 0:
+                self.session.logger.logger.warning(f"Failed to add repository {name} ({url})")
+                success = False
+        return success
+
+    def resolve_with_catalog(self, app_specs: List[str],
+                             repositories: List[str]) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """Resolve apps against the catalog index before anything is queued
+
+        Returns (resolved, unknown): the repositories that provide each app,
+        in priority order, and suggestions for every app no candidate
+        repository provides. Both are empty if the catalog does not cover
+        the repositories (e.g. it could not be refreshed).
+        """
+        from flatpack_catalog import FlatpackCatalog
+
+        catalog = FlatpackCatalog(self.session.config)
+        catalog.refresh(repositories)
+        if not catalog.covers(repositories):
+            return {}, {}
+
+        resolved, unknown = {}, {}
+        for app_spec in app_specs:
+            specified_repo, app_id = self.parse_app_spec(app_spec)
+            if specified_repo:
+                continue
+            providers = catalog.resolve(app_id, repositories)
+            candidates = [repo for repo in providers if repo in repositories]
+            if candidates:
+                resolved[app_id] = candidates
+            elif providers:
+                # Provided by a configured remote that is not a candidate
+                unknown[app_id] = [f"{repo}:{app_id}" for repo in providers]
+            else:
+                unknown[app_id] = catalog.suggest(app_id)
+        return resolved, unknown
+
+    def create_install_operations(self, app_specs: List[str],
+                                  repositories: Optional[List[str]] = None,
+                                  max_retries: Optional[int] = None,
+                                  resolved: Optional[Dict[str, List[str]]] = None) -> List[PackageOperation]:
+        """One install operation per app, falling back across candidate repositories
+
+        resolved maps app IDs to the repositories known to provide them
+        (see resolve_with_catalog); those are tried instead of every
+        candidate repository. With performance.remote_selection "fastest"
+        each app's repositories are tried fastest healthy one first.
+        """
+        resolved = resolved or {}
+        if max_retries is None:
+            max_retries = int(self.get_setting('max_retries', 3))
+        max_retries = max(1, max_retries)
+        repositories = repositories or self.get_installation_repositories()
+
+        candidates = list(dict.fromkeys(repositories + [repo for repos in resolved.values() for repo in repos]))
+        if len(candidates) > 1 and selection_enabled(self.session.config):
+            order = {repo: index for index, repo in enumerate(self.remote_selector.rank(candidates))}
+            repositories = sorted(repositories, key=order.get)
+            resolved = {app_id: sorted(repos, key=order.get) for app_id, repos in resolved.items()}
+
+        operations = []
+        for i, app_spec in enumerate(app_specs):
+            specified_repo, app_id = self.parse_app_spec(app_spec)
+            repos = [specified_repo] if specified_repo else resolved.get(app_id, repositories)
+            if not repos:
+                continue  # No repository to install from (install() fails these up front)
+            commands = [['flatpak', 'install', '--noninteractive', repo, app_id] for repo in repos]
+
+            operations.append(PackageOperation(
+                operation_type="install",
+                package_name=app_id,
+                package_manager="flatpak",
+                command=commands[0],
+                fallback_commands=commands[1:],
+                retries=max_retries - 1,
+                retry_delay=2.0,
+                priority=100 - i,
+                estimated_duration=45.0,
+                split_phases=True
+            ))
+        return operations
+
+    @property
+    def remote_selector(self):
+        if self._remote_selector is None:
+            self._remote_selector = get_remote_selector(self.session.config)
+        return self._remote_selector
+
+    def record_remote_results(self, results: List) -> None:
+        """Score each repository by how the installs from it went
+
+        Every repository an install tried is scored on its own attempts: a
+        failure if none of them succeeded, otherwise the time its successful
+        attempts took (the pull and deploy in two-phase runs), leaving out
+        retries and the repositories tried before it.
+        """
+        recorded = False
+        for result in results:
+            app_id = result.operation.package_name
+            succeeded: Dict[str, float] = {}
+            tried = []
+            for attempt in result.attempts:
+                # flatpak install [flags] <repo> <app>
+                if len(attempt.command) < 2 or attempt.command[-1] != app_id:
+                    continue
+                repo = attempt.command[-2]
+                if repo not in tried:
+                    tried.append(repo)
+                if attempt.success:
+                    succeeded[repo] = succeeded.get(repo, 0.0) + attempt.duration
+            for repo in tried:
+                if repo in succeeded:
+                    self.remote_selector.record_operation(repo, succeeded[repo], True,
+                                                          result.operation.download_size)
+                else:
+                    self.remote_selector.record_operation(repo, 0.0, False)
+                recorded = True
+        if recorded:
+            self.remote_selector.save()
+
+    def install(self, app_specs: Optional[List[str]] = None,
+                repositories: Optional[List[str]] = None,
+                jobs: Optional[int] = None,
+                max_retries: Optional[int] = None,
+                skip_installed: Optional[bool] = None,
+                resume: bool = True) -> StepResult:
+        """Install the given apps (the system's default app set if none are given)
+
+        Installed apps are detected from a single inventory snapshot. When
+        repositories are given they are assumed to be configured already.
+        Every state transition goes to the session's operation journal; with
+        resume, apps an interrupted run already installed are skipped if
+        they are still installed, and without it the journal is discarded
+        first. The journal is cleared once every app has been installed, and
+        otherwise closed so the run is not resumed later.
+        """
+        with self.session.locks['flatpak']:
+            start_time = time.time()
+            app_specs = app_specs if app_specs is not None else self.get_applications()
+            inventory = self.session.inventory
+            log = self.session.logger.logger
+            if skip_installed is None:
+                skip_installed = self.get_setting('skip_already_installed', True)
+
+            journal = self.session.journal
+            if not resume:
+                journal.clear()
+            resumed = journal.succeeded() if resume else set()
+
+            if repositories is None:
+                self.ensure_repositories()
+
+            to_install, skipped = [], []
+            for app_spec in app_specs:
+                _, app_id = self.parse_app_spec(app_spec)
+                if app_id in resumed and inventory.is_installed(app_id):
+                    print(f"[RESUME] {APP_NAMES.get(app_id, app_id)} was installed by an interrupted run")
+                    skipped.append(app_id)
+                elif skip_installed and inventory.is_installed(app_id):
+                    print(f"[SKIP] {APP_NAMES.get(app_id, app_id)} is already installed")
+                    skipped.append(app_id)
+                else:
+                    to_install.append(app_spec)
+
+            succeeded, failed = [], []
+            resolved = {}
+            candidates = repositories or self.get_installation_repositories()
+            if not candidates:
+                # e.g. repository_priority "custom" without custom_repositories
+                unrouted = [spec for spec in to_install if not self.parse_app_spec(spec)[0]]
+                if unrouted:
+                    print("[ERROR] No repositories configured: set installer.repository_priority "
+                          "or add custom_repositories")
+                    log.error(f"Not installing {', '.join(unrouted)}: no repositories configured")
+                for app_spec in unrouted:
+                    journal.record(app_spec, 'failed', error="no repositories configured")
+                    failed.append(app_spec)
+                to_install = [spec for spec in to_install if spec not in unrouted]
+
+            if to_install and candidates and self.get_setting('validate_app_ids', True):
+                resolved, unknown = self.resolve_with_catalog(to_install, candidates)
+                for app_id, suggestions in unknown.items():
+                    hint = f" (did you mean {', '.join(suggestions)}?)" if suggestions else ""
+                    print(f"[UNKNOWN] {app_id} is not provided by {', '.join(candidates)}{hint}")
+                    log.error(f"Not installing {app_id}: not found in the catalog of {', '.join(candidates)}")
+                    journal.record(app_id, 'failed', error="not found in catalog")
+                    failed.append(app_id)
+                to_install = [spec for spec in to_install
+                              if self.parse_app_spec(spec)[0] or self.parse_app_spec(spec)[1] not in unknown]
+
+            if to_install:
+                manager = ParallelOperationManager(self.session.config, journal)
+                if jobs:
+                    manager.max_workers = jobs
+                    manager.pull_workers = jobs
+                for operation in self.create_install_operations(to_install, repositories, max_retries, resolved):
+                    manager.add_operation(operation)
+
+                def report(result):
+                    app_id = result.operation.package_name
+                    if result.success:
+                        log.info(f"Successfully installed {app_id}")
+                    else:
+                        log.error(f"Failed to install {app_id} from all repositories: {result.error.strip()[:200]}")
+
+                results = manager.execute_operations_batch(report)
+                succeeded = [result.operation.package_name for result in results['results']['completed']]
+                failed += [result.operation.package_name for result in results['results']['failed']]
+                inventory.invalidate()
+                self.record_remote_results(results['results']['completed'] + results['results']['failed'])
+
+            if not failed:
+                journal.clear()
+            else:
+                journal.finish()
+
+            duration = time.time() - start_time
+            if to_install:
+                self.session.logger.log_package_operation(
+                    "install", "flatpak", succeeded + failed, not failed, duration,
+                    error_msg=f"Failed apps: {', '.join(failed)}" if failed else None
+                )
+
+            return StepResult(
+                success=not failed,
+                succeeded=succeeded,
+                failed=failed,
+                skipped=skipped,
+                duration=duration
+            )
+
+def main(argv: Optional[List[str]] = None):
+    import argparse
+    from flatpack_api import FlatpackSession
+
+    parser = argparse.ArgumentParser(description="Flatpack Installation Engine")
+    parser.add_argument("--apps", nargs="+", metavar="APP_SPEC",
+                        help="Apps to install as app.id or repo:app.id (default: app set for this system)")
+    parser.add_argument("--repositories", nargs="+", metavar="REPO",
+                        help="Repositories to try in order (assumed to be configured already)")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="Number of concurrent installs")
+    parser.add_argument("--retries", type=int, help="Attempts per repository (default: installer.max_retries)")
+    parser.add_argument("--no-skip-installed", action="store_true", help="Reinstall apps that are already installed")
+    parser.add_argument("--result-file", metavar="PATH",
+                        help="Write one 'successful|failed|skipped APP_ID' line per app to PATH")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard the journal of an interrupted run instead of resuming it")
+
+    args = parser.parse_args(argv)
+
+    session = FlatpackSession()
+    result = session.installer.install(
+        app_specs=args.apps,
+        repositories=args.repositories,
+        jobs=args.jobs or None,
+        max_retries=args.retries,
+        skip_installed=False if args.no_skip_installed else None,
+        resume=not args.fresh
+    )
+
+    if args.result_file:
+        with open(args.result_file, 'w') as f:
+            for status, app_ids in (('successful', result.succeeded),
+                                    ('failed', result.failed),
+                                    ('skipped', result.skipped)):
+                for app_id in app_ids:
+                    f.write(f"{status} {app_id}\n")
+
+    print(f"\nInstalled: {len(result.succeeded)} | Failed: {len(result.failed)} | "
+          f"Skipped: {len(result.skipped)} | {result.duration:.1f}s")
+    sys.exit(0 if result.success else 1)
+
+if __name__ == "__main__":
+    main()
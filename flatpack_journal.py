@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Flatpack Operation Journal
+
+Append-only, fsync'd journal of package operation state transitions
+(queued/started/succeeded/failed), shared by the installation engine,
+ParallelOperationManager and install_flatpaks.sh. Every transition is on
+disk before the run moves on, so an interrupted run can be resumed without
+prompting by skipping everything the journal already records as succeeded.
+
+Replay only covers the last run that did not finish: a run that ends with
+failures appends a "finished" marker (a fully successful one clears the
+journal), and records older than JOURNAL_MAX_AGE are ignored, so neither a
+finished run nor a long-abandoned one is ever resumed.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+JOURNAL_FILE = Path.home() / '.local' / 'share' / 'flatpack' / 'install_journal.jsonl'
+JOURNAL_MAX_AGE = 7 * 86400  # Interrupted runs older than this are not resumed
+FINISHED = 'finished'  # Marker event closing a run
+
+# Operation states, in the order an operation moves through them
+QUEUED = 'queued'
+STARTED = 'started'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+STATES = (QUEUED, STARTED, SUCCEEDED, FAILED)
+
+class OperationJournal:
+    """Append-only record of operation state transitions
+
+    Each record is a single JSON line written with one O_APPEND write and
+    fsync'd, so records from concurrent writers never interleave and a
+    crash loses at most the record being written. A torn last line is
+    ignored on replay.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else JOURNAL_FILE
+        self.lock = threading.Lock()
+        self._fd = None
+
+    def _open(self) -> int:
+        if self._fd is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def record(self, package: str, state: str, operation: str = "install", **details):
+        """Durably append one state transition"""
+        if state not in STATES:
+            raise ValueError(f"Unknown operation state: {state}")
+
+        entry = {
+            'package': package,
+            'state': state,
+            'operation': operation,
+            'timestamp': time.time(),
+            'pid': os.getpid()
+        }
+        entry.update(details)
+        self._append(entry)
+
+    def _append(self, entry: Dict):
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+
+        with self.lock:
+            fd = self._open()
+            os.write(fd, line)
+            os.fsync(fd)
+
+    def finish(self):
+        """Close the current run, so later runs do not resume it"""
+        self._append({'event': FINISHED, 'timestamp': time.time(), 'pid': os.getpid()})
+
+    def replay(self, operation: Optional[str] = "install",
+               max_age: Optional[float] = JOURNAL_MAX_AGE) -> Dict[str, Dict]:
+        """Latest record per package of the unfinished run (restricted to one
+        operation type unless None; records older than max_age are ignored)"""
+        latest = {}
+        cutoff = time.time() - max_age if max_age else 0
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write from an interrupted run
+                    if entry.get('event') == FINISHED:
+                        latest = {}
+                        continue
+                    if operation and entry.get('operation') != operation:
+                        continue
+                    if 'package' in entry and entry.get('timestamp', 0) >= cutoff:
+                        latest[entry['package']] = entry
+        except OSError:
+            pass
+        return latest
+
+    def succeeded(self, operation: Optional[str] = "install") -> Set[str]:
+        """Packages whose latest recorded state is succeeded"""
+        return {package for package, entry in self.replay(operation).items()
+                if entry.get('state') == SUCCEEDED}
+
+    def incomplete(self, operation: Optional[str] = "install") -> Set[str]:
+        """Packages that were queued, started or failed but never succeeded"""
+        return {package for package, entry in self.replay(operation).items()
+                if entry.get('state') != SUCCEEDED}
+
+    def close(self):
+        with self.lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def clear(self):
+        """Discard the journal (after a fully successful run, or to start fresh)"""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+def get_journal(path: Optional[Path] = None) -> OperationJournal:
+    """Factory function to open the operation journal"""
+    return OperationJournal(path)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Operation Journal")
+    parser.add_argument("--show", action="store_true", help="Show the latest state of every journaled package")
+    parser.add_argument("--succeeded", action="store_true", help="List packages recorded as succeeded")
+    parser.add_argument("--clear", action="store_true", help="Discard the journal")
+
+    args = parser.parse_args()
+    journal = get_journal()
+
+    if args.clear:
+        journal.clear()
+        print(f"Cleared {journal.path}")
+    elif args.succeeded:
+        for package in sorted(journal.succeeded()):
+            print(package)
+    else:
+        for package, entry in sorted(journal.replay(None, max_age=None).items()):
+            print(f"{entry.get('state', '?'):<10} {entry.get('operation', '?'):<8} {package}")
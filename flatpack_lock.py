@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Flatpack Cross-Process Locking
+
+Coordinates concurrent flatpack, flatpack-manager and install runs (a
+systemd timer, a login script and a user at the same time) through lock
+files under ~/.cache/flatpack/locks:
+
+- Store locks serialize changes to one package store ('flatpak' or
+  'native'). A run that finds the store busy waits its turn instead of
+  racing the other transaction, and reports who holds the lock.
+- single_flight() runs a read-only computation such as an update check
+  once: callers that arrive while an identical call is in flight in
+  another process wait for it and reuse its result from the result file.
+
+Locks are flock(2) locks, so they are released automatically when a
+holder exits or crashes.
+"""
+
+import fcntl
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+LOCK_DIR = Path.home() / '.cache' / 'flatpack' / 'locks'
+
+def holder_description() -> str:
+    return ' '.join(Path(arg).name if index == 0 else arg for index, arg in enumerate(sys.argv)) or 'python'
+
+def open_lock_file(path: Path) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+def read_holder(fd: int) -> Dict[str, Any]:
+    try:
+        return json.loads(os.pread(fd, 4096, 0) or b'{}')
+    except (OSError, ValueError):
+        return {}
+
+def write_holder(fd: int):
+    holder = {'pid': os.getpid(), 'command': holder_description(), 'since': time.time()}
+    os.ftruncate(fd, 0)
+    os.pwrite(fd, json.dumps(holder).encode('utf-8'), 0)
+
+class StoreLock:
+    """Exclusive lock on one package store, across threads and processes
+
+    Re-entrant for the thread holding it, so nested steps (e.g. a smart
+    update calling update) do not deadlock.
+    """
+
+    def __init__(self, name: str, lock_dir: Optional[Path] = None):
+        self.name = name
+        self.path = Path(lock_dir or LOCK_DIR) / f"{name}.lock"
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.fd: Optional[int] = None
+
+    def acquire_file(self):
+        fd = open_lock_file(self.path)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                holder = read_holder(fd)
+                who = f"'{holder['command']}' (pid {holder.get('pid')})" if holder.get('command') else "another process"
+                print(f"⏳ Waiting for {who} to finish with the {self.name} packages...")
+                start_time = time.time()
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                print(f"🔓 Acquired the {self.name} lock after {time.time() - start_time:.1f}s")
+            write_holder(fd)
+        except BaseException:
+            os.close(fd)
+            raise
+        self.fd = fd
+
+    def release_file(self):
+        fd, self.fd = self.fd, None
+        try:
+            os.ftruncate(fd, 0)
+        except OSError:
+            pass
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def acquire(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            try:
+                self.acquire_file()
+            except BaseException:
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            self.release_file()
+        self.thread_lock.release()
+
+    def holder(self) -> Optional[Dict[str, Any]]:
+        """The process currently holding the lock, if any"""
+        if not self.path.exists():
+            return None
+        fd = open_lock_file(self.path)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return read_holder(fd) or {'pid': None}
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return None
+        finally:
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+_store_locks: Dict[str, StoreLock] = {}
+_store_locks_lock = threading.Lock()
+
+def get_store_lock(name: str) -> StoreLock:
+    """The process-wide lock for a package store ('flatpak' or 'native')"""
+    with _store_locks_lock:
+        if name not in _store_locks:
+            _store_locks[name] = StoreLock(name)
+        return _store_locks[name]
+
+def single_flight(key: str, compute: Callable[[], Any], lock_dir: Optional[Path] = None) -> Any:
+    """Run compute(), or share the result of an identical call already in flight
+
+    The result must be JSON-serializable. If the in-flight call fails,
+    waiters run compute() themselves.
+    """
+    lock_dir = Path(lock_dir or LOCK_DIR)
+    result_file = lock_dir / f"{key}.result.json"
+    arrived = time.time()
+
+    fd = open_lock_file(lock_dir / f"{key}.lock")
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            holder = read_holder(fd)
+            print(f"⏳ Waiting for the {key} already running in pid {holder.get('pid', '?')}...")
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                with open(result_file, 'r') as f:
+                    result = json.load(f)
+                # Finished after we arrived: it was the call we waited for
+                if result.get('finished', 0) >= arrived:
+                    return result['value']
+            except (OSError, ValueError, KeyError):
+                pass
+        write_holder(fd)
+
+        started = time.time()
+        value = compute()
+        tmp_file = result_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump({'pid': os.getpid(), 'started': started, 'finished': time.time(), 'value': value}, f)
+        os.replace(tmp_file, result_file)
+        return value
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Cross-Process Locking")
+    parser.add_argument("--status", action="store_true", help="Show which processes hold the store locks")
+    parser.add_argument("--hold", metavar="STORE", help="Hold a store lock until interrupted (for testing)")
+
+    args = parser.parse_args()
+
+    if args.hold:
+        with get_store_lock(args.hold):
+            print(f"🔒 Holding the {args.hold} lock; press Ctrl+C to release")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
+    else:
+        for name in ('flatpak', 'native'):
+            holder = get_store_lock(name).holder()
+            if holder:
+                held = f" for {time.time() - holder['since']:.0f}s" if holder.get('since') else ""
+                print(f"🔒 {name:<8} held by pid {holder.get('pid')}{held}: {holder.get('command', '?')}")
+            else:
+                print(f"🔓 {name:<8} free")
@@ -6,9 +6,15 @@ Provides comprehensive logging, update history tracking, and rollback capabiliti
 """
 
 import logging
+import logging.handlers
+import atexit
+import copy
+import queue
 import json
 import os
 import shutil
+import subprocess
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Any, Optional
@@ -28,6 +34,103 @@ class UpdateRecord:
     system_info: Optional[Dict[str, str]] = None
     rollback_info: Optional[Dict[str, Any]] = None
 
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line for machine ingestion"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry)
+
+class PreparedQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps the traceback of a record as text
+    
+    QueueHandler.prepare merges the traceback into the message and drops
+    exc_info; here the message is only interpolated and the traceback is
+    kept in exc_text, which every formatter on the writer thread appends
+    (JsonFormatter as its "exception" field).
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+class BatchedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler that flushes once per batch instead of per record"""
+    
+    def flush(self):
+        # StreamHandler.emit() flushes after every record; the queue listener
+        # calls flush_batch() once the whole batch has been written instead.
+        pass
+    
+    def flush_batch(self):
+        """Flush everything written since the last batch"""
+        super().flush()
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that drains records in batches on a single writer thread"""
+    
+    def __init__(self, log_queue, *handlers, batch_size: int = 64):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+    
+    def _monitor(self):
+        """Write queued records in batches until the stop sentinel arrives"""
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            
+            stopping = False
+            for record in batch:
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    self.handle(record)
+            
+            for handler in self.handlers:
+                if hasattr(handler, 'flush_batch'):
+                    handler.flush_batch()
+                else:
+                    handler.flush()
+            
+            if stopping:
+                break
+
+# Single background writer shared by every FlatpackLogger in the process
+_listener: Optional[BatchingQueueListener] = None
+_listener_lock = threading.RLock()
+
+def stop_log_listener():
+    """Drain queued log records and stop the background writer"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+            logging.getLogger('flatpack').handlers.clear()
+            _listener = None
+
+atexit.register(stop_log_listener)
+
 class FlatpackLogger:
     def __init__(self, config=None):
         self.config = config
@@ -48,48 +151,65 @@ class FlatpackLogger:
         self.history = self.load_history()
     
     def setup_logging(self):
-        """Configure logging with rotation and multiple levels"""
-        log_level = getattr(logging, self.get_log_level().upper(), logging.INFO)
+        """Configure logging with rotation and multiple levels
         
-        # Create formatter
-        formatter = logging.Formatter(
-            '%(asctime)s | %(levelname)8s | %(name)s | %(message)s'
-        )
-        
-        # Setup main logger
+        Callers only pay for a queue put: the file and console handlers run
+        on a single background writer thread that batches records. The
+        writer is started once per process; later loggers reuse it.
+        """
+        global _listener
+        log_level = getattr(logging, self.get_log_level().upper(), logging.INFO)
         self.logger = logging.getLogger('flatpack')
-        self.logger.setLevel(log_level)
         
-        # Clear existing handlers
-        self.logger.handlers.clear()
+        with _listener_lock:
+            if _listener is None:
+                self.logger.setLevel(log_level)
+                _listener = self.start_listener(log_level)
+    
+    def start_listener(self, log_level: int) -> BatchingQueueListener:
+        """Attach the queue handler to the flatpack logger and start the writer"""
+        # Create formatter
+        if self.get_log_format() == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s | %(levelname)8s | %(name)s | %(message)s'
+            )
         
         # File handler with rotation
         log_file = self.log_dir / 'flatpack.log'
-        file_handler = logging.handlers.RotatingFileHandler(
+        file_handler = BatchedRotatingFileHandler(
             log_file, 
             maxBytes=10*1024*1024,  # 10MB
             backupCount=5
         )
         file_handler.setFormatter(formatter)
         file_handler.setLevel(logging.DEBUG)
-        self.logger.addHandler(file_handler)
         
         # Console handler
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
         console_handler.setLevel(log_level)
-        self.logger.addHandler(console_handler)
         
         # Error file handler
         error_file = self.log_dir / 'flatpack_errors.log'
-        error_handler = logging.handlers.RotatingFileHandler(
+        error_handler = BatchedRotatingFileHandler(
             error_file,
             maxBytes=5*1024*1024,  # 5MB
             backupCount=3
         )
         error_handler.setFormatter(formatter)
         error_handler.setLevel(logging.ERROR)
-        self.logger.addHandler(error_handler)
+        
+        # Producers only enqueue; the unbounded queue never blocks them
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(PreparedQueueHandler(log_queue))
+        
+        listener = BatchingQueueListener(
+            log_queue, file_handler, console_handler, error_handler
+        )
+        listener.start()
+        return listener
     
     def get_log_level(self) -> str:
         """Get log level from config or default"""
@@ -97,6 +217,12 @@ class FlatpackLogger:
             return self.config.get('preferences.log_level', 'info')
         return 'info'
     
+    def get_log_format(self) -> str:
+        """Get log file format ('text' or 'json') from config or default"""
+        if self.config:
+            return self.config.get('preferences.log_format', 'text')
+        return 'text'
+    
     def log_operation_start(self, operation: str, packages: List[str], package_type: str = "flatpak") -> str:
         """Log the start of an operation and return operation ID"""
         operation_id = self.generate_operation_id(operation, packages)
@@ -228,15 +354,15 @@ class FlatpackLogger:
         try:
             backup_path.mkdir(exist_ok=True)
             
-            # Backup flatpak list
-            flatpak_result = subprocess.run(
-                ['flatpak', 'list', '--columns=application,version,branch,origin'],
-                capture_output=True, text=True
-            )
-            
-            if flatpak_result.returncode == 0:
+            # Backup flatpak list (application, version, branch, origin)
+            from flatpack_backend import get_backend, FlatpakBackendError
+            try:
+                from flatpack_parser import format_table
+                refs = get_backend(self.config).list_installed(apps_only=False)
                 with open(backup_path / 'flatpaks.txt', 'w') as f:
-                    f.write(flatpak_result.stdout)
+                    f.write(format_table(refs, ('id', 'version', 'branch', 'origin')))
+            except FlatpakBackendError as e:
+                self.logger.warning(f"Could not record installed Flatpaks in backup: {e}")
             
             # Backup native package list (if on Arch/CachyOS)
             if shutil.which('pacman'):
@@ -284,9 +410,10 @@ class FlatpackLogger:
         backups.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
         return backups
     
-    def cleanup_old_logs(self, days: int = 30):
-        """Clean up old log files and backups"""
+    def cleanup_old_logs(self, days: int = 30) -> int:
+        """Clean up old rotated log files, backups and history; returns the bytes freed"""
         cutoff_date = datetime.now() - timedelta(days=days)
+        freed = 0
         
         # Clean old backup points
         for backup_dir in self.backup_dir.iterdir():
@@ -294,17 +421,34 @@ class FlatpackLogger:
                 try:
                     dir_time = datetime.fromtimestamp(backup_dir.stat().st_mtime)
                     if dir_time < cutoff_date:
+                        size = sum(f.stat().st_size for f in backup_dir.rglob('*') if f.is_file())
                         shutil.rmtree(backup_dir)
+                        freed += size
                         self.logger.info(f"Cleaned old backup: {backup_dir.name}")
                 except Exception as e:
                     self.logger.warning(f"Failed to clean backup {backup_dir.name}: {e}")
         
+        # Clean old rotated log files (flatpack.log.1, ...); the active files are kept
+        for log_file in self.log_dir.glob('*.log.*'):
+            try:
+                stat = log_file.stat()
+                if datetime.fromtimestamp(stat.st_mtime) < cutoff_date:
+                    log_file.unlink()
+                    freed += stat.st_size
+            except OSError as e:
+                self.logger.warning(f"Failed to clean log file {log_file.name}: {e}")
+        
         # Clean old history entries
         old_count = len(self.history)
         self.history = self.get_recent_history(days)
         if len(self.history) < old_count:
+            old_size = self.history_file.stat().st_size if self.history_file.exists() else 0
             self.save_history()
+            new_size = self.history_file.stat().st_size if self.history_file.exists() else 0
+            freed += max(0, old_size - new_size)
             self.logger.info(f"Cleaned {old_count - len(self.history)} old history entries")
+        
+        return freed
     
     def show_statistics(self, days: int = 30):
         """Show operation statistics"""
@@ -348,13 +492,18 @@ class FlatpackLogger:
             for record in failed[-3:]:  # Show last 3 failures
                 print(f"  {record.timestamp}: {record.operation} {record.package_type}")
 
+_logger_instance: Optional[FlatpackLogger] = None
+
 # Convenience function
 def get_logger(config=None) -> FlatpackLogger:
-    """Get logger instance"""
-    return FlatpackLogger(config)
+    """Get the process-wide logger instance"""
+    global _logger_instance
+    with _listener_lock:
+        if _logger_instance is None:
+            _logger_instance = FlatpackLogger(config)
+        return _logger_instance
 
 if __name__ == "__main__":
-    import subprocess
     import argparse
     
     parser = argparse.ArgumentParser(description="Flatpack Logger Management")
@@ -383,8 +532,8 @@ if __name__ == "__main__":
         else:
             print("No backups available")
     elif args.cleanup:
-        logger.cleanup_old_logs(args.cleanup)
-        print(f"Cleaned up files older than {args.cleanup} days")
+        freed = logger.cleanup_old_logs(args.cleanup)
+        print(f"Cleaned up files older than {args.cleanup} days ({freed / 1024:.1f} KB freed)")
     else:
         # Show recent history
         history = logger.get_recent_history(args.history)
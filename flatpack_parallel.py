@@ -10,12 +10,18 @@ import threading
 import queue
 import time
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed, Future
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
 from typing import List, Dict, Any, Optional, Callable, Tuple
 from dataclasses import dataclass
 from pathlib import Path
 import json
 
+# Flags that restrict a flatpak install/update to one phase of the transaction
+PHASE_FLAGS = {
+    'pull': '--no-deploy',
+    'deploy': '--no-pull'
+}
+
 @dataclass
 class PackageOperation:
     """Represents a single package operation"""
@@ -26,10 +32,25 @@ class PackageOperation:
     priority: int = 0  # Higher number = higher priority
     dependencies: List[str] = None  # Package names this depends on
     estimated_duration: float = 30.0  # Estimated duration in seconds
+    retries: int = 0  # Extra attempts per command before moving on
+    retry_delay: float = 0.0  # Seconds to wait between attempts
+    fallback_commands: List[List[str]] = None  # Tried in order if command keeps failing
+    split_phases: bool = False  # Flatpak only: pull with --no-deploy, then deploy with --no-pull
+    download_size: int = 0  # Bytes to download, if known (used by scheduling policies)
+    installed_size: int = 0  # Bytes once deployed, if known (used by scheduling policies)
     
     def __post_init__(self):
         if self.dependencies is None:
             self.dependencies = []
+        if self.fallback_commands is None:
+            self.fallback_commands = []
+
+@dataclass
+class CommandAttempt:
+    """One run of one of an operation's commands"""
+    command: List[str]
+    success: bool
+    duration: float  # Seconds this attempt alone took
 
 @dataclass
 class OperationResult:
@@ -40,11 +61,23 @@ class OperationResult:
     output: str = ""
     error: str = ""
     returncode: int = 0
+    command: List[str] = None  # The command that produced this result
+    attempts: List[CommandAttempt] = None  # Every attempt, in the order they ran
+    
+    def __post_init__(self):
+        if self.attempts is None:
+            self.attempts = []
 
 class ParallelOperationManager:
-    def __init__(self, config=None):
+    def __init__(self, config=None, journal=None, policy=None):
         self.config = config
+        self.journal = journal  # Optional OperationJournal recording each state transition
+        if policy is None:
+            from flatpack_scheduling import get_scheduling_policy
+            policy = get_scheduling_policy(config)
+        self.policy = policy  # SchedulingPolicy choosing which ready operation starts next
         self.max_workers = self.get_max_workers()
+        self.pull_workers, self.deploy_workers = self.get_phase_workers()
         self.operation_queue = queue.PriorityQueue()
         self.completed_operations = {}
         self.failed_operations = {}
@@ -85,6 +118,37 @@ class ParallelOperationManager:
         else:
             return 1
     
+    def get_phase_workers(self) -> Tuple[int, int]:
+        """Concurrency of the pull (network-bound) and deploy (disk-bound) stages"""
+        pull_workers, deploy_workers = 6, 2
+        if self.config:
+            pull_workers = self.config.get('performance.pull_workers', pull_workers)
+            deploy_workers = self.config.get('performance.deploy_workers', deploy_workers)
+        return max(1, pull_workers), max(1, deploy_workers)
+    
+    def use_two_phase(self) -> bool:
+        """Whether queued operations can run as separate pull and deploy stages"""
+        if self.config and not self.config.get('performance.split_download_deploy', True):
+            return False
+        
+        operations = [op for _, _, op in list(self.operation_queue.queue)]
+        # The two-phase scheduler does not order operations by dependency
+        if any(op.dependencies for op in operations):
+            return False
+        return any(self.is_split_operation(op) for op in operations)
+    
+    @staticmethod
+    def is_split_operation(operation: PackageOperation) -> bool:
+        return operation.split_phases and 'flatpak' in operation.command
+    
+    @staticmethod
+    def phase_command(command: List[str], phase: str) -> List[str]:
+        """Restrict a flatpak install/update command to the pull or deploy phase"""
+        command = [arg for arg in command if arg not in PHASE_FLAGS.values()]
+        # The phase flag goes right after the flatpak subcommand
+        index = command.index('flatpak') + 2
+        return command[:index] + [PHASE_FLAGS[phase]] + command[index:]
+    
     def add_operation(self, operation: PackageOperation) -> bool:
         """Add an operation to the queue"""
         try:
@@ -92,11 +156,18 @@ class ParallelOperationManager:
             priority = -operation.priority
             self.operation_queue.put((priority, time.time(), operation))
             self.stats['total_operations'] += 1
+            self.journal_record(operation, 'queued')
             return True
         except Exception as e:
             print(f"Failed to add operation {operation.package_name}: {e}")
             return False
     
+    def journal_record(self, operation: PackageOperation, state: str, **details):
+        """Record a state transition of an operation in the journal, if any"""
+        if self.journal is not None:
+            self.journal.record(operation.package_name, state, operation.operation_type,
+                                package_manager=operation.package_manager, **details)
+    
     def can_execute_operation(self, operation: PackageOperation) -> bool:
         """Check if operation dependencies are satisfied"""
         if not operation.dependencies:
@@ -111,18 +182,58 @@ class ParallelOperationManager:
         
         return True
     
-    def execute_single_operation(self, operation: PackageOperation) -> OperationResult:
-        """Execute a single package operation"""
+    def execute_single_operation(self, operation: PackageOperation,
+                                 phase: Optional[str] = None,
+                                 commands: Optional[List[List[str]]] = None) -> OperationResult:
+        """Execute a single package operation
+        
+        The command is attempted 1 + operation.retries times, then each of
+        operation.fallback_commands in turn (e.g. other repositories). With
+        a phase ('pull' or 'deploy') every command is restricted to it;
+        commands overrides the operation's own command list.
+        """
         start_time = time.time()
+        operation_result = None
+        commands = commands or [operation.command] + operation.fallback_commands
+        if phase:
+            commands = [self.phase_command(command, phase) for command in commands]
         
         try:
             # Mark operation as running
             with self.lock:
                 self.running_operations[operation.package_name] = operation
+            if phase:
+                self.journal_record(operation, 'started', phase=phase)
+            else:
+                self.journal_record(operation, 'started')
             
+            attempts = []
+            for command in commands:
+                for attempt in range(operation.retries + 1):
+                    if attempt > 0 and operation.retry_delay > 0:
+                        time.sleep(operation.retry_delay)
+                    
+                    attempt_start = time.time()
+                    operation_result = self.run_operation_command(operation, command, start_time)
+                    attempts.append(CommandAttempt(command, operation_result.success, time.time() - attempt_start))
+                    operation_result.attempts = attempts
+                    if operation_result.success:
+                        return operation_result
+            
+            return operation_result
+            
+        finally:
+            # Remove from running operations
+            with self.lock:
+                self.running_operations.pop(operation.package_name, None)
+    
+    def run_operation_command(self, operation: PackageOperation, command: List[str],
+                              start_time: float) -> OperationResult:
+        """Run one attempt of an operation's command"""
+        try:
             # Execute the command
             result = subprocess.run(
-                operation.command,
+                command,
                 capture_output=True,
                 text=True,
                 timeout=300  # 5 minute timeout per operation
@@ -131,17 +242,16 @@ class ParallelOperationManager:
             duration = time.time() - start_time
             
             # Create result
-            operation_result = OperationResult(
+            return OperationResult(
                 operation=operation,
                 success=result.returncode == 0,
                 duration=duration,
                 output=result.stdout,
                 error=result.stderr,
-                returncode=result.returncode
+                returncode=result.returncode,
+                command=command
             )
             
-            return operation_result
-            
         except subprocess.TimeoutExpired:
             duration = time.time() - start_time
             return OperationResult(
@@ -149,7 +259,8 @@ class ParallelOperationManager:
                 success=False,
                 duration=duration,
                 error="Operation timed out",
-                returncode=-1
+                returncode=-1,
+                command=command
             )
         except Exception as e:
             duration = time.time() - start_time
@@ -158,12 +269,9 @@ class ParallelOperationManager:
                 success=False,
                 duration=duration,
                 error=str(e),
-                returncode=-1
+                returncode=-1,
+                command=command
             )
-        finally:
-            # Remove from running operations
-            with self.lock:
-                self.running_operations.pop(operation.package_name, None)
     
     def process_operation_result(self, result: OperationResult):
         """Process the result of an operation"""
@@ -176,35 +284,114 @@ class ParallelOperationManager:
                 self.stats['failed_operations'] += 1
             
             self.stats['total_duration'] += result.duration
+        
+        if result.success:
+            self.journal_record(result.operation, 'succeeded', duration=round(result.duration, 3))
+        else:
+            self.journal_record(result.operation, 'failed', duration=round(result.duration, 3),
+                                error=result.error.strip()[:200])
     
-    def get_next_ready_operation(self) -> Optional[PackageOperation]:
-        """Get the next operation that's ready to execute"""
-        temp_operations = []
-        next_operation = None
+    def get_next_ready_operation(self, running: Optional[List[PackageOperation]] = None,
+                                 capacity: Optional[int] = None) -> Optional[PackageOperation]:
+        """Get the next operation that's ready to execute
         
-        # Look for an operation whose dependencies are satisfied
+        The scheduling policy orders the operations whose dependencies are
+        satisfied and may veto them or give them more weight than the free
+        capacity. When nothing is running the first ready operation starts
+        regardless, so the batch always makes progress.
+        """
+        running = running or []
+        items = []
         while not self.operation_queue.empty():
             try:
-                priority, timestamp, operation = self.operation_queue.get_nowait()
-                
-                if self.can_execute_operation(operation):
-                    next_operation = operation
-                    break
-                else:
-                    # Put it back for later
-                    temp_operations.append((priority, timestamp, operation))
-                    
+                items.append(self.operation_queue.get_nowait())
             except queue.Empty:
                 break
         
-        # Put back operations that aren't ready
-        for item in temp_operations:
-            self.operation_queue.put(item)
+        # Policies see the ready set in insertion order
+        items.sort(key=lambda item: item[1])
+        ready = [operation for _, _, operation in items if self.can_execute_operation(operation)]
+        
+        next_operation = None
+        ordered = self.policy.order(ready)
+        for operation in ordered:
+            if not self.policy.can_start(operation, running):
+                continue
+            if capacity is not None and self.policy.weight(operation) > capacity:
+                continue
+            next_operation = operation
+            break
+        if next_operation is None and not running and ordered:
+            next_operation = ordered[0]
+        
+        # Put back operations that aren't starting
+        for item in items:
+            if item[2] is not next_operation:
+                self.operation_queue.put(item)
         
         return next_operation
     
+    def running_weight(self, operations) -> int:
+        return sum(self.policy.weight(operation) for operation in operations)
+    
+    def fail_blocked_operations(self):
+        """Fail every queued operation whose dependencies can no longer succeed"""
+        self.fail_queued_operations("Dependencies failed", "dependencies failed")
+    
+    def fail_queued_operations(self, error: str, reason: str):
+        """Fail every queued operation without running it"""
+        while not self.operation_queue.empty():
+            try:
+                _, _, operation = self.operation_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.process_operation_result(OperationResult(
+                operation=operation,
+                success=False,
+                duration=0.0,
+                error=error,
+                returncode=-1
+            ))
+            print(f"❌ {operation.package_name}: skipped ({reason})")
+    
+    def preflight_disk_space(self) -> bool:
+        """Check that the queued Flatpak installs and updates fit on disk
+        
+        Runs before anything starts (update_behavior.check_disk_space); a
+        batch that does not fit is failed as a whole instead of running
+        until the disk fills up.
+        """
+        if self.config and not self.config.get('update_behavior.check_disk_space', True):
+            return True
+        operations = [op for _, _, op in list(self.operation_queue.queue) if op.package_manager == "flatpak"]
+        if not operations:
+            return True
+        
+        from flatpack_preflight import get_disk_planner
+        
+        plan = get_disk_planner(self.config).plan_operations(operations)
+        for line in plan.report():
+            print(line)
+        if plan.accepted:
+            return True
+        self.fail_queued_operations("Insufficient disk space for the batch", "not enough disk space")
+        return False
+    
     def execute_operations_batch(self, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
-        """Execute all queued operations in parallel"""
+        """Execute all queued operations in parallel
+        
+        Flatpak operations with split_phases run through the two-phase
+        pull/deploy pipeline (see execute_two_phase) unless it is disabled
+        with performance.split_download_deploy. The whole batch fails
+        without starting if it does not fit on disk (see preflight_disk_space).
+        """
+        if not self.preflight_disk_space():
+            return self.batch_summary(0.0)
+        if self.use_two_phase():
+            results = self.execute_two_phase(progress_callback)
+            self.reclaim_after_batch()
+            return results
+        
         start_time = time.time()
         
         print(f"Starting parallel execution with {self.max_workers} workers...")
@@ -214,43 +401,41 @@ class ParallelOperationManager:
             
             while not self.operation_queue.empty() or futures:
                 # Submit new operations up to worker limit
-                while len(futures) < self.max_workers and not self.operation_queue.empty():
-                    operation = self.get_next_ready_operation()
-                    if operation:
-                        future = executor.submit(self.execute_single_operation, operation)
-                        futures[future] = operation
-                        print(f"Started: {operation.package_name} ({operation.operation_type})")
+                while not self.operation_queue.empty():
+                    capacity = self.max_workers - self.running_weight(futures.values())
+                    if capacity <= 0:
+                        break
+                    operation = self.get_next_ready_operation(list(futures.values()), capacity)
+                    if operation is None:
+                        break
+                    future = executor.submit(self.execute_single_operation, operation)
+                    futures[future] = operation
+                    print(f"Started: {operation.package_name} ({operation.operation_type})")
+                
+                if not futures:
+                    # Nothing running and nothing ready: the remaining
+                    # operations depend on operations that failed
+                    self.fail_blocked_operations()
+                    break
                 
-                # Check for completed operations
-                if futures:
-                    # Wait for at least one operation to complete
-                    completed_futures = []
+                # Block until at least one operation completes
+                completed_futures, _ = wait(list(futures.keys()), return_when=FIRST_COMPLETED)
+                
+                # Process completed operations
+                for future in completed_futures:
+                    operation = futures.pop(future)
                     try:
-                        for future in as_completed(list(futures.keys()), timeout=1.0):
-                            completed_futures.append(future)
-                            break
-                    except Exception:
-                        # No operations completed in timeout, continue
-                        pass
-                    
-                    # Process completed operations
-                    for future in completed_futures:
-                        operation = futures.pop(future)
-                        try:
-                            result = future.result()
-                            self.process_operation_result(result)
-                            
-                            status = "✅" if result.success else "❌"
-                            print(f"{status} {operation.package_name}: {result.duration:.1f}s")
+                        result = future.result()
+                        self.process_operation_result(result)
+                        
+                        status = "✅" if result.success else "❌"
+                        print(f"{status} {operation.package_name}: {result.duration:.1f}s")
+                        
+                        if progress_callback:
+                            progress_callback(result)
                             
-                            if progress_callback:
-                                progress_callback(result)
-                                
-                        except Exception as e:
-                            print(f"❌ {operation.package_name}: Exception - {e}")
-                
-                # Brief pause to prevent busy waiting
-                time.sleep(0.1)
+                    except Exception as e:
+                        print(f"❌ {operation.package_name}: Exception - {e}")
         
         total_duration = time.time() - start_time
         
@@ -259,6 +444,12 @@ class ParallelOperationManager:
         if sequential_duration > 0:
             self.stats['parallel_efficiency'] = (sequential_duration / total_duration) * 100
         
+        self.reclaim_after_batch()
+        
+        return self.batch_summary(total_duration)
+    
+    def batch_summary(self, total_duration: float) -> Dict[str, Any]:
+        """Results of a batch as returned by execute_operations_batch"""
         return {
             'total_duration': total_duration,
             'completed': self.stats['completed_operations'],
@@ -270,15 +461,163 @@ class ParallelOperationManager:
             }
         }
     
-    def create_flatpak_operations(self, app_ids: List[str], operation_type: str = "update") -> List[PackageOperation]:
-        """Create Flatpak operations from app IDs"""
+    def reclaim_after_batch(self):
+        """Reclaim space in the package stores the batch changed
+        
+        Runs the flatpack_reclaim stages for Flatpak and/or pacman when any
+        install, update or remove succeeded and
+        update_behavior.cleanup_after_update is enabled.
+        """
+        if not self.config or not self.config.get('update_behavior.cleanup_after_update', True):
+            return
+        with self.results_lock:
+            changed = {result.operation.package_manager for result in self.completed_operations.values()
+                       if result.operation.operation_type in ("install", "update", "remove")}
+        steps = []
+        if "flatpak" in changed:
+            steps += ["unused_runtimes", "ostree_objects"]
+        if "pacman" in changed:
+            steps.append("pacman_cache")
+        if not steps:
+            return
+        
+        from flatpack_reclaim import get_reclaimer
+        
+        get_reclaimer(self.config).run(steps + ["flatpack_files"]).print_summary()
+    
+    def execute_two_phase(self, progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
+        """Execute all queued operations as a pull stage feeding a deploy stage
+        
+        Up to pull_workers `--no-deploy` pulls run at once; each finished pull
+        is handed through a queue to one of deploy_workers threads, which
+        deploys it from the local repository with `--no-pull`. Network
+        transfers therefore overlap with OSTree checkouts instead of
+        serializing inside each flatpak process. Operations that cannot be
+        split go straight to the deploy stage.
+        """
+        start_time = time.time()
+        deploy_queue = queue.Queue()
+        report_lock = threading.Lock()
+        
+        print(f"Starting two-phase execution with {self.pull_workers} pull "
+              f"and {self.deploy_workers} deploy workers...")
+        
+        def finish(result: OperationResult):
+            self.process_operation_result(result)
+            with report_lock:
+                status = "✅" if result.success else "❌"
+                print(f"{status} {result.operation.package_name}: {result.duration:.1f}s")
+                if progress_callback:
+                    progress_callback(result)
+        
+        def deploy_worker():
+            while True:
+                item = deploy_queue.get()
+                if item is None:
+                    return
+                operation, pull_result = item
+                try:
+                    if pull_result is None:
+                        result = self.execute_single_operation(operation)
+                    else:
+                        # Deploy from the repository the pull succeeded against
+                        result = self.execute_single_operation(operation, 'deploy', [pull_result.command])
+                        result.duration += pull_result.duration
+                        result.attempts = pull_result.attempts + result.attempts
+                    finish(result)
+                except Exception as e:
+                    print(f"❌ {operation.package_name}: Exception - {e}")
+        
+        def pull_finished(operation: PackageOperation, future: Future):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = OperationResult(operation=operation, success=False, duration=0.0,
+                                         error=str(e), returncode=-1)
+            if result.success:
+                print(f"⬇️  {operation.package_name}: pulled in {result.duration:.1f}s")
+                deploy_queue.put((operation, result))
+            else:
+                finish(result)
+        
+        deployers = [threading.Thread(target=deploy_worker, daemon=True) for _ in range(self.deploy_workers)]
+        for deployer in deployers:
+            deployer.start()
+        
+        with ThreadPoolExecutor(max_workers=self.pull_workers) as executor:
+            pulls = {}
+            while not self.operation_queue.empty() or pulls:
+                # Start pulls in policy order up to the pull stage's capacity
+                while not self.operation_queue.empty():
+                    capacity = self.pull_workers - self.running_weight(pulls.values())
+                    if capacity <= 0:
+                        break
+                    operation = self.get_next_ready_operation(list(pulls.values()), capacity)
+                    if operation is None:
+                        break
+                    
+                    if self.is_split_operation(operation):
+                        future = executor.submit(self.execute_single_operation, operation, 'pull')
+                        future.add_done_callback(lambda f, op=operation: pull_finished(op, f))
+                        pulls[future] = operation
+                        print(f"Started: {operation.package_name} (pull)")
+                    else:
+                        deploy_queue.put((operation, None))
+                
+                if not pulls:
+                    # Nothing is ready to pull; hand the rest to the deploy stage in queue order
+                    while not self.operation_queue.empty():
+                        _, _, operation = self.operation_queue.get_nowait()
+                        deploy_queue.put((operation, None))
+                    break
+                done, _ = wait(list(pulls.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    pulls.pop(future)
+        
+        # All pulls have finished and been queued for deployment
+        for _ in deployers:
+            deploy_queue.put(None)
+        for deployer in deployers:
+            deployer.join()
+        
+        return self.batch_summary(time.time() - start_time)
+    
+    def filter_packages(self, names: List[str]) -> List[str]:
+        """Drop excluded_packages matches and move priority_packages matches first"""
+        from flatpack_patterns import get_package_filter
+        
+        names, excluded = get_package_filter(self.config).apply(names)
+        if excluded:
+            print(f"Skipping excluded: {', '.join(excluded)}")
+        return names
+    
+    def create_flatpak_operations(self, app_ids: List[str], operation_type: str = "update",
+                                  remotes: Optional[List[str]] = None,
+                                  catalog=None) -> List[PackageOperation]:
+        """Create Flatpak operations from app IDs
+        
+        Installs go to the first of remotes (default: flathub); with a
+        FlatpackCatalog, to the first of them that provides the app. With
+        several remotes and performance.remote_selection "fastest", they are
+        ranked fastest healthy first (see flatpack_remotes). Apps matching
+        excluded_packages are dropped and apps matching priority_packages
+        get the highest priorities.
+        """
         operations = []
+        remotes = remotes or ["flathub"]
+        app_ids = self.filter_packages(app_ids)
+        
+        if operation_type == "install" and len(remotes) > 1:
+            from flatpack_remotes import get_remote_selector, selection_enabled
+            if selection_enabled(self.config):
+                remotes = get_remote_selector(self.config).rank(remotes)
         
         for i, app_id in enumerate(app_ids):
             if operation_type == "update":
                 command = ["flatpak", "update", "--noninteractive", app_id]
             elif operation_type == "install":
-                command = ["flatpak", "install", "--noninteractive", "flathub", app_id]
+                providers = catalog.resolve(app_id, remotes) if catalog else []
+                command = ["flatpak", "install", "--noninteractive", (providers or remotes)[0], app_id]
             elif operation_type == "remove":
                 command = ["flatpak", "remove", "--noninteractive", app_id]
             else:
@@ -290,17 +629,40 @@ class ParallelOperationManager:
                 package_manager="flatpak",
                 command=command,
                 priority=100 - i,  # Earlier in list = higher priority
-                estimated_duration=45.0 if operation_type == "install" else 20.0
+                estimated_duration=45.0 if operation_type == "install" else 20.0,
+                split_phases=operation_type in ("install", "update")
             )
             operations.append(operation)
         
         return operations
     
-    def create_pacman_operations(self, package_names: List[str], operation_type: str = "install") -> List[PackageOperation]:
-        """Create pacman operations from package names"""
+    def create_pacman_operations(self, package_names: List[str], operation_type: str = "install",
+                                 prefetch: bool = True) -> List[PackageOperation]:
+        """Create pacman operations from package names
+        
+        With prefetch, installs are preceded by a single download-only
+        operation (pacman -Sw) that every install batch depends on, so the
+        batches only unpack from the package cache. Submit it alongside
+        Flatpak operations to overlap the download with Flatpak work.
+        Packages matching excluded_packages are dropped and packages matching
+        priority_packages go into the first batches.
+        """
         operations = []
+        package_names = self.filter_packages(package_names)
         
         if operation_type == "install":
+            dependencies = []
+            if prefetch and package_names:
+                operations.append(PackageOperation(
+                    operation_type="prefetch",
+                    package_name="pacman_prefetch",
+                    package_manager="pacman",
+                    command=["sudo", "pacman", "-Sw", "--needed", "--noconfirm"] + package_names,
+                    priority=200,  # Start downloading before anything else
+                    estimated_duration=10.0 * len(package_names)
+                ))
+                dependencies = ["pacman_prefetch"]
+            
             # Group packages for batch installation (more efficient)
             batch_size = 5
             for i in range(0, len(package_names), batch_size):
@@ -313,7 +675,8 @@ class ParallelOperationManager:
                     package_manager="pacman",
                     command=command,
                     priority=100 - i,
-                    estimated_duration=30.0 * len(batch)
+                    dependencies=list(dependencies),
+                    estimated_duration=(20.0 if prefetch else 30.0) * len(batch)
                 )
                 operations.append(operation)
         else:
@@ -350,9 +713,9 @@ class ParallelOperationManager:
                 'stats': self.stats.copy()
             }
 
-def create_parallel_manager(config=None) -> ParallelOperationManager:
+def create_parallel_manager(config=None, journal=None) -> ParallelOperationManager:
     """Factory function to create a parallel operation manager"""
-    return ParallelOperationManager(config)
+    return ParallelOperationManager(config, journal)
 
 # Example usage and testing
 if __name__ == "__main__":
@@ -362,15 +725,17 @@ if __name__ == "__main__":
     parser.add_argument("--test-flatpak", action="store_true", help="Test with dummy Flatpak operations")
     parser.add_argument("--test-pacman", action="store_true", help="Test with dummy pacman operations") 
     parser.add_argument("--workers", type=int, default=0, help="Number of worker threads")
+    parser.add_argument("--policy", help="Scheduling policy (default: priority)")
     
     args = parser.parse_args()
     
     # Create manager
-    manager = ParallelOperationManager()
+    from flatpack_scheduling import get_scheduling_policy
+    manager = ParallelOperationManager(policy=get_scheduling_policy(name=args.policy))
     if args.workers > 0:
         manager.max_workers = args.workers
     
-    print(f"Parallel Operation Manager (Max workers: {manager.max_workers})")
+    print(f"Parallel Operation Manager (Max workers: {manager.max_workers}, policy: {manager.policy.name})")
     print("=" * 50)
     
     if args.test_flatpak:
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Flatpack Output Parser
+
+The single parser for flatpak CLI output. Tables printed with
+`--columns=...` (`flatpak list`, `flatpak remote-ls`, `flatpak remotes`)
+are parsed according to a column spec into typed records with __slots__;
+`flatpak update` transaction output is parsed into the refs it would touch.
+
+Records support item access (ref['id']), so they can stand in for the
+dicts the tools used before. Parsing never raises on malformed input:
+short rows are padded, extra columns are ignored, and blank rows are
+skipped.
+
+Run with --fuzz to feed the parsers a corpus of malformed output and with
+--benchmark to measure throughput on synthetic 10k-ref listings.
+"""
+
+from typing import List, Dict, Optional, Sequence, Tuple
+
+class Record:
+    """Base for parsed records: fixed fields with dict-style read access"""
+
+    __slots__ = ()
+
+    def __init__(self, *values, **fields):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name in self.__slots__[len(values):]:
+            setattr(self, name, fields.get(name, ''))
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def to_dict(self) -> Dict[str, str]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class InstalledRef(Record):
+    """An installed app or runtime (`flatpak list`)"""
+    __slots__ = ('id', 'name', 'version', 'branch', 'arch', 'origin', 'commit', 'kind', 'installed_size',
+                 'runtime')
+
+class RemoteRef(Record):
+    """A ref offered by a remote (`flatpak remote-ls`)"""
+    __slots__ = ('ref', 'id', 'name', 'version', 'branch', 'arch', 'commit', 'kind',
+                 'download_size', 'installed_size')
+
+class Remote(Record):
+    """A configured remote (`flatpak remotes`)"""
+    __slots__ = ('name', 'url')
+
+# flatpak column name -> record field
+COLUMN_FIELDS = {
+    'application': 'id',
+    'name': 'name',
+    'version': 'version',
+    'branch': 'branch',
+    'arch': 'arch',
+    'origin': 'origin',
+    'active': 'commit',
+    'commit': 'commit',
+    'ref': 'ref',
+    'url': 'url',
+    'download-size': 'download_size',
+    'installed-size': 'installed_size',
+    'size': 'installed_size',
+    'runtime': 'runtime'
+}
+
+# Multipliers of the units flatpak prints sizes in (GLib's g_format_size)
+SIZE_UNITS = {
+    'bytes': 1, 'byte': 1, 'b': 1,
+    'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3, 'tb': 1000 ** 4,
+    'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4
+}
+
+INSTALLED_COLUMNS = ('application', 'name', 'version', 'branch', 'arch', 'origin', 'active')
+
+def split_columns(columns) -> Tuple[str, ...]:
+    """Column spec as a tuple (accepts 'a,b,c' or a sequence)"""
+    if isinstance(columns, str):
+        columns = columns.split(',')
+    return tuple(column.strip() for column in columns)
+
+def columns_arg(columns) -> str:
+    """--columns= argument for a column spec"""
+    return '--columns=' + ','.join(split_columns(columns))
+
+def parse_table(output: str, columns, record_class=None, defaults: Optional[Dict[str, str]] = None) -> List[Record]:
+    """Parse tab-separated `--columns` output into records
+
+    Columns without a record field are ignored; fields without a column
+    take their value from defaults (or ''). Rows whose first column is
+    empty are skipped.
+    """
+    record_class = record_class or InstalledRef
+    columns = split_columns(columns)
+    slots = record_class.__slots__
+    defaults = defaults or {}
+
+    # Per column: position of its field in the record (or None)
+    positions = [slots.index(COLUMN_FIELDS[column]) if COLUMN_FIELDS.get(column) in slots else None
+                 for column in columns]
+    template = [defaults.get(name, '') for name in slots]
+    mapped = [(index, position) for index, position in enumerate(positions) if position is not None]
+
+    records = []
+    append = records.append
+    for line in output.splitlines():
+        if not line or line.isspace():
+            continue
+        parts = line.split('\t')
+        if not parts[0].strip():
+            continue
+        values = template[:]
+        count = len(parts)
+        for index, position in mapped:
+            if index < count:
+                values[position] = parts[index].strip()
+        append(record_class(*values))
+    return records
+
+def parse_installed(output: str, columns=INSTALLED_COLUMNS, kind: str = 'app') -> List[InstalledRef]:
+    """Parse `flatpak list --app|--runtime --columns=...` output"""
+    return parse_table(output, columns, InstalledRef, {'kind': kind})
+
+def normalize_ref(ref: str, kind: str = 'app') -> str:
+    """Full kind/ID/arch/branch form of a ref (some columns omit the kind)"""
+    if ref.startswith(('app/', 'runtime/')):
+        return ref
+    return f"{kind}/{ref}"
+
+def parse_remote_refs(output: str, columns, kind: str = 'app') -> List[RemoteRef]:
+    """Parse `flatpak remote-ls --columns=...` output
+
+    Each record's ref is the full kind/ID/arch/branch form, filled in from
+    the id/arch/branch columns when no ref column was requested, and the
+    id/arch/branch fields are filled in from the ref.
+    """
+    records = parse_table(output, columns, RemoteRef, {'kind': kind})
+    for record in records:
+        if record.ref:
+            record.ref = normalize_ref(record.ref, kind)
+            parts = record.ref.split('/')
+            if len(parts) >= 4:
+                record.kind = parts[0]
+                record.id = record.id or parts[1]
+                record.arch = record.arch or parts[2]
+                record.branch = record.branch or parts[3]
+        elif record.id and record.arch and record.branch:
+            record.ref = f"{kind}/{record.id}/{record.arch}/{record.branch}"
+    return records
+
+def parse_remotes(output: str, columns=('name', 'url')) -> List[Remote]:
+    """Parse `flatpak remotes --columns=...` output"""
+    return parse_table(output, columns, Remote)
+
+def parse_size(text: str) -> int:
+    """Bytes in a size column such as "12.3 MB", "940 kB" or "1,2 GB" (0 if unparsable)"""
+    parts = text.replace('\u00a0', ' ').split()
+    if not parts:
+        return 0
+    try:
+        value = float(parts[0].replace(',', '.'))
+    except ValueError:
+        return 0
+    unit = parts[1].lower() if len(parts) > 1 else 'bytes'
+    return int(value * SIZE_UNITS.get(unit, 0))
+
+def parse_names(output: str) -> List[str]:
+    """First column of every row (e.g. `--columns=name` or `--columns=application`)"""
+    names = []
+    for line in output.splitlines():
+        name = line.split('\t', 1)[0].strip()
+        if name:
+            names.append(name)
+    return names
+
+def parse_update_output(output: str, kind: Optional[str] = 'app') -> List[str]:
+    """IDs of the refs a `flatpak update` transaction updates
+
+    Non-interactive transactions print one "Updating <ref>" line per
+    operation (e.g. "Updating app/com.example.App/x86_64/stable"). Only
+    refs of the given kind are returned (all refs if kind is None).
+    """
+    ids = []
+    seen = set()
+    for line in output.splitlines():
+        line = line.strip()
+        if not line.startswith('Updating '):
+            continue
+        ref = line[len('Updating '):].split(None, 1)
+        if not ref:
+            continue
+        parts = ref[0].split('/')
+        if len(parts) < 2 or parts[0] not in ('app', 'runtime') or not parts[1]:
+            continue
+        if kind and parts[0] != kind:
+            continue
+        if parts[1] not in seen:
+            seen.add(parts[1])
+            ids.append(parts[1])
+    return ids
+
+def format_table(records: Sequence[Record], fields: Sequence[str]) -> str:
+    """Tab-separated rows of the given record fields (the inverse of parse_table)"""
+    return ''.join('\t'.join(str(record.get(field, '') or '') for field in fields) + '\n'
+                   for record in records)
+
+# Seed corpus for --fuzz: real output shapes plus the malformations seen in the wild
+FUZZ_CORPUS = [
+    "",
+    "\n\n\n",
+    "   \n\t\n",
+    "org.mozilla.firefox\tFirefox\t128.0\tstable\tx86_64\tflathub\tabc123def456\n",
+    "org.mozilla.firefox\tFirefox\n",
+    "org.mozilla.firefox\tFirefox\t128.0\tstable\tx86_64\tflathub\tabc123def456\textra\tcolumns\n",
+    "\tFirefox\t128.0\tstable\n",
+    "Application ID\tName\tVersion\tBranch\n",
+    "org.example.App\tÜñíçødé Nämé ✓\t1.0\tstable\r\n",
+    "org.example.App\t\t\t\t\t\t\n",
+    "\x1b[1morg.example.App\x1b[0m\tName\t1\tstable\n",
+    "app/org.example.App/x86_64/stable\tabc123\n",
+    "org.example.App/x86_64/stable\tabc123\n",
+    "runtime/org.gnome.Platform/x86_64/46\tdef456\n",
+    "app/\t\n",
+    "app//x86_64/stable\tabc\n",
+    "flathub\thttps://dl.flathub.org/repo/\n",
+    "flathub\n",
+    "Looking for updates…\nUpdating app/org.example.App/x86_64/stable\nUpdating runtime/org.gnome.Platform/x86_64/46\nChanges complete.\n",
+    "Updating \nUpdating app\nUpdating app/\nUpdating /org.x/y/z\n",
+    "Updating app/org.example.App/x86_64/stable from flathub\n",
+    "org.example.App\tName" + "\t" * 500 + "\n",
+    "x" * 100000,
+    "\x00\x01\x02\tname\n",
+]
+
+def fuzz_inputs(iterations: int, seed: int):
+    """The seed corpus followed by random mutations of it"""
+    import random
+
+    rng = random.Random(seed)
+    alphabet = ['\t', '\n', '\r', ' ', '/', 'app/', 'Updating ', '\x00', 'é', '✓', 'a', '.']
+    yield from FUZZ_CORPUS
+    for _ in range(iterations):
+        text = list(rng.choice(FUZZ_CORPUS))
+        for _ in range(rng.randint(1, 8)):
+            operation = rng.randrange(3)
+            position = rng.randint(0, len(text))
+            if operation == 0:
+                text.insert(position, rng.choice(alphabet))
+            elif operation == 1 and text:
+                del text[min(position, len(text) - 1)]
+            else:
+                text = text[:position]
+        yield ''.join(text)
+
+def fuzz(iterations: int = 10000, seed: int = 0) -> int:
+    """Run every parser over the fuzz inputs; returns the number of failures"""
+    column_specs = [INSTALLED_COLUMNS, ('application',), ('ref', 'commit'), ('application', 'name', 'branch')]
+    failures = 0
+    count = 0
+
+    for text in fuzz_inputs(iterations, seed):
+        count += 1
+        try:
+            for columns in column_specs:
+                for record in parse_installed(text, columns):
+                    assert all(isinstance(record[name], str) for name in record.keys())
+                for record in parse_remote_refs(text, columns):
+                    assert all(isinstance(record[name], str) for name in record.keys())
+            for remote in parse_remotes(text):
+                assert remote.name and '\t' not in remote.name
+            assert all(names.strip() for names in parse_names(text))
+            for app_id in parse_update_output(text, None):
+                assert app_id and '/' not in app_id
+            records = parse_installed(text)
+            assert parse_installed(format_table(records, InstalledRef.__slots__[:7])) == records
+        except Exception as e:
+            failures += 1
+            if failures <= 10:
+                print(f"FAIL ({type(e).__name__}: {e}) on input {text[:120]!r}")
+
+    print(f"Fuzzed {count} inputs: {failures} failure(s)")
+    return failures
+
+def synthetic_outputs(refs: int) -> Dict[str, str]:
+    """flatpak list / remote-ls / update output with the given number of refs"""
+    ids = [f"org.example{i // 100}.App{i}" for i in range(refs)]
+    return {
+        'list': ''.join(f"{app_id}\tExample App {i}\t{i % 7}.{i % 13}.0\tstable\tx86_64\tflathub\t{i:012x}\n"
+                        for i, app_id in enumerate(ids)),
+        'remote-ls': ''.join(f"app/{app_id}/x86_64/stable\t{i:012x}\n" for i, app_id in enumerate(ids)),
+        'update': "Looking for updates…\n" + ''.join(f"Updating app/{app_id}/x86_64/stable\n" for app_id in ids)
+    }
+
+def benchmark(refs: int = 10000, rounds: int = 20):
+    """Report parser throughput on synthetic outputs"""
+    import time
+
+    outputs = synthetic_outputs(refs)
+    cases = [
+        ('flatpak list', lambda: parse_installed(outputs['list'])),
+        ('flatpak remote-ls', lambda: parse_remote_refs(outputs['remote-ls'], ('ref', 'commit'))),
+        ('flatpak update', lambda: parse_update_output(outputs['update'])),
+    ]
+
+    print(f"Parser benchmark: {refs} refs, best of {rounds} rounds")
+    for name, parse in cases:
+        parsed = len(parse())
+        best = min(timed(parse, time.perf_counter) for _ in range(rounds))
+        print(f"  {name:<18} {best * 1000:8.2f} ms  {best / refs * 1e6:6.2f} µs/ref  "
+              f"{refs / best:>12,.0f} refs/s  ({parsed} parsed)")
+
+def timed(function, clock) -> float:
+    start_time = clock()
+    function()
+    return clock() - start_time
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Flatpack Output Parser")
+    parser.add_argument("--fuzz", action="store_true", help="Fuzz the parsers with malformed output")
+    parser.add_argument("--iterations", type=int, default=10000, help="Mutated inputs to generate for --fuzz")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for --fuzz")
+    parser.add_argument("--benchmark", action="store_true", help="Measure parser throughput")
+    parser.add_argument("--refs", type=int, default=10000, help="Refs per synthetic output for --benchmark")
+
+    args = parser.parse_args()
+
+    if args.fuzz:
+        sys.exit(1 if fuzz(args.iterations, args.seed) else 0)
+    elif args.benchmark:
+        benchmark(args.refs)
+    else:
+        parser.print_help()
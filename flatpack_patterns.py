@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Flatpack Package Patterns
+
+Compiles the excluded_packages and priority_packages config lists into
+matchers for Flatpak app IDs and native package names. Each entry is one of:
+
+- an exact name: org.mozilla.firefox
+- a glob: org.kde.*, lib32-*
+- a regular expression, prefixed with re: (re:org\\.gnome\\.(Games|Chess).*)
+
+Patterns match the whole name. Exact names go into a set and all globs and
+regular expressions are compiled into a single alternation, so a lookup is
+one hash probe plus at most one regex match; results are memoized per name.
+Expressions that cannot be part of an alternation (such as ones starting
+with global flags like (?i)) are compiled and matched on their own.
+"""
+
+import fnmatch
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+REGEX_PREFIX = 're:'
+GLOB_CHARS = frozenset('*?[')
+
+class PackageMatcher:
+    """Matches names against a list of exact, glob and re: patterns"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = [str(pattern) for pattern in patterns or [] if pattern]
+        self.exact = set()
+        self.separate: List[Pattern] = []
+        expressions = []
+        for pattern in self.patterns:
+            if pattern.startswith(REGEX_PREFIX):
+                expression = pattern[len(REGEX_PREFIX):]
+                try:
+                    compiled = re.compile(expression)
+                except re.error as e:
+                    print(f"Warning: Ignoring invalid package pattern '{pattern}': {e}")
+                    continue
+                try:
+                    re.compile(f"(?:{expression})")
+                except re.error:
+                    self.separate.append(compiled)
+                    continue
+                expressions.append(expression)
+            elif GLOB_CHARS.intersection(pattern):
+                expressions.append(fnmatch.translate(pattern))
+            else:
+                self.exact.add(pattern)
+        self.regex: Optional[Pattern] = None
+        if expressions:
+            try:
+                self.regex = re.compile('|'.join(f"(?:{expression})" for expression in expressions))
+            except re.error:
+                # e.g. the same group name in two expressions
+                self.separate.extend(re.compile(expression) for expression in expressions)
+        self.cache: Dict[str, bool] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.exact) or self.regex is not None or bool(self.separate)
+
+    def matches(self, name: str) -> bool:
+        result = self.cache.get(name)
+        if result is None:
+            result = (name in self.exact or bool(self.regex and self.regex.fullmatch(name))
+                      or any(pattern.fullmatch(name) for pattern in self.separate))
+            self.cache[name] = result
+        return result
+
+class PackageFilter:
+    """The excluded_packages and priority_packages matchers of one configuration"""
+
+    def __init__(self, excluded: Iterable[str] = (), priority: Iterable[str] = ()):
+        self.excluded = PackageMatcher(excluded)
+        self.priority = PackageMatcher(priority)
+
+    def is_excluded(self, name: str) -> bool:
+        return self.excluded.matches(name)
+
+    def is_priority(self, name: str) -> bool:
+        return self.priority.matches(name)
+
+    def without_excluded(self, names: Iterable[str]) -> List[str]:
+        return [name for name in names if not self.is_excluded(name)]
+
+    def prioritize(self, names: Iterable[str]) -> List[str]:
+        """Names in their original order, with the priority ones moved to the front"""
+        names = list(names)
+        if not self.priority:
+            return names
+        return sorted(names, key=lambda name: not self.is_priority(name))
+
+    def apply(self, names: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """(names to act on with priority ones first, excluded names)"""
+        names = list(names)
+        if not self.excluded and not self.priority:
+            return names, []
+        excluded = [name for name in names if self.is_excluded(name)]
+        kept = [name for name in names if not self.is_excluded(name)]
+        return self.prioritize(kept), excluded
+
+_filters: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]], PackageFilter] = {}
+_filters_lock = threading.Lock()
+
+def get_package_filter(config=None) -> PackageFilter:
+    """The compiled filter for the configured excluded_packages and priority_packages"""
+    if config is None:
+        from flatpack_config import get_config
+        config = get_config()
+    key = (tuple(config.get('excluded_packages', []) or []), tuple(config.get('priority_packages', []) or []))
+    with _filters_lock:
+        if key not in _filters:
+            _filters[key] = PackageFilter(*key)
+        return _filters[key]
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Package Patterns")
+    parser.add_argument("names", nargs="*", help="App IDs or package names to classify")
+    parser.add_argument("--exclude", action="append", metavar="PATTERN", help="Excluded pattern (default: configured)")
+    parser.add_argument("--priority", action="append", metavar="PATTERN", help="Priority pattern (default: configured)")
+
+    args = parser.parse_args()
+
+    if args.exclude is not None or args.priority is not None:
+        package_filter = PackageFilter(args.exclude or [], args.priority or [])
+    else:
+        package_filter = get_package_filter()
+
+    print(f"Excluded: {', '.join(package_filter.excluded.patterns) or '(none)'}")
+    print(f"Priority: {', '.join(package_filter.priority.patterns) or '(none)'}")
+    kept, excluded = package_filter.apply(args.names)
+    for name in kept:
+        print(f"  {'⭐' if package_filter.is_priority(name) else '  '} {name}")
+    for name in excluded:
+        print(f"  🚫 {name} (excluded)")
@@ -4,18 +4,57 @@ Flatpack Plugin/Extension System
 
 Allows custom scripts and extensions to be integrated into the Flatpack ecosystem.
 Provides a flexible framework for extending functionality without modifying core code.
+
+Discovered plugin metadata is kept in a manifest index
+(~/.cache/flatpack/plugin_index.json) keyed on each plugin file's mtime and
+size, and plugins are only imported and initialized when a hook they
+registered for first runs.
+
+Hooks run either as transformers (in registration order on the caller's
+thread, each may change the context) or as observers (read-only, run
+concurrently on a bounded pool after the transformers). Every hook call has
+a per-plugin deadline; plugins that overrun it are reported and can be
+disabled for the rest of the run.
+
+Per-plugin, per-hook call counts, errors and latency histograms are kept
+across runs in ~/.local/share/flatpack/plugin_stats.json; `flatpack-plugins
+--profile` ranks plugins by the total time they added.
 """
 
+import bisect
 import os
 import sys
 import json
+import queue
+import threading
 import importlib.util
 import subprocess
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Callable, Union
-from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Callable, Set, Union
+from dataclasses import asdict, dataclass
 from abc import ABC, abstractmethod
 import traceback
+import atexit
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+PLUGIN_INDEX_FILE = Path.home() / '.cache' / 'flatpack' / 'plugin_index.json'
+PLUGIN_INDEX_FORMAT = 3
+SCRIPT_SUFFIXES = ['.py', '.sh', '.bash', '.zsh', '.fish']
+
+# Script plugin protocols: 'exec' runs the script once per action, 'ndjson'
+# keeps one co-process per plugin answering JSON lines on stdin/stdout
+SCRIPT_PROTOCOLS = ('exec', 'ndjson')
+COPROCESS_TIMEOUT = 30.0
+COPROCESS_MAX_RESTARTS = 3
+
+HOOK_TIMEOUT = 10.0
+OBSERVER_WORKERS = 4
+SLOW_HOOK_LIMIT = 3  # Deadline overruns before a plugin is disabled (plugins.auto_disable_slow)
+
+PLUGIN_STATS_FILE = Path.home() / '.local' / 'share' / 'flatpack' / 'plugin_stats.json'
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
 
 @dataclass
 class PluginInfo:
@@ -29,12 +68,19 @@ class PluginInfo:
     dependencies: List[str] = None
     config_schema: Dict[str, Any] = None
     enabled: bool = True
+    hooks: List[str] = None  # Hooks the plugin handles, so it can be registered without importing it
+    protocol: str = 'exec'  # Script plugins: 'exec' or 'ndjson' (co-process)
+    observer_hooks: List[str] = None  # Hooks the plugin only observes (see HookPlugin)
     
     def __post_init__(self):
         if self.dependencies is None:
             self.dependencies = []
         if self.config_schema is None:
             self.config_schema = {}
+        if self.hooks is None:
+            self.hooks = []
+        if self.observer_hooks is None:
+            self.observer_hooks = []
 
 class PluginBase(ABC):
     """Base class for Python plugins"""
@@ -68,6 +114,15 @@ class HookPlugin(PluginBase):
         """Return list of hooks this plugin supports"""
         return []
     
+    def get_observer_hooks(self) -> List[str]:
+        """Hooks this plugin only observes
+        
+        Observers get a copy of the context, run concurrently with other
+        observers off the caller's thread, and their return value is
+        ignored. All other supported hooks run as transformers.
+        """
+        return []
+    
     def execute_hook(self, hook_name: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a specific hook with given context"""
         return context
@@ -75,10 +130,11 @@ class HookPlugin(PluginBase):
 class ScriptPlugin:
     """Wrapper for script-based plugins"""
     
-    def __init__(self, script_path: Path, info: PluginInfo):
+    def __init__(self, script_path: Path, info: PluginInfo, timeout: float = COPROCESS_TIMEOUT):
         self.script_path = script_path
         self.info = info
         self.executable = self.detect_interpreter()
+        self.coprocess = ScriptCoprocess(self, timeout) if info.protocol == 'ndjson' else None
     
     def detect_interpreter(self) -> str:
         """Detect the appropriate interpreter for the script"""
@@ -101,19 +157,289 @@ class ScriptPlugin:
                 pass
             return 'bash'  # Default fallback
     
-    def execute(self, action: str = 'run', args: List[str] = None) -> subprocess.CompletedProcess:
-        """Execute the script with given action and arguments"""
+    def execute(self, action: str = 'run', args: List[str] = None,
+                context: Optional[Dict[str, Any]] = None) -> subprocess.CompletedProcess:
+        """Execute the script with given action and arguments
+        
+        Co-process plugins answer through their running process; the
+        others are run once per action with the context as JSON on stdin.
+        """
         if args is None:
             args = []
         
+        if self.coprocess and not self.coprocess.failed:
+            return self.coprocess.request(action, args, context or {})
+        
         cmd = [self.executable, str(self.script_path), action] + args
         
         return subprocess.run(
             cmd,
+            input=json.dumps(context) if context is not None else None,
             capture_output=True,
             text=True,
             cwd=self.script_path.parent
         )
+    
+    def execute_hook(self, hook_name: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a hook action; a JSON object printed on stdout replaces the context"""
+        result = self.execute(hook_name, context=context)
+        new_context = getattr(result, 'context', None)
+        if new_context is None and result.stdout.strip().startswith('{'):
+            try:
+                new_context = json.loads(result.stdout)
+            except json.JSONDecodeError:
+                pass
+        return new_context if isinstance(new_context, dict) else context
+    
+    def stop(self):
+        if self.coprocess:
+            self.coprocess.stop()
+
+class ScriptCoprocess:
+    """A long-lived script plugin process speaking newline-delimited JSON
+    
+    The script is started once as `<script> coprocess` and then reads one
+    request per line on stdin:
+    
+        {"id": 1, "action": "post_install", "args": [], "context": {...}}
+    
+    and writes one response per line on stdout:
+    
+        {"id": 1, "returncode": 0, "stdout": "...", "stderr": "", "context": {...}}
+    
+    A request that times out kills the process; a dead process is
+    restarted on the next request. After COPROCESS_MAX_RESTARTS consecutive
+    failures the plugin falls back to running once per action.
+    """
+    
+    def __init__(self, plugin: ScriptPlugin, timeout: float = COPROCESS_TIMEOUT):
+        self.plugin = plugin
+        self.timeout = timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.responses: Optional[queue.Queue] = None
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.failures = 0
+        self.failed = False
+        self.starts = 0
+    
+    def start(self):
+        cmd = [self.plugin.executable, str(self.plugin.script_path), 'coprocess']
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+            cwd=self.plugin.script_path.parent
+        )
+        self.responses = queue.Queue()
+        threading.Thread(target=self.read_responses, args=(self.process, self.responses), daemon=True).start()
+        self.starts += 1
+        if self.starts == 1:
+            atexit.register(self.stop)
+    
+    @staticmethod
+    def read_responses(process: subprocess.Popen, responses: queue.Queue):
+        for line in process.stdout:
+            responses.put(line)
+        responses.put(None)  # EOF: the process exited
+    
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+    
+    def request(self, action: str, args: List[str], context: Dict[str, Any]) -> subprocess.CompletedProcess:
+        with self.lock:
+            cmd = [self.plugin.executable, str(self.plugin.script_path), action] + args
+            try:
+                if not self.running():
+                    self.start()
+                response = self.exchange({'action': action, 'args': args, 'context': context})
+            except (OSError, ValueError, TimeoutError) as e:
+                self.kill()
+                self.failures += 1
+                if self.failures >= COPROCESS_MAX_RESTARTS:
+                    self.failed = True
+                    print(f"⚠️  Co-process of plugin {self.plugin.info.name} failed {self.failures} times, "
+                          f"running it once per action instead")
+                return subprocess.CompletedProcess(cmd, 124 if isinstance(e, TimeoutError) else 1, "", str(e))
+            
+            self.failures = 0
+            result = subprocess.CompletedProcess(
+                cmd, response.get('returncode', 0), response.get('stdout', ''), response.get('stderr', '')
+            )
+            result.context = response.get('context')
+            return result
+    
+    def exchange(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self.next_id += 1
+        request_id = self.next_id
+        self.process.stdin.write(json.dumps(dict(payload, id=request_id)) + '\n')
+        self.process.stdin.flush()
+        
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"no response within {self.timeout:g}s")
+            try:
+                line = self.responses.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if line is None:
+                raise OSError("co-process exited")
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Stray output from the script
+            if isinstance(response, dict) and response.get('id') == request_id:
+                return response
+    
+    def kill(self):
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+    
+    def stop(self):
+        """Close stdin so the script can exit cleanly, then make sure it does"""
+        process, self.process = self.process, None
+        if process is None or process.poll() is not None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+class PluginStats:
+    """Call counts, errors and latency histograms per plugin and hook
+    
+    Counts are kept for this run and merged into the stats file by save(),
+    so concurrent runs only ever add to it.
+    """
+    
+    def __init__(self, stats_file: Optional[Path] = None):
+        self.stats_file = Path(stats_file) if stats_file else PLUGIN_STATS_FILE
+        self.lock = threading.Lock()
+        self.run: Dict[str, Dict[str, Dict[str, Any]]] = {}  # plugin -> hook -> entry
+    
+    @staticmethod
+    def new_entry() -> Dict[str, Any]:
+        return {'calls': 0, 'errors': 0, 'timeouts': 0, 'total': 0.0, 'max': 0.0,
+                'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+    
+    def record(self, plugin_name: str, hook_name: str, duration: float,
+               error: bool = False, timeout: bool = False):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, duration * 1000)
+        with self.lock:
+            entry = self.run.setdefault(plugin_name, {}).setdefault(hook_name, self.new_entry())
+            entry['calls'] += 1
+            entry['errors'] += int(error)
+            entry['timeouts'] += int(timeout)
+            entry['total'] += duration
+            entry['max'] = max(entry['max'], duration)
+            entry['buckets'][bucket] += 1
+    
+    def load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        try:
+            with open(self.stats_file, 'r') as f:
+                stats = json.load(f)
+            if isinstance(stats, dict):
+                return stats
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {}
+    
+    @staticmethod
+    def merge(stats: Dict, run: Dict):
+        for plugin_name, hooks in run.items():
+            for hook_name, entry in hooks.items():
+                total = stats.setdefault(plugin_name, {}).setdefault(hook_name, PluginStats.new_entry())
+                for key in ('calls', 'errors', 'timeouts', 'total'):
+                    total[key] += entry[key]
+                total['max'] = max(total['max'], entry['max'])
+                if len(total['buckets']) != len(entry['buckets']):
+                    total['buckets'] = [0] * len(entry['buckets'])
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], entry['buckets'])]
+    
+    def combined(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Persisted stats plus this run's"""
+        stats = self.load()
+        with self.lock:
+            self.merge(stats, self.run)
+        return stats
+    
+    def save(self):
+        """Add this run's counts to the stats file"""
+        with self.lock:
+            run, self.run = self.run, {}
+        if not run:
+            return
+        stats = self.load()
+        self.merge(stats, run)
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.stats_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(stats, f)
+            os.replace(tmp_file, self.stats_file)
+        except OSError:
+            pass
+    
+    def reset(self):
+        with self.lock:
+            self.run = {}
+        try:
+            self.stats_file.unlink()
+        except FileNotFoundError:
+            pass
+    
+    @staticmethod
+    def percentile(buckets: List[int], fraction: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the given fraction of calls (None: unbounded)"""
+        target = fraction * sum(buckets)
+        seen = 0
+        for index, count in enumerate(buckets):
+            seen += count
+            if count and seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else None
+        return None
+    
+    @staticmethod
+    def summarize(hooks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Totals of one plugin over all its hooks"""
+        summary = PluginStats.new_entry()
+        for entry in hooks.values():
+            PluginStats.merge({'plugin': {'all': summary}}, {'plugin': {'all': entry}})
+        return summary
+    
+    def report(self):
+        """Print plugins ranked by the total time they added"""
+        stats = self.combined()
+        if not stats:
+            print("No plugin timings recorded yet")
+            return
+        
+        def format_ms(value: Optional[float]) -> str:
+            return f"≤{value:g}" if value is not None else f">{LATENCY_BUCKETS_MS[-1]}"
+        
+        ranked = sorted(stats.items(), key=lambda item: self.summarize(item[1])['total'], reverse=True)
+        print(f"{'Plugin / hook':<36} {'calls':>7} {'errors':>6} {'total s':>9} {'mean ms':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'max ms':>9}")
+        print("=" * 100)
+        for plugin_name, hooks in ranked:
+            rows = [(f"🔌 {plugin_name}", self.summarize(hooks))]
+            if len(hooks) > 1:
+                rows += [(f"   {hook_name}", entry) for hook_name, entry in
+                         sorted(hooks.items(), key=lambda item: item[1]['total'], reverse=True)]
+            for label, entry in rows:
+                mean = entry['total'] / entry['calls'] * 1000 if entry['calls'] else 0.0
+                errors = entry['errors'] + entry['timeouts']
+                print(f"{label:<36} {entry['calls']:>7} {errors:>6} {entry['total']:>9.3f} {mean:>9.2f} "
+                      f"{format_ms(self.percentile(entry['buckets'], 0.5)):>8} "
+                      f"{format_ms(self.percentile(entry['buckets'], 0.95)):>8} {entry['max'] * 1000:>9.1f}")
 
 class PluginManager:
     def __init__(self, config=None):
@@ -122,6 +448,16 @@ class PluginManager:
         self.loaded_plugins: Dict[str, Union[PluginBase, ScriptPlugin]] = {}
         self.plugin_configs: Dict[str, Dict[str, Any]] = {}
         self.hooks: Dict[str, List[str]] = {}  # hook_name -> [plugin_names]
+        self.available: Dict[str, PluginInfo] = {}  # Registered plugins, loaded on first use
+        self.failed_plugins: Set[str] = set()
+        self.index_file = PLUGIN_INDEX_FILE
+        self._probed: Dict[str, PluginBase] = {}  # Instances imported while indexing
+        self.observers: Dict[str, Set[str]] = {}  # hook_name -> plugins that only observe it
+        self.slow_counts: Dict[str, int] = {}
+        self.lock = threading.RLock()
+        self._observer_pool: Optional[ThreadPoolExecutor] = None
+        self._observer_futures: Set[Future] = set()
+        self.stats = PluginStats()
         
         # Ensure plugins directory exists
         self.plugins_dir.mkdir(parents=True, exist_ok=True)
@@ -158,22 +494,108 @@ class PluginManager:
             print(f"Error saving plugin configs: {e}")
     
     def discover_plugins(self) -> List[PluginInfo]:
-        """Discover available plugins in the plugins directory"""
-        discovered = []
-        
-        for item in self.plugins_dir.iterdir():
-            if item.is_dir():
-                # Python plugin directory
-                plugin_info = self.discover_python_plugin(item)
-                if plugin_info:
-                    discovered.append(plugin_info)
-            elif item.is_file() and item.suffix in ['.py', '.sh', '.bash', '.zsh', '.fish']:
-                # Script plugin
-                plugin_info = self.discover_script_plugin(item)
-                if plugin_info:
-                    discovered.append(plugin_info)
-        
-        return discovered
+        """Discover available plugins in the plugins directory
+        
+        Only plugins that are new or whose files changed since the last
+        run are parsed; everything else comes from the manifest index.
+        """
+        index = self.load_index()
+        entries = {}
+        
+        for item in sorted(self.plugins_dir.iterdir()):
+            entry = index.get(item.name)
+            if not self.index_entry_current(entry):
+                entry = self.index_plugin(item)
+                if entry is None:
+                    continue
+            entries[item.name] = entry
+        
+        if entries != index:
+            self.save_index(entries)
+        
+        return [PluginInfo(**entry['info']) for entry in entries.values() if entry['info']]
+    
+    def load_index(self) -> Dict[str, Dict]:
+        """Index entries (plugins directory entry -> files and metadata)"""
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if index.get('format') != PLUGIN_INDEX_FORMAT or index.get('plugins_dir') != str(self.plugins_dir):
+            return {}
+        return index.get('entries', {})
+    
+    def save_index(self, entries: Dict[str, Dict]):
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    'format': PLUGIN_INDEX_FORMAT,
+                    'plugins_dir': str(self.plugins_dir),
+                    'entries': entries
+                }, f)
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            pass
+    
+    def clear_index(self):
+        try:
+            self.index_file.unlink()
+        except FileNotFoundError:
+            pass
+    
+    @staticmethod
+    def file_signature(path: Path) -> Optional[List[int]]:
+        """[mtime_ns, size] of a file, or None if it does not exist"""
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+    
+    def index_entry_current(self, entry: Optional[Dict]) -> bool:
+        return bool(entry) and all(
+            self.file_signature(self.plugins_dir / name) == signature
+            for name, signature in entry['files'].items()
+        )
+    
+    def index_plugin(self, item: Path) -> Optional[Dict]:
+        """Parse a plugins directory entry into an index entry (None if it is not a plugin)"""
+        if item.is_dir():
+            files = [item / 'plugin.json']
+            plugin_info = self.discover_python_plugin(item)
+            if plugin_info:
+                files.append(item / plugin_info.entry_point)
+                if not plugin_info.hooks and not plugin_info.observer_hooks:
+                    self.probe_hooks(plugin_info)
+        elif item.is_file() and item.suffix in SCRIPT_SUFFIXES:
+            files = [item]
+            plugin_info = self.discover_script_plugin(item)
+        else:
+            return None
+        
+        return {
+            'files': {str(path.relative_to(self.plugins_dir)): self.file_signature(path) for path in files},
+            'info': asdict(plugin_info) if plugin_info else None
+        }
+    
+    def probe_hooks(self, plugin_info: PluginInfo):
+        """Fill in the hooks of a Python plugin whose plugin.json does not list them
+        
+        The plugin is imported (not initialized) to ask it; this happens
+        only when the plugin is new or changed.
+        """
+        plugin = self.load_python_plugin(plugin_info)
+        if not isinstance(plugin, HookPlugin):
+            return
+        self._probed[plugin_info.name] = plugin
+        try:
+            plugin_info.hooks = list(plugin.get_supported_hooks())
+            plugin_info.observer_hooks = list(plugin.get_observer_hooks())
+        except Exception as e:
+            print(f"Error reading hooks of plugin {plugin_info.name}: {e}")
     
     def discover_python_plugin(self, plugin_dir: Path) -> Optional[PluginInfo]:
         """Discover a Python plugin from its directory"""
@@ -211,13 +633,21 @@ class PluginManager:
             if 'name' not in metadata:
                 return None
             
+            protocol = metadata.get('protocol', 'exec').lower()
+            if protocol not in SCRIPT_PROTOCOLS:
+                print(f"Unknown protocol '{protocol}' in script plugin {script_path}, using 'exec'")
+                protocol = 'exec'
+            
             return PluginInfo(
                 name=metadata.get('name', script_path.stem),
                 version=metadata.get('version', '1.0'),
                 description=metadata.get('description', ''),
                 author=metadata.get('author', 'Unknown'),
                 plugin_type='script',
-                entry_point=str(script_path)
+                entry_point=str(script_path),
+                hooks=[hook.strip() for hook in metadata.get('hooks', '').split(',') if hook.strip()],
+                protocol=protocol,
+                observer_hooks=[hook.strip() for hook in metadata.get('observes', '').split(',') if hook.strip()]
             )
             
         except Exception as e:
@@ -226,6 +656,9 @@ class PluginManager:
     
     def load_python_plugin(self, plugin_info: PluginInfo) -> Optional[PluginBase]:
         """Load a Python plugin"""
+        if plugin_info.name in self._probed:
+            return self._probed.pop(plugin_info.name)
+        
         plugin_dir = self.plugins_dir / plugin_info.name
         main_file = plugin_dir / plugin_info.entry_point
         
@@ -268,7 +701,8 @@ class PluginManager:
             print(f"Script plugin not found: {script_path}")
             return None
         
-        return ScriptPlugin(script_path, plugin_info)
+        timeout = self.config.get('plugins.coprocess_timeout', COPROCESS_TIMEOUT) if self.config else COPROCESS_TIMEOUT
+        return ScriptPlugin(script_path, plugin_info, timeout)
     
     def load_plugin(self, plugin_info: PluginInfo) -> bool:
         """Load a single plugin"""
@@ -303,30 +737,83 @@ class PluginManager:
                 # Register hooks for hook plugins
                 if isinstance(plugin, HookPlugin):
                     for hook_name in plugin.get_supported_hooks():
-                        if hook_name not in self.hooks:
-                            self.hooks[hook_name] = []
-                        self.hooks[hook_name].append(plugin_info.name)
+                        self.register_hook(hook_name, plugin_info.name)
+                    for hook_name in plugin.get_observer_hooks():
+                        self.register_hook(hook_name, plugin_info.name, observer=True)
                         
             except Exception as e:
                 print(f"Error initializing plugin {plugin_info.name}: {e}")
                 return False
         
+        self.register_info_hooks(plugin_info)
+        
         self.loaded_plugins[plugin_info.name] = plugin
+        self.available[plugin_info.name] = plugin_info
         print(f"✅ Loaded plugin: {plugin_info.name} v{plugin_info.version}")
         return True
     
-    def load_all_plugins(self) -> int:
-        """Load all discovered plugins"""
+    def register_hook(self, hook_name: str, plugin_name: str, observer: bool = False):
+        plugin_names = self.hooks.setdefault(hook_name, [])
+        if plugin_name not in plugin_names:
+            plugin_names.append(plugin_name)
+        if observer:
+            self.observers.setdefault(hook_name, set()).add(plugin_name)
+    
+    def register_info_hooks(self, plugin_info: PluginInfo):
+        for hook_name in plugin_info.hooks:
+            self.register_hook(hook_name, plugin_info.name)
+        for hook_name in plugin_info.observer_hooks:
+            self.register_hook(hook_name, plugin_info.name, observer=True)
+    
+    def register_plugin(self, plugin_info: PluginInfo) -> bool:
+        """Make a plugin available without importing it; get_plugin() loads it on first use"""
+        if not plugin_info.enabled:
+            print(f"Plugin {plugin_info.name} is disabled")
+            return False
+        
+        self.available[plugin_info.name] = plugin_info
+        self.register_info_hooks(plugin_info)
+        return True
+    
+    def get_plugin(self, plugin_name: str) -> Optional[Union[PluginBase, ScriptPlugin]]:
+        """A loaded plugin, loading and initializing a registered one on first use"""
+        plugin = self.loaded_plugins.get(plugin_name)
+        if plugin is None:
+            with self.lock:  # Observers may load plugins from pool threads
+                plugin = self.loaded_plugins.get(plugin_name)
+                if plugin is None and plugin_name in self.available and plugin_name not in self.failed_plugins:
+                    start_time = time.monotonic()
+                    loaded = self.load_plugin(self.available[plugin_name])
+                    # Lazy import and initialize() are part of what the plugin costs
+                    self.stats.record(plugin_name, 'load', time.monotonic() - start_time, error=not loaded)
+                    if loaded:
+                        plugin = self.loaded_plugins[plugin_name]
+                    else:
+                        self.failed_plugins.add(plugin_name)
+        return plugin
+    
+    def load_all_plugins(self, lazy: Optional[bool] = None) -> int:
+        """Load all discovered plugins
+        
+        With lazy loading (plugins.lazy_loading, the default) plugins are
+        only registered here and loaded when first used.
+        """
+        if lazy is None:
+            lazy = self.config.get('plugins.lazy_loading', True) if self.config else True
+        
         discovered = self.discover_plugins()
         loaded_count = 0
         
         print(f"Discovered {len(discovered)} plugins")
         
         for plugin_info in discovered:
-            if self.load_plugin(plugin_info):
+            if self.register_plugin(plugin_info) if lazy else self.load_plugin(plugin_info):
                 loaded_count += 1
         
-        print(f"Loaded {loaded_count}/{len(discovered)} plugins")
+        if lazy:
+            print(f"Registered {loaded_count}/{len(discovered)} plugins (loaded on first use)")
+        else:
+            print(f"Loaded {loaded_count}/{len(discovered)} plugins")
         return loaded_count
     
     def unload_plugin(self, plugin_name: str) -> bool:
@@ -342,60 +829,199 @@ class PluginManager:
                 plugin.cleanup()
             except Exception as e:
                 print(f"Error during plugin cleanup {plugin_name}: {e}")
+        elif isinstance(plugin, ScriptPlugin):
+            plugin.stop()
         
         # Remove from hooks
-        for hook_name, plugin_names in self.hooks.items():
-            if plugin_name in plugin_names:
-                plugin_names.remove(plugin_name)
+        self.unregister_hooks(plugin_name)
         
         del self.loaded_plugins[plugin_name]
+        self.available.pop(plugin_name, None)
         print(f"🔄 Unloaded plugin: {plugin_name}")
         return True
     
+    def unregister_hooks(self, plugin_name: str):
+        for plugin_names in self.hooks.values():
+            if plugin_name in plugin_names:
+                plugin_names.remove(plugin_name)
+        for plugin_names in self.observers.values():
+            plugin_names.discard(plugin_name)
+    
+    def hook_timeout(self, plugin_name: str) -> float:
+        """Deadline of one hook call (plugins.json hook_timeout, else plugins.hook_timeout)"""
+        timeout = self.plugin_configs.get(plugin_name, {}).get('hook_timeout')
+        if timeout is None and self.config:
+            timeout = self.config.get('plugins.hook_timeout', HOOK_TIMEOUT)
+        return float(timeout if timeout is not None else HOOK_TIMEOUT)
+    
+    def report_slow(self, plugin_name: str, hook_name: str, duration: float, timeout: float):
+        """Record a deadline overrun, disabling the plugin if configured to"""
+        with self.lock:
+            self.slow_counts[plugin_name] = self.slow_counts.get(plugin_name, 0) + 1
+            count = self.slow_counts[plugin_name]
+        print(f"⚠️  Plugin {plugin_name} exceeded its {timeout:g}s deadline on hook {hook_name} "
+              f"({duration:.1f}s, overrun {count})")
+        
+        auto_disable = self.config.get('plugins.auto_disable_slow', False) if self.config else False
+        limit = self.config.get('plugins.slow_hook_limit', SLOW_HOOK_LIMIT) if self.config else SLOW_HOOK_LIMIT
+        if auto_disable and count >= limit:
+            with self.lock:
+                self.unregister_hooks(plugin_name)
+                self.failed_plugins.add(plugin_name)
+            print(f"🚫 Disabled plugin {plugin_name} for this run after {count} deadline overruns")
+    
+    def call_with_deadline(self, plugin_name: str, hook_name: str, call: Callable[[], Any]) -> Optional[Any]:
+        """Run a hook call on a helper thread and wait at most its deadline
+        
+        Returns the call's result, or None if it failed or overran (the
+        overrunning call keeps running in the background but its result
+        is discarded). A deadline of 0 runs the call directly.
+        """
+        timeout = self.hook_timeout(plugin_name)
+        outcome = {}
+        
+        def target():
+            try:
+                outcome['result'] = call()
+            except Exception as e:
+                outcome['error'] = e
+        
+        start_time = time.monotonic()
+        if timeout <= 0:
+            # No deadline: run on the caller's thread
+            target()
+        else:
+            worker = threading.Thread(target=target, name=f"hook-{plugin_name}", daemon=True)
+            worker.start()
+            worker.join(timeout)
+            if worker.is_alive():
+                duration = time.monotonic() - start_time
+                self.stats.record(plugin_name, hook_name, duration, timeout=True)
+                self.report_slow(plugin_name, hook_name, duration, timeout)
+                return None
+        
+        self.stats.record(plugin_name, hook_name, time.monotonic() - start_time, error='error' in outcome)
+        if 'error' in outcome:
+            print(f"Error executing hook {hook_name} in plugin {plugin_name}: {outcome['error']}")
+            return None
+        return outcome.get('result')
+    
+    def observer_pool(self) -> ThreadPoolExecutor:
+        if self._observer_pool is None:
+            workers = self.config.get('plugins.observer_workers', OBSERVER_WORKERS) if self.config else OBSERVER_WORKERS
+            self._observer_pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='hook-observer')
+        return self._observer_pool
+    
+    def run_observer(self, plugin_name: str, hook_name: str, context: Dict[str, Any]):
+        plugin = self.get_plugin(plugin_name)
+        if not isinstance(plugin, (HookPlugin, ScriptPlugin)):
+            return
+        
+        timeout = self.hook_timeout(plugin_name)
+        start_time = time.monotonic()
+        error = False
+        try:
+            plugin.execute_hook(hook_name, context)
+        except Exception as e:
+            error = True
+            print(f"Error executing hook {hook_name} in plugin {plugin_name}: {e}")
+        duration = time.monotonic() - start_time
+        overran = 0 < timeout < duration
+        self.stats.record(plugin_name, hook_name, duration, error=error, timeout=overran)
+        if overran:
+            self.report_slow(plugin_name, hook_name, duration, timeout)
+    
     def execute_hook(self, hook_name: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Execute all plugins registered for a specific hook"""
+        """Execute all plugins registered for a specific hook
+        
+        Transformers run first, in order, each bounded by its deadline;
+        observers are then handed a copy of the resulting context on the
+        observer pool and the call returns without waiting for them.
+        """
         if context is None:
             context = {}
         
         if hook_name not in self.hooks:
             return context
         
-        for plugin_name in self.hooks[hook_name]:
-            if plugin_name not in self.loaded_plugins:
+        observers = self.observers.get(hook_name, set())
+        plugin_names = list(self.hooks[hook_name])
+        
+        for plugin_name in plugin_names:
+            if plugin_name in observers:
                 continue
-            
-            plugin = self.loaded_plugins[plugin_name]
-            if isinstance(plugin, HookPlugin):
-                try:
-                    context = plugin.execute_hook(hook_name, context)
-                except Exception as e:
-                    print(f"Error executing hook {hook_name} in plugin {plugin_name}: {e}")
+            plugin = self.get_plugin(plugin_name)
+            if isinstance(plugin, (HookPlugin, ScriptPlugin)):
+                snapshot = dict(context)  # An overrunning call must not change the context later
+                result = self.call_with_deadline(
+                    plugin_name, hook_name, lambda plugin=plugin: plugin.execute_hook(hook_name, snapshot)
+                )
+                if isinstance(result, dict):
+                    context = result
+        
+        for plugin_name in plugin_names:
+            if plugin_name in observers and plugin_name not in self.failed_plugins:
+                future = self.observer_pool().submit(self.run_observer, plugin_name, hook_name, dict(context))
+                with self.lock:
+                    self._observer_futures.add(future)
+                future.add_done_callback(self._observer_done)
         
         return context
     
+    def _observer_done(self, future: Future):
+        with self.lock:
+            self._observer_futures.discard(future)
+    
+    def wait_for_observers(self, timeout: Optional[float] = None) -> bool:
+        """Wait for running observer hooks; False if some are still running"""
+        from concurrent.futures import wait
+        
+        with self.lock:
+            futures = set(self._observer_futures)
+        if not futures:
+            return True
+        _, pending = wait(futures, timeout=timeout)
+        return not pending
+    
+    def shutdown(self, timeout: float = 5.0):
+        """Wait briefly for observers, save plugin timings and stop co-process plugins"""
+        if not self.wait_for_observers(timeout):
+            print("⚠️  Some observer hooks are still running")
+        self.stats.save()
+        if self._observer_pool:
+            self._observer_pool.shutdown(wait=False)
+            self._observer_pool = None
+        for plugin in self.loaded_plugins.values():
+            if isinstance(plugin, ScriptPlugin):
+                plugin.stop()
+    
     def execute_script_plugin(self, plugin_name: str, action: str = 'run', args: List[str] = None) -> Optional[subprocess.CompletedProcess]:
         """Execute a script plugin with given action"""
-        if plugin_name not in self.loaded_plugins:
-            return None
-        
-        plugin = self.loaded_plugins[plugin_name]
+        plugin = self.get_plugin(plugin_name)
         if not isinstance(plugin, ScriptPlugin):
             return None
         
+        start_time = time.monotonic()
         try:
-            return plugin.execute(action, args)
+            result = plugin.execute(action, args)
         except Exception as e:
+            self.stats.record(plugin_name, f"action:{action}", time.monotonic() - start_time, error=True)
             print(f"Error executing script plugin {plugin_name}: {e}")
             return None
+        self.stats.record(plugin_name, f"action:{action}", time.monotonic() - start_time,
+                          error=result.returncode != 0)
+        return result
     
     def list_plugins(self) -> Dict[str, Any]:
         """List all loaded plugins"""
         result = {
             'loaded_plugins': {},
             'available_hooks': list(self.hooks.keys()),
-            'plugin_count': len(self.loaded_plugins)
+            'plugin_count': len(self.loaded_plugins),
+            'registered_plugins': [name for name in self.available if name not in self.loaded_plugins]
         }
         
+        stats = self.stats.combined()
         for name, plugin in self.loaded_plugins.items():
             if isinstance(plugin, PluginBase):
                 info = plugin.get_info()
@@ -411,8 +1037,17 @@ class PluginManager:
                     'version': plugin.info.version,
                     'description': plugin.info.description,
                     'author': plugin.info.author,
-                    'interpreter': plugin.executable
+                    'interpreter': plugin.executable,
+                    'protocol': plugin.info.protocol
                 }
+            
+            if name in result['loaded_plugins'] and name in stats:
+                summary = PluginStats.summarize(stats[name])
+                result['loaded_plugins'][name].update(
+                    calls=summary['calls'],
+                    errors=summary['errors'] + summary['timeouts'],
+                    total_time=summary['total']
+                )
         
         return result
     
@@ -430,7 +1065,8 @@ class PluginManager:
             "description": "Sample Python plugin for demonstration",
             "author": "Flatpack",
             "plugin_type": "python",
-            "entry_point": "main.py"
+            "entry_point": "main.py",
+            "hooks": ["pre_install", "post_install"]
         }
         
         with open(python_plugin_dir / 'plugin.json', 'w') as f:
@@ -500,6 +1136,39 @@ echo "✅ Sample script plugin completed"
         
         script_plugin.chmod(0o755)
         
+        # Sample co-process plugin: one long-running process answers every request
+        coprocess_plugin = self.plugins_dir / 'sample_coprocess.py'
+        coprocess_content = '''#!/usr/bin/env python3
+# PLUGIN: name: Sample Coprocess Plugin
+# PLUGIN: version: 1.0.0
+# PLUGIN: description: Sample plugin that stays running and answers JSON lines
+# PLUGIN: author: Flatpack
+# PLUGIN: protocol: ndjson
+# PLUGIN: hooks: post_install
+
+import json
+import sys
+
+def handle(action, args, context):
+    if action == "post_install":
+        context["installed_count"] = context.get("installed_count", 0) + 1
+    return {"returncode": 0, "stdout": f"Sample co-process plugin handled {action}\\n", "context": context}
+
+if sys.argv[1:2] == ["coprocess"]:
+    for line in sys.stdin:
+        request = json.loads(line)
+        response = handle(request["action"], request.get("args", []), request.get("context", {}))
+        response["id"] = request["id"]
+        print(json.dumps(response), flush=True)
+else:
+    print(handle(sys.argv[1] if len(sys.argv) > 1 else "run", sys.argv[2:], {})["stdout"], end="")
+'''
+        
+        with open(coprocess_plugin, 'w') as f:
+            f.write(coprocess_content)
+        
+        coprocess_plugin.chmod(0o755)
+        
         print(f"Created sample plugins in {self.plugins_dir}")
 
 # Convenience function
@@ -517,12 +1186,24 @@ if __name__ == "__main__":
     parser.add_argument("--create-samples", action="store_true", help="Create sample plugins")
     parser.add_argument("--execute", nargs=2, metavar=("PLUGIN", "ACTION"), help="Execute script plugin")
     parser.add_argument("--hook", nargs=1, metavar="HOOK_NAME", help="Execute hook")
+    parser.add_argument("--rebuild-index", action="store_true", help="Re-read every plugin instead of using the manifest index")
+    parser.add_argument("--profile", action="store_true", help="Rank plugins by the total time they added, with per-hook latencies")
+    parser.add_argument("--reset-profile", action="store_true", help="Discard the recorded plugin timings")
     
     args = parser.parse_args()
     
     manager = PluginManager()
+    if args.rebuild_index:
+        manager.clear_index()
+    
+    if args.profile:
+        manager.stats.report()
+    
+    elif args.reset_profile:
+        manager.stats.reset()
+        print(f"Cleared {manager.stats.stats_file}")
     
-    if args.create_samples:
+    elif args.create_samples:
         manager.create_sample_plugins()
         print("Sample plugins created!")
         
@@ -534,7 +1215,7 @@ if __name__ == "__main__":
             print(f"     {plugin.description}")
             
     elif args.load:
-        count = manager.load_all_plugins()
+        count = manager.load_all_plugins(lazy=False)
         print(f"Loaded {count} plugins")
         
     elif args.list:
@@ -551,6 +1232,7 @@ if __name__ == "__main__":
         plugin_name, action = args.execute
         manager.load_all_plugins()  # Ensure plugins are loaded
         result = manager.execute_script_plugin(plugin_name, action)
+        manager.shutdown()
         if result:
             print(f"Script executed with return code: {result.returncode}")
             if result.stdout:
@@ -565,6 +1247,7 @@ if __name__ == "__main__":
         manager.load_all_plugins()  # Ensure plugins are loaded
         context = {"test": True}
         result = manager.execute_hook(hook_name, context)
+        manager.shutdown()
         print(f"Hook {hook_name} executed. Result context: {result}")
         
     else:
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Flatpack Disk-Space Preflight
+
+Decides before any download starts whether a batch of Flatpak installs and
+updates fits on disk, so a batch never stops halfway with the bandwidth
+already spent.
+
+Every queued ref is assigned to the installation it goes to (system
+/var/lib/flatpak or user ~/.local/share/flatpak), and its download and
+installed sizes are taken from its remote's metadata (one listing per
+remote, all remotes at once). The sizes are summed per filesystem, since
+the installations may live on different ones, and each filesystem must
+keep update_behavior.min_free_space_gb free afterwards. Both sizes are
+counted because the pulled objects are staged in the installation's
+repository before they are checked out. A ref that is already installed
+only counts its growth (new installed size minus its current deployment)
+on top of the download, since an update replaces the deployment.
+
+When a batch does not fit, the report estimates what
+`flatpak uninstall --unused` would free.
+"""
+
+import os
+import platform
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from flatpack_backend import FlatpakBackendError, get_backend
+
+INSTALLATION_PATHS = {
+    'system': Path('/var/lib/flatpak'),
+    'user': Path.home() / '.local' / 'share' / 'flatpak'
+}
+DEFAULT_RESERVE_GB = 2.0
+FLATPAK_ARCHES = {'amd64': 'x86_64', 'arm64': 'aarch64', 'i686': 'i386'}
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size:.0f} B"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+def existing_path(path: Path) -> Path:
+    """The path itself or its nearest existing parent (where it would be created)"""
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    return path
+
+@dataclass
+class RefRequirement:
+    """Space one queued install or update needs"""
+    app_id: str
+    remote: str
+    installation: str  # 'system' or 'user'
+    download_size: int = 0
+    installed_size: int = 0
+    current_size: int = 0  # Size of the deployment an update replaces
+    known: bool = False  # Whether the remote reported sizes for the ref
+
+    @property
+    def growth(self) -> int:
+        """How much the installation grows once the ref is deployed"""
+        return max(0, self.installed_size - self.current_size)
+
+@dataclass
+class FilesystemPlan:
+    """The queued refs going to one filesystem"""
+    path: str
+    free: int
+    reserve: int
+    installations: List[str] = field(default_factory=list)
+    refs: List[RefRequirement] = field(default_factory=list)
+
+    @property
+    def download_size(self) -> int:
+        return sum(ref.download_size for ref in self.refs)
+
+    @property
+    def installed_size(self) -> int:
+        return sum(ref.growth for ref in self.refs)
+
+    @property
+    def required(self) -> int:
+        return self.download_size + self.installed_size
+
+    @property
+    def remaining(self) -> int:
+        return self.free - self.required
+
+    @property
+    def fits(self) -> bool:
+        return self.remaining >= self.reserve
+
+@dataclass
+class PreflightPlan:
+    """Whether a batch fits on every filesystem it touches"""
+    filesystems: List[FilesystemPlan] = field(default_factory=list)
+    unknown: List[str] = field(default_factory=list)  # Refs without size metadata
+    unused_savings: Optional[int] = None
+
+    @property
+    def accepted(self) -> bool:
+        return all(filesystem.fits for filesystem in self.filesystems)
+
+    @property
+    def shortfall(self) -> int:
+        """Bytes that would have to be freed for the batch to fit"""
+        return sum(max(0, filesystem.reserve - filesystem.remaining) for filesystem in self.filesystems)
+
+    def report(self) -> List[str]:
+        lines = []
+        for filesystem in self.filesystems:
+            status = "✅" if filesystem.fits else "❌"
+            lines.append(
+                f"{status} {filesystem.path} ({', '.join(filesystem.installations)}): "
+                f"{len(filesystem.refs)} ref(s) need {format_bytes(filesystem.required)} "
+                f"({format_bytes(filesystem.download_size)} download + {format_bytes(filesystem.installed_size)} installed growth), "
+                f"{format_bytes(filesystem.free)} free, {format_bytes(filesystem.reserve)} reserved"
+            )
+        if self.unknown:
+            lines.append(f"⚠️  No size metadata for: {', '.join(self.unknown)}")
+        if not self.accepted:
+            lines.append(f"💾 Free at least {format_bytes(self.shortfall)} before retrying")
+            if self.unused_savings:
+                lines.append(f"💡 'flatpak uninstall --unused' would free about {format_bytes(self.unused_savings)}")
+        return lines
+
+class DiskSpacePlanner:
+    """Plans the disk space of a batch per target filesystem"""
+
+    def __init__(self, config=None, backend=None):
+        self.config = config
+        self.backend = backend or get_backend(config)
+        reserve_gb = config.get('update_behavior.min_free_space_gb', DEFAULT_RESERVE_GB) if config else DEFAULT_RESERVE_GB
+        self.reserve = int(reserve_gb * 1024 ** 3)
+        self.arch = FLATPAK_ARCHES.get(platform.machine(), platform.machine())
+        self._origins: Optional[Dict[str, str]] = None
+        self._installed_sizes: Optional[Dict[str, int]] = None
+
+    def installation_of(self, app_id: str, command: Optional[List[str]] = None) -> str:
+        """The installation a ref goes to: an explicit --user/--system, or where it is installed"""
+        if command and '--user' in command:
+            return 'user'
+        if command and '--system' in command:
+            return 'system'
+        if not (INSTALLATION_PATHS['system'] / 'app' / app_id).exists() \
+                and (INSTALLATION_PATHS['user'] / 'app' / app_id).exists():
+            return 'user'
+        return 'system'
+
+    def origins(self) -> Dict[str, str]:
+        """Remote each installed app was installed from"""
+        if self._origins is None:
+            try:
+                self._origins = {ref.id: ref.origin for ref in self.backend.list_installed()}
+            except FlatpakBackendError:
+                self._origins = {}
+        return self._origins
+
+    def installed_sizes(self) -> Dict[str, int]:
+        """Current deployment size of each installed app"""
+        if self._installed_sizes is None:
+            try:
+                self._installed_sizes = self.backend.installed_sizes()
+            except FlatpakBackendError:
+                self._installed_sizes = {}
+        return self._installed_sizes
+
+    def remote_sizes(self, remotes: List[str]) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Size metadata of every remote, listed concurrently (empty for remotes that fail)"""
+        def list_sizes(remote):
+            try:
+                return self.backend.remote_sizes(remote)
+            except FlatpakBackendError:
+                return {}
+
+        if not remotes:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(remotes), 8)) as executor:
+            return dict(zip(remotes, executor.map(list_sizes, remotes)))
+
+    def ref_sizes(self, app_id: str, sizes: Dict[str, Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """Sizes of the app's ref for this architecture, preferring the stable branch"""
+        prefix = f"app/{app_id}/{self.arch}/"
+        matches = sorted((ref for ref in sizes if ref.startswith(prefix)), key=lambda ref: not ref.endswith('/stable'))
+        return sizes[matches[0]] if matches else None
+
+    def requirements(self, targets: List[Tuple[str, str, str]]) -> List[RefRequirement]:
+        """RefRequirements for (app ID, remote, installation) targets"""
+        sizes = self.remote_sizes(sorted({remote for _, remote, _ in targets if remote}))
+        installed = self.installed_sizes()
+        requirements = []
+        for app_id, remote, installation in targets:
+            requirement = RefRequirement(app_id, remote, installation, current_size=installed.get(app_id, 0))
+            ref_sizes = self.ref_sizes(app_id, sizes.get(remote, {}))
+            if ref_sizes:
+                requirement.download_size, requirement.installed_size = ref_sizes
+                requirement.known = True
+            requirements.append(requirement)
+        return requirements
+
+    def plan(self, requirements: List[RefRequirement]) -> PreflightPlan:
+        """Sum the requirements per filesystem and check each against its free space"""
+        plan = PreflightPlan(unknown=[requirement.app_id for requirement in requirements if not requirement.known])
+        filesystems: Dict[int, FilesystemPlan] = {}
+        for requirement in requirements:
+            path = existing_path(INSTALLATION_PATHS[requirement.installation])
+            try:
+                device = os.stat(path).st_dev
+                if device not in filesystems:
+                    filesystems[device] = FilesystemPlan(str(INSTALLATION_PATHS[requirement.installation]),
+                                                         shutil.disk_usage(path).free, self.reserve)
+            except OSError:
+                plan.unknown.append(requirement.app_id)
+                continue
+            filesystem = filesystems[device]
+            if requirement.installation not in filesystem.installations:
+                filesystem.installations.append(requirement.installation)
+            filesystem.refs.append(requirement)
+        plan.filesystems = list(filesystems.values())
+        if not plan.accepted:
+            plan.unused_savings = self.estimate_unused_savings()
+        return plan
+
+    def plan_operations(self, operations: List) -> PreflightPlan:
+        """Plan the Flatpak installs and updates among PackageOperations
+
+        Operations whose sizes are found get their download_size and
+        installed_size set, for the scheduling policies.
+        """
+        operations = [op for op in operations
+                      if op.package_manager == 'flatpak' and op.operation_type in ('install', 'update')]
+        targets = []
+        for operation in operations:
+            app_id = operation.package_name
+            if operation.operation_type == 'install' and len(operation.command) >= 2 \
+                    and operation.command[-1] == app_id:
+                remote = operation.command[-2]  # flatpak install [flags] <remote> <app>
+            else:
+                remote = self.origins().get(app_id, '')
+            targets.append((app_id, remote, self.installation_of(app_id, operation.command)))
+
+        requirements = self.requirements(targets)
+        for operation, requirement in zip(operations, requirements):
+            if requirement.known:
+                operation.download_size = requirement.download_size
+                operation.installed_size = requirement.installed_size
+        return self.plan(requirements)
+
+    def plan_updates(self, app_ids: List[str]) -> PreflightPlan:
+        """Plan updating installed apps from their origins"""
+        return self.plan(self.requirements([
+            (app_id, self.origins().get(app_id, ''), self.installation_of(app_id)) for app_id in app_ids
+        ]))
+
+    def estimate_unused_savings(self) -> Optional[int]:
+        """About how much `flatpak uninstall --unused` would free (None if unknown)
+
+        Counts the installed runtimes no app uses, leaving out extensions
+        of used runtimes and of apps (IDs they prefix).
+        """
+        try:
+            app_runtimes = self.backend.app_runtimes()
+            runtime_sizes = self.backend.runtime_sizes()
+        except FlatpakBackendError:
+            return None
+
+        used = {runtime for runtime in app_runtimes.values() if runtime}
+        owners = {runtime.split('/')[0] for runtime in used} | set(app_runtimes)
+
+        savings = 0
+        for runtime, size in runtime_sizes.items():
+            if runtime in used:
+                continue
+            runtime_id = runtime.split('/')[0]
+            if any(runtime_id.startswith(f"{owner}.") for owner in owners):
+                continue
+            savings += size
+        return savings
+
+def get_disk_planner(config=None) -> DiskSpacePlanner:
+    """Factory function to create a disk-space planner"""
+    return DiskSpacePlanner(config)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Disk-Space Preflight")
+    parser.add_argument("apps", nargs="*", help="Apps to plan (default: apps with updates available)")
+    parser.add_argument("--install", metavar="REMOTE", help="Plan installing the apps from REMOTE instead of updating them")
+    parser.add_argument("--user", action="store_true", help="Plan installing into the user installation")
+    parser.add_argument("--unused", action="store_true", help="Estimate what 'flatpak uninstall --unused' frees")
+
+    args = parser.parse_args()
+
+    from flatpack_config import get_config
+
+    planner = get_disk_planner(get_config())
+    if args.unused:
+        savings = planner.estimate_unused_savings()
+        print(f"'flatpak uninstall --unused' would free about {format_bytes(savings)}"
+              if savings is not None else "Could not list installed refs")
+    else:
+        if args.install:
+            installation = 'user' if args.user else 'system'
+            plan = planner.plan(planner.requirements([(app_id, args.install, installation) for app_id in args.apps]))
+        else:
+            app_ids = args.apps
+            if not app_ids:
+                from flatpack import check_for_updates
+                app_ids = check_for_updates()
+            plan = planner.plan_updates(app_ids)
+        for line in plan.report():
+            print(line)
+        print("Batch accepted" if plan.accepted else "Batch rejected")
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Flatpack Reachability Probes
+
+Probes network connectivity and Flatpak remotes concurrently without
+spawning ping or curl:
+
+- check_connectivity() opens TCP connections to a few well-known endpoints
+  (performance.connectivity_endpoints) at once and succeeds on the first
+  one that connects.
+- probe_remotes() sends an HTTP HEAD for the config file of every
+  configured remote at once and records connect and response latency.
+  probe_urls() does the same for arbitrary URLs, such as .flatpakrepo files
+  that are about to be added.
+
+Results are cached per URL in ~/.cache/flatpack/probes.json for
+performance.probe_ttl seconds. `flatpack-probe --stand-in` serves a local
+HTTP stand-in and probes it, for testing without network access.
+"""
+
+import http.client
+import json
+import os
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+PROBE_CACHE_FILE = Path.home() / '.cache' / 'flatpack' / 'probes.json'
+DEFAULT_TTL = 60
+DEFAULT_TIMEOUT = 5.0
+MAX_PROBE_WORKERS = 16
+CONNECTIVITY_ENDPOINTS = ['dl.flathub.org:443', '1.1.1.1:53', '8.8.8.8:53']
+
+@dataclass
+class ProbeResult:
+    """Outcome of probing one URL or endpoint"""
+    name: str
+    url: str
+    reachable: bool
+    status: Optional[int] = None  # HTTP status, if the server answered
+    connect_ms: Optional[float] = None  # TCP (and TLS) connect time
+    latency_ms: Optional[float] = None  # Time until the response headers arrived
+    error: str = ""
+    checked: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Reachable and the resource exists (what curl -f accepts)"""
+        return self.reachable and (self.status is None or self.status < 400)
+
+def parse_endpoint(endpoint: str, default_port: int = 443) -> Tuple[str, int]:
+    host, _, port = endpoint.rpartition(':')
+    if not host or not port.isdigit():
+        return endpoint, default_port
+    return host.strip('[]'), int(port)
+
+def remote_probe_url(url: str) -> str:
+    """URL to HEAD for a remote: the config file every OSTree repository has"""
+    return f"{url.rstrip('/')}/config"
+
+class RemoteProber:
+    """Concurrent TCP and HTTP HEAD probes with a per-URL result cache"""
+
+    def __init__(self, config=None, cache_file: Optional[Path] = None):
+        self.config = config
+        self.cache_file = Path(cache_file) if cache_file else PROBE_CACHE_FILE
+        self.ttl = DEFAULT_TTL
+        self.timeout = DEFAULT_TIMEOUT
+        self.endpoints = list(CONNECTIVITY_ENDPOINTS)
+        if config:
+            self.ttl = config.get('performance.probe_ttl', DEFAULT_TTL)
+            self.timeout = config.get('performance.probe_timeout', DEFAULT_TIMEOUT)
+            self.endpoints = config.get('performance.connectivity_endpoints', self.endpoints) or self.endpoints
+        self.cache_lock = threading.Lock()
+
+    def load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_results(self, results: List[ProbeResult]):
+        with self.cache_lock:
+            cache = self.load_cache()
+            now = time.time()
+            cache = {url: entry for url, entry in cache.items() if now - entry.get('checked', 0) < self.ttl}
+            for result in results:
+                cache[result.url] = asdict(result)
+            try:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.cache_file.with_suffix('.tmp')
+                with open(tmp_file, 'w') as f:
+                    json.dump(cache, f)
+                os.replace(tmp_file, self.cache_file)
+            except OSError:
+                pass
+
+    def connect(self, endpoint: str) -> ProbeResult:
+        """Open and close a TCP connection to host:port"""
+        host, port = parse_endpoint(endpoint)
+        start_time = time.perf_counter()
+        try:
+            with socket.create_connection((host, port), timeout=self.timeout):
+                elapsed = (time.perf_counter() - start_time) * 1000
+            return ProbeResult(endpoint, f"tcp://{host}:{port}", True, connect_ms=elapsed,
+                               latency_ms=elapsed, checked=time.time())
+        except OSError as e:
+            return ProbeResult(endpoint, f"tcp://{host}:{port}", False, error=str(e), checked=time.time())
+
+    def head(self, name: str, url: str) -> ProbeResult:
+        """Send one HTTP HEAD request and time the connect and the response"""
+        parts = urlsplit(url)
+        scheme = parts.scheme.rpartition('+')[2]  # oci+https remotes
+        if scheme == 'file':
+            exists = Path(parts.path).exists()
+            return ProbeResult(name, url, exists, latency_ms=0.0,
+                               error="" if exists else "no such file", checked=time.time())
+        if scheme not in ('http', 'https') or not parts.hostname:
+            return ProbeResult(name, url, False, error=f"unsupported URL: {url}", checked=time.time())
+
+        if scheme == 'https':
+            connection = http.client.HTTPSConnection(parts.hostname, parts.port, timeout=self.timeout,
+                                                     context=ssl.create_default_context())
+        else:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=self.timeout)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+
+        start_time = time.perf_counter()
+        connect_ms = None
+        try:
+            connection.connect()
+            connect_ms = (time.perf_counter() - start_time) * 1000
+            connection.request('HEAD', path, headers={'User-Agent': 'flatpack-probe'})
+            response = connection.getresponse()
+            latency_ms = (time.perf_counter() - start_time) * 1000
+            # Any answer below 500 means the server is up
+            return ProbeResult(name, url, response.status < 500, response.status, connect_ms, latency_ms,
+                               "" if response.status < 400 else response.reason, time.time())
+        except (OSError, http.client.HTTPException) as e:
+            return ProbeResult(name, url, False, connect_ms=connect_ms, error=str(e) or type(e).__name__,
+                               checked=time.time())
+        finally:
+            connection.close()
+
+    def probe_urls(self, targets: Dict[str, str], refresh: bool = False) -> Dict[str, ProbeResult]:
+        """HEAD every name -> URL target at once (cached results within the TTL)"""
+        results = {}
+        cache = {} if refresh else self.load_cache()
+        now = time.time()
+        pending = {}
+        for name, url in targets.items():
+            entry = cache.get(url)
+            if entry and now - entry.get('checked', 0) < self.ttl:
+                results[name] = ProbeResult(**dict(entry, name=name))
+            else:
+                pending[name] = url
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=min(len(pending), MAX_PROBE_WORKERS)) as executor:
+                futures = {executor.submit(self.head, name, url): name for name, url in pending.items()}
+                for future in as_completed(futures):
+                    results[futures[future]] = future.result()
+            self.save_results([results[name] for name in pending])
+
+        return {name: results[name] for name in targets}
+
+    def probe_remotes(self, refresh: bool = False) -> Dict[str, ProbeResult]:
+        """Probe every configured Flatpak remote (empty if they cannot be listed)"""
+        from flatpack_backend import get_backend, FlatpakBackendError
+
+        try:
+            remotes = get_backend(self.config).list_remotes()
+        except FlatpakBackendError:
+            return {}
+        return self.probe_urls({remote.name: remote_probe_url(remote.url) for remote in remotes if remote.url},
+                               refresh)
+
+    def check_connectivity(self, endpoints: Optional[List[str]] = None) -> bool:
+        """Whether any of the endpoints accepts a TCP connection"""
+        endpoints = endpoints or self.endpoints
+        executor = ThreadPoolExecutor(max_workers=len(endpoints))
+        try:
+            futures = [executor.submit(self.connect, endpoint) for endpoint in endpoints]
+            for future in as_completed(futures):
+                if future.result().reachable:
+                    return True
+            return False
+        finally:
+            # Don't wait for the slower endpoints once one has answered
+            executor.shutdown(wait=False)
+
+def get_prober(config=None) -> RemoteProber:
+    """Factory function to create a prober"""
+    return RemoteProber(config)
+
+class StandInServer:
+    """Local HTTP server answering HEAD requests, for testing probes offline"""
+
+    def __init__(self, delay: float = 0.0, missing: Tuple[str, ...] = ('/missing',)):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                time.sleep(stand_in.delay)
+                self.send_response(404 if self.path in stand_in.missing else 200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.delay = delay
+        self.missing = missing
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+def print_results(results: Dict[str, ProbeResult]):
+    for name, result in sorted(results.items(), key=lambda item: (not item[1].ok, item[1].latency_ms or 0)):
+        if result.ok:
+            print(f"✅ {name:<20} {result.latency_ms:7.1f} ms  (connect {result.connect_ms or 0:.1f} ms)  {result.url}")
+        else:
+            detail = f"HTTP {result.status}" if result.status else result.error
+            print(f"❌ {name:<20} {'-':>7}     {detail}  {result.url}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Reachability Probes")
+    parser.add_argument("--url", action="append", metavar="NAME=URL", help="Probe a URL instead of the remotes")
+    parser.add_argument("--connectivity", action="store_true", help="Check network connectivity")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached results")
+    parser.add_argument("--shell", action="store_true", help="Print 'name ok|error latency_ms' lines for scripts")
+    parser.add_argument("--stand-in", action="store_true", help="Probe a local HTTP stand-in (no network needed)")
+    parser.add_argument("--delay", type=float, default=0.2, help="Stand-in response delay in seconds")
+
+    args = parser.parse_args()
+
+    if args.stand_in:
+        prober = RemoteProber(cache_file=Path(os.devnull))
+        with StandInServer(delay=args.delay) as stand_in:
+            closed = socket.socket()
+            closed.bind(('127.0.0.1', 0))
+            targets = {f"mirror-{index}": remote_probe_url(stand_in.url) for index in range(8)}
+            targets['missing'] = f"{stand_in.url}/missing"
+            targets['closed-port'] = f"http://127.0.0.1:{closed.getsockname()[1]}/config"
+            start_time = time.perf_counter()
+            results = prober.probe_urls(targets, refresh=True)
+            elapsed = (time.perf_counter() - start_time) * 1000
+            closed.close()
+        print_results(results)
+        print(f"Probed {len(targets)} targets in {elapsed:.0f} ms (each stand-in answer takes {args.delay * 1000:.0f} ms)")
+    else:
+        from flatpack_config import get_config
+
+        prober = get_prober(get_config())
+        if args.connectivity:
+            start_time = time.perf_counter()
+            connected = prober.check_connectivity()
+            elapsed = (time.perf_counter() - start_time) * 1000
+            print(f"{'✅ Connected' if connected else '❌ No connectivity'} ({elapsed:.0f} ms)")
+        else:
+            if args.url:
+                targets = {}
+                for target in args.url:
+                    name, _, url = target.partition('=')
+                    targets[name if url else target] = url or target
+                results = prober.probe_urls(targets, args.refresh)
+            else:
+                results = prober.probe_remotes(args.refresh)
+            if args.shell:
+                for name, result in results.items():
+                    latency = f"{result.latency_ms:.1f}" if result.latency_ms is not None else "-"
+                    print(f"{name} {'ok' if result.ok else 'error'} {latency}")
+            else:
+                print_results(results)
+                if not results:
+                    print("No remotes to probe")
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Flatpack Reclamation Stage
+
+Frees the space that package operations leave behind, so old runtimes and
+objects do not slow down every later pull and deploy:
+
+- unused_runtimes: `flatpak uninstall --unused` in each installation
+  (runtimes and extensions no installed app needs)
+- ostree_objects: staging directories of interrupted pulls in each
+  installation's repository older than performance.cache_cleanup_days,
+  then `ostree prune --refs-only` for objects no ref reaches
+- pacman_cache: cached package files (paccache keeping the last
+  PACMAN_KEEP versions, or `pacman -Sc`)
+- flatpack_files: flatpack's own rotated logs, backup points and history
+  older than performance.cache_cleanup_days
+
+ParallelOperationManager runs the stages for the package stores a batch
+changed (update_behavior.cleanup_after_update); flatpackd runs all of them
+every daemon.reclaim_interval seconds when that is set (it is off by
+default) and cleanup_after_update is on. Each stage reports the bytes it
+reclaimed (the free-space gain of the filesystems it touched) and its
+elapsed time; the last report is kept in ~/.cache/flatpack/reclaim.json.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from flatpack_preflight import INSTALLATION_PATHS, format_bytes
+
+RECLAIM_STATE_FILE = Path.home() / '.cache' / 'flatpack' / 'reclaim.json'
+STEPS = ('unused_runtimes', 'ostree_objects', 'pacman_cache', 'flatpack_files')
+STEP_LABELS = {
+    'unused_runtimes': 'Unused runtimes',
+    'ostree_objects': 'OSTree objects',
+    'pacman_cache': 'Pacman cache',
+    'flatpack_files': 'Flatpack logs/backups'
+}
+PACMAN_CACHE_DIR = Path('/var/cache/pacman/pkg')
+PACMAN_KEEP = 2
+COMMAND_TIMEOUT = 1800
+DEFAULT_CLEANUP_DAYS = 7
+
+def free_space(paths: List[Path]) -> Dict[int, int]:
+    """Free bytes of each filesystem holding one of the paths"""
+    free = {}
+    for path in paths:
+        try:
+            free[os.stat(path).st_dev] = shutil.disk_usage(path).free
+        except OSError:
+            continue
+    return free
+
+@dataclass
+class ReclaimResult:
+    """Outcome of one reclamation stage"""
+    step: str
+    reclaimed: int = 0
+    duration: float = 0.0
+    success: bool = True
+    skipped: bool = False
+    detail: str = ""
+
+@dataclass
+class ReclamationReport:
+    started: float
+    results: List[ReclaimResult] = field(default_factory=list)
+
+    @property
+    def reclaimed(self) -> int:
+        return sum(result.reclaimed for result in self.results)
+
+    @property
+    def duration(self) -> float:
+        return sum(result.duration for result in self.results)
+
+    def to_dict(self) -> Dict:
+        return {'started': self.started, 'reclaimed': self.reclaimed, 'duration': self.duration,
+                'results': [asdict(result) for result in self.results]}
+
+    def print_summary(self):
+        print("🧹 Reclamation:")
+        for result in self.results:
+            if result.skipped:
+                status = "⏭️ "
+            else:
+                status = "✅" if result.success else "❌"
+            detail = f"  ({result.detail})" if result.detail else ""
+            print(f"  {status} {STEP_LABELS.get(result.step, result.step):<22} "
+                  f"{format_bytes(result.reclaimed):>10}  {result.duration:6.1f}s{detail}")
+        print(f"  Reclaimed {format_bytes(self.reclaimed)} in {self.duration:.1f}s")
+
+class Reclaimer:
+    """Runs the reclamation stages"""
+
+    def __init__(self, config=None, logger=None):
+        self.config = config
+        self.logger = logger
+        self.days = DEFAULT_CLEANUP_DAYS
+        if config:
+            self.days = config.get('performance.cache_cleanup_days', DEFAULT_CLEANUP_DAYS)
+
+    def run_command(self, cmd: List[str]) -> subprocess.CompletedProcess:
+        try:
+            return subprocess.run(cmd, capture_output=True, text=True, check=False, timeout=COMMAND_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return subprocess.CompletedProcess(cmd, -1, '', str(e))
+
+    @staticmethod
+    def privileged(cmd: List[str]) -> List[str]:
+        """cmd through non-interactive sudo unless running as root (never prompts)"""
+        return cmd if os.geteuid() == 0 else ['sudo', '-n'] + cmd
+
+    @staticmethod
+    def installations() -> Dict[str, Path]:
+        """Flatpak installations that exist, as flag -> directory"""
+        return {f"--{name}": path for name, path in INSTALLATION_PATHS.items() if path.exists()}
+
+    def measured(self, paths: List[Path], stage: Callable[[], ReclaimResult]) -> ReclaimResult:
+        """Run a stage, crediting it with the free-space gain of the paths' filesystems"""
+        start_time = time.time()
+        before = free_space(paths)
+        result = stage()
+        after = free_space(paths)
+        if not result.reclaimed:
+            result.reclaimed = max(0, sum(after[device] - before[device] for device in after if device in before))
+        result.duration = time.time() - start_time
+        return result
+
+    def reclaim_unused_runtimes(self) -> ReclaimResult:
+        if not shutil.which('flatpak'):
+            return ReclaimResult('unused_runtimes', skipped=True, detail="flatpak not installed")
+        installations = self.installations()
+
+        def stage():
+            from flatpack_lock import get_store_lock
+
+            errors = []
+            with get_store_lock('flatpak'):
+                for flag in installations:
+                    result = self.run_command(['flatpak', 'uninstall', flag, '--unused', '--noninteractive', '-y'])
+                    if result.returncode != 0:
+                        errors.append(f"{flag[2:]}: {(result.stderr.strip().splitlines() or ['failed'])[-1]}")
+            return ReclaimResult('unused_runtimes', success=not errors, detail='; '.join(errors))
+
+        return self.measured(list(installations.values()), stage)
+
+    def reclaim_ostree_objects(self) -> ReclaimResult:
+        repos = [path / 'repo' for path in self.installations().values() if (path / 'repo').is_dir()]
+        writable = [repo for repo in repos if os.access(repo, os.W_OK)]
+        if not writable:
+            return ReclaimResult('ostree_objects', skipped=True,
+                                 detail="repositories need root" if repos else "no repositories")
+
+        def stage():
+            from flatpack_lock import get_store_lock
+
+            cutoff = time.time() - self.days * 86400
+            removed, errors = 0, []
+            with get_store_lock('flatpak'):
+                for repo in writable:
+                    # Leftovers of interrupted pulls
+                    tmp_dir = repo / 'tmp'
+                    for entry in tmp_dir.iterdir() if tmp_dir.is_dir() else []:
+                        try:
+                            # tmp/cache holds the repository's summary caches
+                            if entry.name == 'cache' or entry.lstat().st_mtime >= cutoff:
+                                continue
+                            if entry.is_dir() and not entry.is_symlink():
+                                shutil.rmtree(entry)
+                            else:
+                                entry.unlink()
+                            removed += 1
+                        except OSError as e:
+                            errors.append(f"{entry}: {e}")
+                    if shutil.which('ostree'):
+                        result = self.run_command(['ostree', 'prune', f'--repo={repo}', '--refs-only'])
+                        if result.returncode != 0:
+                            errors.append(f"{repo}: {result.stderr.strip() or 'prune failed'}")
+            detail = f"{removed} stale staging entries" if removed else ""
+            if errors:
+                detail = '; '.join([detail] + errors if detail else errors)
+            return ReclaimResult('ostree_objects', success=not errors, detail=detail)
+
+        return self.measured(writable, stage)
+
+    def reclaim_pacman_cache(self) -> ReclaimResult:
+        if not shutil.which('pacman'):
+            return ReclaimResult('pacman_cache', skipped=True, detail="pacman not installed")
+        if shutil.which('paccache'):
+            commands = [['paccache', '-r', '-k', str(PACMAN_KEEP)], ['paccache', '-r', '-u', '-k', '0']]
+        else:
+            commands = [['pacman', '-Sc', '--noconfirm']]
+
+        def stage():
+            from flatpack_lock import get_store_lock
+
+            errors = []
+            with get_store_lock('native'):
+                for cmd in commands:
+                    result = self.run_command(self.privileged(cmd))
+                    if result.returncode != 0:
+                        errors.append((result.stderr.strip().splitlines() or [f"{cmd[0]} failed"])[-1])
+            return ReclaimResult('pacman_cache', success=not errors, detail='; '.join(errors))
+
+        return self.measured([PACMAN_CACHE_DIR], stage)
+
+    def reclaim_flatpack_files(self) -> ReclaimResult:
+        start_time = time.time()
+        if self.logger is None:
+            # The shared instance, so the process's log writer keeps running
+            from flatpack_logger import get_logger
+            self.logger = get_logger(self.config)
+        try:
+            freed = self.logger.cleanup_old_logs(self.days)
+            return ReclaimResult('flatpack_files', freed, time.time() - start_time)
+        except OSError as e:
+            return ReclaimResult('flatpack_files', duration=time.time() - start_time, success=False, detail=str(e))
+
+    def run(self, steps: Optional[List[str]] = None) -> ReclamationReport:
+        """Run the given stages (all by default) in order"""
+        report = ReclamationReport(started=time.time())
+        for step in steps or STEPS:
+            report.results.append(getattr(self, f"reclaim_{step}")())
+
+        self.save_state(report)
+        if self.logger is not None:
+            self.logger.logger.info(f"Reclaimed {format_bytes(report.reclaimed)} in {report.duration:.1f}s "
+                                    f"({', '.join(result.step for result in report.results if not result.skipped)})")
+        return report
+
+    def save_state(self, report: ReclamationReport):
+        try:
+            RECLAIM_STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = RECLAIM_STATE_FILE.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(report.to_dict(), f, indent=2)
+            os.replace(tmp_file, RECLAIM_STATE_FILE)
+        except OSError:
+            pass
+
+def load_last_report() -> Optional[Dict]:
+    try:
+        with open(RECLAIM_STATE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def reclaim_due(interval: float) -> bool:
+    """Whether the last reclamation ran more than interval seconds ago"""
+    last = load_last_report()
+    return interval > 0 and (not last or time.time() - last.get('started', 0) >= interval)
+
+def get_reclaimer(config=None, logger=None) -> Reclaimer:
+    """Factory function to create a reclaimer (logging to the caller's logger, if given)"""
+    return Reclaimer(config, logger)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Reclamation Stage")
+    parser.add_argument("--steps", nargs="+", choices=STEPS, help="Stages to run (default: all)")
+    parser.add_argument("--last", action="store_true", help="Show the last reclamation report")
+
+    args = parser.parse_args()
+
+    if args.last:
+        last = load_last_report()
+        if last:
+            report = ReclamationReport(last['started'], [ReclaimResult(**result) for result in last['results']])
+            print(f"Last run: {time.strftime('%Y-%m-%d %H:%M', time.localtime(report.started))}")
+            report.print_summary()
+        else:
+            print("No reclamation has run yet")
+    else:
+        from flatpack_config import get_config
+
+        get_reclaimer(get_config()).run(args.steps).print_summary()
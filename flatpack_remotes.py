@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Flatpack Remote Selection
+
+Ranks the remotes (or mirrors) an app can be installed from by how fast
+they have been, so installs go to the fastest healthy one first and the
+others remain fallbacks.
+
+Each remote's score in ~/.local/share/flatpack/remote_scores.json keeps
+moving averages of its probe latency (from flatpack_probe) and of the
+duration of past installs from it, plus its throughput when download sizes
+are known. A remote is unhealthy while its latest probe failed or after
+FAILURE_LIMIT installs in a row from it failed; unhealthy remotes are tried
+last. The estimated cost of an install is
+
+    LATENCY_ROUNDTRIPS * latency + average install duration
+
+where remotes without install history are assumed to take the average of
+the others. With performance.remote_selection set to "priority" the
+configured repository order is kept.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REMOTE_SCORES_FILE = Path.home() / '.local' / 'share' / 'flatpack' / 'remote_scores.json'
+SMOOTHING = 0.3  # Weight of the newest sample in the moving averages
+FAILURE_LIMIT = 3
+LATENCY_ROUNDTRIPS = 20  # An install makes many small requests before the large transfers
+
+def moving_average(current: Optional[float], sample: float) -> float:
+    return sample if current is None else (1 - SMOOTHING) * current + SMOOTHING * sample
+
+class RemoteSelector:
+    """Persistent per-remote latency and throughput scores"""
+
+    def __init__(self, config=None, scores_file: Optional[Path] = None, prober=None):
+        self.config = config
+        self.scores_file = Path(scores_file) if scores_file else REMOTE_SCORES_FILE
+        self.prober = prober
+        self.lock = threading.Lock()
+        self.scores = self.load()
+
+    def load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.scores_file, 'r') as f:
+                scores = json.load(f)
+            return scores if isinstance(scores, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save(self):
+        with self.lock:
+            scores = dict(self.scores)
+        try:
+            self.scores_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.scores_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(scores, f, indent=2)
+            os.replace(tmp_file, self.scores_file)
+        except OSError:
+            pass
+
+    def score(self, remote: str) -> Dict:
+        return self.scores.setdefault(remote, {
+            'latency_ms': None, 'reachable': True, 'probes': 0,
+            'duration': None, 'throughput': None, 'installs': 0,
+            'failures': 0, 'updated': 0.0
+        })
+
+    def record_probe(self, remote: str, probe):
+        """Update a remote's latency from a flatpack_probe.ProbeResult"""
+        with self.lock:
+            score = self.score(remote)
+            score['reachable'] = probe.reachable
+            score['probes'] += 1
+            if probe.reachable and probe.latency_ms is not None:
+                score['latency_ms'] = moving_average(score['latency_ms'], probe.latency_ms)
+            score['updated'] = time.time()
+
+    def record_operation(self, remote: str, duration: float, success: bool, download_size: int = 0):
+        """Update a remote's install duration (and throughput, if the size is known)"""
+        with self.lock:
+            score = self.score(remote)
+            if success:
+                score['installs'] += 1
+                score['failures'] = 0
+                score['duration'] = moving_average(score['duration'], duration)
+                if download_size and duration > 0:
+                    score['throughput'] = moving_average(score['throughput'], download_size / duration)
+            else:
+                score['failures'] += 1
+            score['updated'] = time.time()
+
+    def is_healthy(self, remote: str) -> bool:
+        score = self.scores.get(remote)
+        return not score or (score['reachable'] and score['failures'] < FAILURE_LIMIT)
+
+    def estimated_cost(self, remote: str, default_duration: float = 0.0) -> Optional[float]:
+        """Estimated seconds for an install from the remote (None if never measured)"""
+        score = self.scores.get(remote)
+        if not score or (score['latency_ms'] is None and score['duration'] is None):
+            return None
+        latency = (score['latency_ms'] or 0.0) / 1000 * LATENCY_ROUNDTRIPS
+        duration = score['duration'] if score['duration'] is not None else default_duration
+        return latency + duration
+
+    def probe(self, remotes: List[str], urls: Optional[Dict[str, str]] = None, refresh: bool = False):
+        """Probe the remotes (all at once) and record their latency"""
+        from flatpack_probe import get_prober, remote_probe_url
+
+        prober = self.prober or get_prober(self.config)
+        if urls is None:
+            results = prober.probe_remotes(refresh)
+        else:
+            results = prober.probe_urls({name: remote_probe_url(url) for name, url in urls.items()}, refresh)
+        for remote in remotes:
+            if remote in results:
+                self.record_probe(remote, results[remote])
+
+    def rank(self, remotes: List[str], urls: Optional[Dict[str, str]] = None,
+             refresh: bool = False) -> List[str]:
+        """Remotes ordered fastest healthy first; ties and unmeasured remotes keep their order"""
+        remotes = list(dict.fromkeys(remotes))
+        if len(remotes) < 2:
+            return remotes
+        self.probe(remotes, urls, refresh)
+        self.save()
+
+        durations = [self.scores[remote]['duration'] for remote in remotes
+                     if remote in self.scores and self.scores[remote]['duration'] is not None]
+        default_duration = sum(durations) / len(durations) if durations else 0.0
+
+        def key(indexed):
+            index, remote = indexed
+            cost = self.estimated_cost(remote, default_duration)
+            return (not self.is_healthy(remote), cost is None, cost or 0.0, index)
+
+        return [remote for _, remote in sorted(enumerate(remotes), key=key)]
+
+    def select(self, remotes: List[str], urls: Optional[Dict[str, str]] = None) -> Optional[str]:
+        """The fastest healthy remote"""
+        ranked = self.rank(remotes, urls)
+        return ranked[0] if ranked else None
+
+def selection_enabled(config=None) -> bool:
+    return not config or config.get('performance.remote_selection', 'fastest') == 'fastest'
+
+def get_remote_selector(config=None) -> RemoteSelector:
+    """Factory function to create a remote selector"""
+    return RemoteSelector(config)
+
+def print_scores(selector: RemoteSelector, remotes: List[str]):
+    for remote in remotes:
+        score = selector.scores.get(remote, {})
+        latency = f"{score['latency_ms']:.1f} ms" if score.get('latency_ms') is not None else "-"
+        duration = f"{score['duration']:.1f}s" if score.get('duration') is not None else "-"
+        health = "✅" if selector.is_healthy(remote) else "❌"
+        print(f"{health} {remote:<20} latency {latency:>10}  install {duration:>7}  "
+              f"{score.get('installs', 0)} installs, {score.get('failures', 0)} failing")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Remote Selection")
+    parser.add_argument("--rank", nargs="+", metavar="REMOTE", help="Rank remotes and print them fastest first")
+    parser.add_argument("--refresh", action="store_true", help="Probe again instead of using cached probes")
+    parser.add_argument("--stand-in", action="store_true",
+                        help="Rank local HTTP stand-ins with injected delays (no network needed)")
+    parser.add_argument("--delays", nargs="+", type=float, default=[0.3, 0.05, 0.15],
+                        help="Stand-in response delays in seconds")
+
+    args = parser.parse_args()
+
+    if args.stand_in:
+        import tempfile
+        from contextlib import ExitStack
+        from flatpack_probe import RemoteProber, StandInServer
+
+        with tempfile.TemporaryDirectory() as tmp_dir, ExitStack() as stack:
+            prober = RemoteProber(cache_file=Path(tmp_dir) / 'probes.json')
+            selector = RemoteSelector(scores_file=Path(tmp_dir) / 'scores.json', prober=prober)
+            urls = {f"mirror-{index}": stack.enter_context(StandInServer(delay=delay)).url
+                    for index, delay in enumerate(args.delays)}
+            urls['unreachable'] = "http://127.0.0.1:1"
+            for delay, remote in zip(args.delays, urls):
+                print(f"   {remote}: answers after {delay * 1000:.0f} ms")
+            ranked = selector.rank(list(urls), urls, refresh=True)
+            print(f"Ranking: {' > '.join(ranked)}")
+            print_scores(selector, ranked)
+            print(f"Selected: {ranked[0]}")
+    else:
+        from flatpack_config import get_config
+
+        selector = get_remote_selector(get_config())
+        if args.rank:
+            print(' '.join(selector.rank(args.rank, refresh=args.refresh)))
+        else:
+            print_scores(selector, sorted(selector.scores))
+            if not selector.scores:
+                print("No remote scores recorded yet")
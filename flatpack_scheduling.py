@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Flatpack Scheduling Policies
+
+A scheduling policy decides which of ParallelOperationManager's ready
+operations starts next: it orders the ready set, may veto starting an
+operation while others are running, and gives each operation a weight in
+worker slots.
+
+Built-in policies (performance.scheduling_policy):
+
+- priority: highest PackageOperation.priority first, then insertion order (default)
+- fifo: insertion order
+- sjf: shortest job first, estimated from the download and installed size
+- largest-download: largest download first, so the long transfers start early
+- priority-packages: apps and packages matching priority_packages first
+
+Sizes are only known for Flatpak operations whose remote reported them to
+the disk-space preflight (update_behavior.check_disk_space); operations
+without sizes all share a constant estimate, so sjf and largest-download
+keep their insertion order.
+
+Plugins add policies through the "scheduling_policies" hook: a HookPlugin
+adds SchedulingPolicy subclasses (or instances) to context['policies'],
+keyed by name.
+"""
+
+from typing import Dict, List, Optional, Type, Union
+
+DEFAULT_POLICY = 'priority'
+POLICY_HOOK = 'scheduling_policies'
+
+# Rough rates for turning sizes into durations (only their ratio matters
+# when every ready operation has sizes)
+DOWNLOAD_RATE = 10 * 1024 ** 2  # Bytes per second
+DEPLOY_RATE = 100 * 1024 ** 2  # Bytes per second
+
+def estimated_seconds(operation) -> float:
+    """Duration estimate from the operation's sizes, or its estimated_duration if they are unknown"""
+    download_size = getattr(operation, 'download_size', 0)
+    installed_size = getattr(operation, 'installed_size', 0)
+    if not download_size and not installed_size:
+        return operation.estimated_duration
+    return download_size / DOWNLOAD_RATE + installed_size / DEPLOY_RATE
+
+class SchedulingPolicy:
+    """Default behavior: keep the ready order, never veto, weight 1"""
+
+    name = 'base'
+    description = ''
+
+    def __init__(self, config=None):
+        self.config = config
+
+    def order(self, ready: List) -> List:
+        """Ready operations (given in insertion order) in the order to start them"""
+        return list(ready)
+
+    def can_start(self, operation, running: List) -> bool:
+        """Whether operation may start while the running operations are in progress"""
+        return True
+
+    def weight(self, operation) -> int:
+        """Worker slots the operation occupies while it runs"""
+        return 1
+
+class PriorityPolicy(SchedulingPolicy):
+    name = 'priority'
+    description = 'Highest priority first, then insertion order'
+
+    def order(self, ready: List) -> List:
+        return sorted(ready, key=lambda op: -op.priority)
+
+class FifoPolicy(SchedulingPolicy):
+    name = 'fifo'
+    description = 'Insertion order'
+
+class ShortestJobFirstPolicy(SchedulingPolicy):
+    name = 'sjf'
+    description = 'Shortest job first by download and installed size (insertion order if unknown)'
+
+    def order(self, ready: List) -> List:
+        return sorted(ready, key=estimated_seconds)
+
+class LargestDownloadFirstPolicy(SchedulingPolicy):
+    name = 'largest-download'
+    description = 'Largest download first (insertion order if the sizes are unknown)'
+
+    def order(self, ready: List) -> List:
+        return sorted(ready, key=lambda op: (op.download_size, op.estimated_duration), reverse=True)
+
+class PriorityPackagesPolicy(PriorityPolicy):
+    name = 'priority-packages'
+    description = 'Packages matching priority_packages first, then by priority'
+
+    def __init__(self, config=None):
+        from flatpack_patterns import get_package_filter
+
+        super().__init__(config)
+        self.package_filter = get_package_filter(config)
+
+    def is_priority(self, operation) -> bool:
+        # Pacman batches are named batch_<n>_<pkg>+<pkg>...
+        names = operation.package_name.split('_', 2)[-1].split('+') if operation.package_name.startswith('batch_') \
+            else [operation.package_name]
+        return any(self.package_filter.is_priority(name) for name in names)
+
+    def order(self, ready: List) -> List:
+        return sorted(super().order(ready), key=lambda op: not self.is_priority(op))
+
+BUILTIN_POLICIES: Dict[str, Type[SchedulingPolicy]] = {
+    policy.name: policy for policy in (
+        PriorityPolicy, FifoPolicy, ShortestJobFirstPolicy,
+        LargestDownloadFirstPolicy, PriorityPackagesPolicy
+    )
+}
+
+def plugin_policies(config=None) -> Dict[str, Union[Type[SchedulingPolicy], SchedulingPolicy]]:
+    """Policies contributed by plugins through the scheduling_policies hook"""
+    from flatpack_plugins import PluginManager
+
+    manager = PluginManager(config)
+    manager.load_all_plugins()
+    context = manager.execute_hook(POLICY_HOOK, {'policies': {}})
+    manager.shutdown()
+    policies = context.get('policies', {})
+    return policies if isinstance(policies, dict) else {}
+
+def get_scheduling_policy(config=None, name: Optional[str] = None) -> SchedulingPolicy:
+    """Create the configured scheduling policy (performance.scheduling_policy)"""
+    if name is None:
+        name = config.get('performance.scheduling_policy', DEFAULT_POLICY) if config else DEFAULT_POLICY
+
+    if name in BUILTIN_POLICIES:
+        return BUILTIN_POLICIES[name](config)
+
+    policy = plugin_policies(config).get(name)
+    if isinstance(policy, SchedulingPolicy):
+        return policy
+    if isinstance(policy, type) and issubclass(policy, SchedulingPolicy):
+        return policy(config)
+
+    print(f"Warning: Unknown scheduling policy '{name}', using '{DEFAULT_POLICY}'")
+    return BUILTIN_POLICIES[DEFAULT_POLICY](config)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Scheduling Policies")
+    parser.add_argument("--list", action="store_true", help="List built-in and plugin policies")
+    parser.add_argument("--order", metavar="POLICY", help="Show the order a policy starts sample operations in")
+
+    args = parser.parse_args()
+
+    if args.order:
+        from flatpack_config import get_config
+        from flatpack_parallel import PackageOperation
+
+        config = get_config()
+        policy = get_scheduling_policy(config, args.order)
+        samples = [
+            PackageOperation("install", "org.gimp.GIMP", "flatpak", [], priority=100,
+                             estimated_duration=45.0, download_size=350 << 20),
+            PackageOperation("install", "org.mozilla.firefox", "flatpak", [], priority=99,
+                             estimated_duration=30.0, download_size=110 << 20),
+            PackageOperation("install", "org.blender.Blender", "flatpak", [], priority=98,
+                             estimated_duration=90.0, download_size=800 << 20),
+            PackageOperation("install", "com.github.tchx84.Flatseal", "flatpak", [], priority=97,
+                             estimated_duration=10.0, download_size=2 << 20)
+        ]
+        print(f"Policy: {args.order} ({type(policy).__name__})")
+        for index, operation in enumerate(policy.order(samples), 1):
+            print(f"  {index}. {operation.package_name:<30} priority {operation.priority:>3}  "
+                  f"~{estimated_seconds(operation):.0f}s  {operation.download_size >> 20} MiB  "
+                  f"weight {policy.weight(operation)}")
+    else:
+        print("Built-in scheduling policies:")
+        for name, policy in BUILTIN_POLICIES.items():
+            print(f"  {name:<20} {policy.description}")
+        if args.list:
+            from flatpack_config import get_config
+
+            policies = plugin_policies(get_config())
+            print("Plugin scheduling policies:")
+            for name, policy in policies.items():
+                print(f"  {name:<20} {getattr(policy, 'description', '')}")
+            if not policies:
+                print("  (none)")
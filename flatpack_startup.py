@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Flatpack Startup Timing
+
+Lightweight startup instrumentation shared by the Flatpack entry points.
+Backs the `--timing` flag: reports how long the interpreter, imports and each
+phase of a command took, and keeps a history so cold starts can be tracked.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+TIMING_HISTORY_FILE = Path.home() / '.local' / 'share' / 'flatpack' / 'startup_times.jsonl'
+HISTORY_COMPARE_RUNS = 20
+
+def process_age() -> float:
+    """Seconds since this process was started (interpreter init included)"""
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            # The command name may contain spaces, so split after its closing paren
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        start_ticks = int(fields[19])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+class StartupTimer:
+    """Records named phases of a CLI invocation
+
+    started is the time.perf_counter() value at which a tool dispatched
+    in-process (by flatpack-manager) started; without it the startup phase
+    is the age of the process.
+    """
+
+    def __init__(self, tool: str, started: Optional[float] = None):
+        self.tool = tool
+        self.last_mark = time.perf_counter()
+        self.boot_seconds = process_age() if started is None else max(0.0, self.last_mark - started)
+        self.phases = [('startup', self.boot_seconds)]
+
+    def mark(self, phase: str):
+        """Close the current phase under the given name"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_mark))
+        self.last_mark = now
+
+    def total(self) -> float:
+        return sum(duration for _, duration in self.phases)
+
+    def record(self, command: str):
+        """Append this run to the timing history"""
+        import json
+
+        entry = {
+            'timestamp': time.time(),
+            'tool': self.tool,
+            'command': command,
+            'phases': {name: round(duration, 6) for name, duration in self.phases},
+            'total': round(self.total(), 6)
+        }
+        try:
+            TIMING_HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(TIMING_HISTORY_FILE, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError:
+            pass
+
+    def previous_median(self, command: str):
+        """Median total of the last recorded runs of the same command"""
+        import json
+
+        totals = []
+        try:
+            with open(TIMING_HISTORY_FILE, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get('tool') == self.tool and entry.get('command') == command:
+                        totals.append(entry.get('total', 0.0))
+        except OSError:
+            return None
+
+        totals = sorted(totals[-HISTORY_COMPARE_RUNS:])
+        if not totals:
+            return None
+        return totals[len(totals) // 2]
+
+    def report(self, argv=None, file=None):
+        """Print the phase breakdown, compare with history and record the run"""
+        file = file or sys.stderr
+        argv = argv if argv is not None else sys.argv[1:]
+        command = ' '.join(arg for arg in argv if arg != '--timing')
+        previous = self.previous_median(command)
+
+        print(f"\n⏱  Startup timing ({self.tool} {command}):", file=file)
+        for name, duration in self.phases:
+            print(f"  {name:<20} {duration * 1000:8.1f} ms", file=file)
+        print(f"  {'total':<20} {self.total() * 1000:8.1f} ms", file=file)
+        if previous is not None:
+            print(f"  {'previous median':<20} {previous * 1000:8.1f} ms", file=file)
+        print(f"  Per-module import cost: python3 -X importtime {sys.argv[0]} {command}", file=file)
+
+        self.record(command)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Flatpack Update Detection Engine
+
+Detects available updates by comparing the deployed commit of every
+installed app with the commit its remote currently advertises, instead of
+resolving a full `flatpak update --no-deploy` transaction.
+
+Remote commits are cached per remote in ~/.cache/flatpack/updates.json and
+keyed on a fingerprint of the remote's summary (its ETag, or Last-Modified
+and size), so unchanged remotes are never listed again. Within the TTL
+(performance.update_check_ttl) a check whose installations have not changed
+since the last one is answered from the cache without running flatpak.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from flatpack_backend import FlatpakBackendError, get_backend
+
+UPDATE_CACHE_FILE = Path.home() / '.cache' / 'flatpack' / 'updates.json'
+DEFAULT_TTL = 300
+PROBE_TIMEOUT = 5
+
+# Flatpak touches .changed in an installation whenever it deploys or removes a ref
+INSTALLATION_MARKERS = [
+    Path('/var/lib/flatpak/.changed'),
+    Path.home() / '.local' / 'share' / 'flatpak' / '.changed'
+]
+
+class UpdateDetectionError(FlatpakBackendError):
+    """The commit comparison could not be completed"""
+
+def commits_match(local: str, remote: str) -> bool:
+    """Compare commits that may be abbreviated differently"""
+    length = min(len(local), len(remote))
+    return length > 0 and local[:length] == remote[:length]
+
+class UpdateDetector:
+    """Commit-comparison update detection with a per-remote summary cache"""
+
+    def __init__(self, config=None, cache_file: Optional[Path] = None, backend=None):
+        self.config = config
+        self.backend = backend or get_backend(config)
+        self.cache_file = Path(cache_file) if cache_file else UPDATE_CACHE_FILE
+        self.ttl = DEFAULT_TTL
+        if config:
+            self.ttl = config.get('performance.update_check_ttl', DEFAULT_TTL)
+
+    def load_cache(self) -> Dict:
+        try:
+            with open(self.cache_file, 'r') as f:
+                cache = json.load(f)
+            if isinstance(cache, dict):
+                cache.setdefault('remotes', {})
+                return cache
+        except (OSError, json.JSONDecodeError):
+            pass
+        return {'remotes': {}}
+
+    def save_cache(self, cache: Dict):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass
+
+    def installation_signature(self) -> List[Optional[int]]:
+        """Change markers of the system and user installations"""
+        signature = []
+        for marker in INSTALLATION_MARKERS:
+            try:
+                signature.append(marker.stat().st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def installed_refs(self) -> Dict[str, Dict[str, str]]:
+        """Deployed commit of every installed app, keyed by app/ID/arch/branch"""
+        refs = {}
+        for ref in self.backend.list_installed():
+            refs[f"app/{ref.id}/{ref.arch}/{ref.branch}"] = ref
+        return refs
+
+    def remote_urls(self) -> Dict[str, str]:
+        return {remote.name: remote.url for remote in self.backend.list_remotes()}
+
+    def summary_fingerprint(self, url: str) -> Optional[str]:
+        """Cheap identity of a remote's current summary (None if it cannot be probed)"""
+        if not url.startswith(('http://', 'https://')):
+            return None
+
+        import urllib.request
+        import urllib.error
+
+        for name in ('summary.idx', 'summary'):
+            request = urllib.request.Request(f"{url.rstrip('/')}/{name}", method='HEAD')
+            try:
+                with urllib.request.urlopen(request, timeout=PROBE_TIMEOUT) as response:
+                    headers = response.headers
+                    etag = headers.get('ETag')
+                    if etag:
+                        return f"{name}:{etag}"
+                    modified = headers.get('Last-Modified')
+                    if modified:
+                        return f"{name}:{modified}:{headers.get('Content-Length', '')}"
+            except (urllib.error.URLError, OSError, ValueError):
+                continue
+        return None
+
+    def remote_commits(self, remote: str) -> Dict[str, str]:
+        """Commit the remote advertises for each app ref"""
+        return self.backend.remote_refs(remote)
+
+    def refresh_remote(self, remote: str, url: str, entry: Optional[Dict]) -> Dict:
+        """Cache entry for a remote, re-listing it only if its summary changed"""
+        now = time.time()
+        if entry and now - entry.get('checked', 0) < self.ttl:
+            return entry
+
+        fingerprint = self.summary_fingerprint(url)
+        if entry and fingerprint and entry.get('fingerprint') == fingerprint:
+            return dict(entry, checked=now)
+
+        return {
+            'fingerprint': fingerprint,
+            'checked': now,
+            'commits': self.remote_commits(remote)
+        }
+
+    def check(self, refresh: bool = False) -> List[str]:
+        """App IDs with updates available"""
+        try:
+            return self.check_cached(refresh)
+        except UpdateDetectionError:
+            raise
+        except FlatpakBackendError as e:
+            raise UpdateDetectionError(str(e))
+
+    def check_cached(self, refresh: bool = False) -> List[str]:
+        cache = self.load_cache()
+        signature = self.installation_signature()
+        now = time.time()
+
+        if (not refresh and cache.get('signature') == signature
+                and now - cache.get('checked', 0) < self.ttl and 'updates' in cache):
+            return list(cache['updates'])
+
+        refs = self.installed_refs()
+        origins = sorted({ref['origin'] for ref in refs.values() if ref['origin']})
+        urls = self.remote_urls()
+        remotes = cache['remotes']
+        if refresh:
+            remotes = {}
+
+        # Probe the remotes concurrently; each is one HEAD or one summary fetch
+        with ThreadPoolExecutor(max_workers=max(1, min(len(origins), 8))) as executor:
+            futures = {
+                origin: executor.submit(self.refresh_remote, origin, urls.get(origin, ''), remotes.get(origin))
+                for origin in origins
+            }
+            for origin, future in futures.items():
+                remotes[origin] = future.result()
+
+        updates = []
+        for ref_name, ref in refs.items():
+            remote_commit = remotes.get(ref['origin'], {}).get('commits', {}).get(ref_name)
+            if remote_commit and not commits_match(ref['commit'], remote_commit):
+                updates.append(ref['id'])
+
+        self.save_cache({
+            'remotes': remotes,
+            'signature': signature,
+            'checked': now,
+            'updates': updates
+        })
+        return updates
+
+    def invalidate(self):
+        """Forget the cached result (remote commits are kept)"""
+        cache = self.load_cache()
+        cache.pop('updates', None)
+        self.save_cache(cache)
+
+def get_update_detector(config=None) -> UpdateDetector:
+    """Factory function to create an update detector"""
+    return UpdateDetector(config)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Flatpack Update Detection Engine")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cache and re-list every remote")
+    parser.add_argument("--show-cache", action="store_true", help="Show the cached remote fingerprints")
+
+    args = parser.parse_args()
+    detector = get_update_detector()
+
+    if args.show_cache:
+        cache = detector.load_cache()
+        for remote, entry in cache['remotes'].items():
+            age = time.time() - entry.get('checked', 0)
+            print(f"{remote:<20} {len(entry.get('commits', {})):>6} refs  checked {age:.0f}s ago  "
+                  f"fingerprint {entry.get('fingerprint') or '-'}")
+    else:
+        start_time = time.perf_counter()
+        updates = detector.check(refresh=args.refresh)
+        elapsed = (time.perf_counter() - start_time) * 1000
+        for app_id in updates:
+            print(app_id)
+        print(f"{len(updates)} update(s) found in {elapsed:.1f} ms")
@@ -56,13 +56,19 @@ CONFIG_FILE="$HOME/.config/flatpack/config.conf"
 CONFIG_DIR="$HOME/.config/flatpack"
 LOG_DIR="$HOME/.local/share/flatpack/logs"
 LOG_FILE="$HOME/.local/share/flatpack/install.log"
-STATE_FILE="$HOME/.local/share/flatpack/install_state.json"  # Installation state tracking
+JOURNAL_FILE="$HOME/.local/share/flatpack/install_journal.jsonl"  # Operation journal shared with flatpack_installer.py
+JOURNAL_MAX_AGE=$((7 * 86400))  # Interrupted runs older than this are not resumed
 BACKUP_FILE="$HOME/.local/share/flatpack/installed_apps_backup.json"
+FLATPAK_LOCK_FILE="$HOME/.cache/flatpack/locks/flatpak.lock"  # Store lock shared with flatpack_lock.py
+INSTALLER_ENGINE="$(dirname "$(readlink -f "${BASH_SOURCE[0]}")")/flatpack_installer.py"  # Python installation engine
+PROBE_ENGINE="$(dirname "$(readlink -f "${BASH_SOURCE[0]}")")/flatpack_probe.py"  # Concurrent reachability probes
+REMOTE_SELECTOR="$(dirname "$(readlink -f "${BASH_SOURCE[0]}")")/flatpack_remotes.py"  # Fastest-remote ranking
 
 # System detection variables
 SYSTEM_TYPE="unknown"
 GAMING_MODE=false
 DRY_RUN=false
+FRESH_START=false
 
 # Global variables for cleanup
 CLEANUP_PIDS=()
@@ -89,7 +95,7 @@ REPOSITORY_PRIORITY="flathub"  # Default repository priority: flathub, custom, a
 create_default_config() {
     mkdir -p "$CONFIG_DIR"
     mkdir -p "$LOG_DIR"
-    mkdir -p "$(dirname "$STATE_FILE")"
+    mkdir -p "$(dirname "$JOURNAL_FILE")"
     
     cat > "$CONFIG_FILE" << EOF
 # Flatpack Auto-Installer Configuration v3.0
@@ -358,6 +364,11 @@ parse_arguments() {
                 log_message "INFO" "Verbose output enabled"
                 shift
                 ;;
+            --fresh)
+                FRESH_START=true
+                log_message "INFO" "Fresh installation requested, ignoring the journal"
+                shift
+                ;;
             --parallel-jobs|-j)
                 if [[ -n $2 ]] && [[ $2 =~ ^[0-9]+$ ]]; then
                     PARALLEL_JOBS="$2"
@@ -392,6 +403,7 @@ echo -e "${CYAN}Flatpack Auto-Installer v3.3 - Usage:${NC}"
     echo -e "  ${GREEN}--dry-run, --preview${NC}     Show what would be installed without executing"
     echo -e "  ${GREEN}--verbose, -v${NC}            Enable verbose output"
     echo -e "  ${GREEN}--parallel-jobs, -j N${NC}    Set number of parallel installation jobs (default: 3)"
+    echo -e "  ${GREEN}--fresh${NC}                  Discard the journal of an interrupted run instead of resuming"
     echo -e "  ${GREEN}--help, -h${NC}               Show this help message"
     echo ""
     echo -e "${WHITE}EXAMPLES:${NC}"
@@ -599,6 +611,7 @@ setup_signal_handlers() {
 # Global repository state
 declare -A REPO_URLS=()  # name -> url mapping
 declare -A REPO_STATUS=() # name -> status mapping (active/inactive/error)
+declare -A REPO_PROBES=() # name -> probe result (ok/error) from probe_repositories
 REPO_LIST=()  # ordered list of repository names
 
 # Function to parse custom repositories from config
@@ -652,6 +665,18 @@ validate_repository() {
     
     log_message "DEBUG" "Validating repository: $name ($url)"
     
+    # Use the concurrent probe result if there is one
+    if [[ -n "${REPO_PROBES[$name]:-}" ]]; then
+        if [[ "${REPO_PROBES[$name]}" == "ok" ]]; then
+            REPO_STATUS["$name"]="active"
+            log_message "INFO" "Repository $name is accessible"
+            return 0
+        fi
+        REPO_STATUS["$name"]="error"
+        log_message "WARN" "Repository $name is not accessible: $url"
+        return 1
+    fi
+    
     # Check URL accessibility with timeout
     if timeout 10 curl -sSf --head "$url" >/dev/null 2>&1; then
         REPO_STATUS["$name"]="active"
@@ -664,6 +689,26 @@ validate_repository() {
     fi
 }
 
+# Function to probe all custom repositories at once (instead of one curl per repository)
+probe_repositories() {
+    if ! command -v python3 &> /dev/null || [[ ! -f "$PROBE_ENGINE" ]]; then
+        return 0
+    fi
+    
+    local probe_args=()
+    local name
+    for name in "${REPO_LIST[@]}"; do
+        probe_args+=(--url "$name=${REPO_URLS[$name]}")
+    done
+    
+    local probe_name probe_status probe_latency
+    while read -r probe_name probe_status probe_latency; do
+        [[ -z "$probe_name" ]] && continue
+        REPO_PROBES["$probe_name"]="$probe_status"
+        log_message "DEBUG" "Probed repository $probe_name: $probe_status (${probe_latency} ms)"
+    done < <(python3 "$PROBE_ENGINE" --shell "${probe_args[@]}" 2>/dev/null)
+}
+
 # Function to add custom repository to Flatpak
 add_flatpak_repository() {
     local name="$1"
@@ -672,7 +717,7 @@ add_flatpak_repository() {
     log_message "INFO" "Adding Flatpak repository: $name ($url)"
     
     # Check if already added
-    if flatpak remotes | grep -q "^$name\s"; then
+    if flatpak remotes --columns=name | grep -qxF "$name"; then
         log_message "DEBUG" "Repository $name already exists in Flatpak"
         REPO_STATUS["$name"]="active"
         return 0
@@ -706,6 +751,8 @@ setup_custom_repositories() {
     local added_count=0
     local failed_count=0
     
+    probe_repositories
+    
     for repo_name in "${REPO_LIST[@]}"; do
         echo -n -e "${YELLOW}[REPO]${NC} Configuring $repo_name... "
         
@@ -767,6 +814,17 @@ get_installation_repositories() {
             ;;
     esac
     
+    # Try the fastest healthy repository first (measured latency and past installs)
+    if [ ${#available_repos[@]} -gt 1 ] && command -v python3 &> /dev/null && [[ -f "$REMOTE_SELECTOR" ]]; then
+        local ranked_repos
+        ranked_repos=$(python3 "$REMOTE_SELECTOR" --rank "${available_repos[@]}" 2>/dev/null)
+        local ranked_list=()
+        read -ra ranked_list <<< "$(tail -n 1 <<< "$ranked_repos")"
+        if [ ${#ranked_list[@]} -eq ${#available_repos[@]} ]; then
+            available_repos=("${ranked_list[@]}")
+        fi
+    fi
+    
     echo "${available_repos[@]}"
 }
 
@@ -775,7 +833,7 @@ show_repository_status() {
     echo -e "${CYAN}[REPOSITORIES]${NC} Available repositories:"
     
     # Always show Flathub
-    if flatpak remotes | grep -q "flathub"; then
+    if flatpak remotes --columns=name | grep -qxF "flathub"; then
         echo -e "  ${GREEN}✓${NC} flathub (https://flathub.org/repo/flathub.flatpakrepo)"
     else
         echo -e "  ${RED}✗${NC} flathub (not configured)"
@@ -1131,7 +1189,8 @@ applications=(
 # Function to check if a Flatpak application is already installed
 check_already_installed() {
     local app_id="$1"
-    if flatpak list --app | grep -q "^$app_id\s"; then
+    # One app ID per line, matched exactly (the default columns start with the name)
+    if flatpak list --app --columns=application | grep -qxF "$app_id"; then
         return 0  # Already installed
     else
         return 1  # Not installed
@@ -1347,78 +1406,95 @@ install_flatpak() {
     return 1
 }
 
-# Function to save installation state
-save_installation_state() {
-    local state_dir=$(dirname "$STATE_FILE")
-    mkdir -p "$state_dir"
-    
-    # Create state JSON
-    cat > "$STATE_FILE" << EOF
-{
-    "timestamp": "$(date -Iseconds)",
-    "total_apps": ${#applications[@]},
-    "successful": [$(printf '"%s",' "${successful_installations[@]}" | sed 's/,$//') ],
-    "failed": [$(printf '"%s",' "${failed_installations[@]}" | sed 's/,$//') ],
-    "skipped": [$(printf '"%s",' "${skipped_installations[@]}" | sed 's/,$//') ],
-    "pending": [$(printf '"%s",' "${apps_to_install[@]}" | sed 's/,$//') ]
+# Function to append one state transition (queued/started/succeeded/failed)
+# to the operation journal; same record format as flatpack_journal.py
+journal_record() {
+    local app_id="$1"
+    local state="$2"
+    
+    mkdir -p "$(dirname "$JOURNAL_FILE")"
+    printf '{"package": "%s", "state": "%s", "operation": "install", "timestamp": %s, "pid": %d}\n' \
+        "$app_id" "$state" "$(date +%s)" "$$" >> "$JOURNAL_FILE"
+    sync "$JOURNAL_FILE" 2>/dev/null || true
 }
-EOF
+
+# Function to take the Flatpak store lock, waiting for other flatpack runs
+acquire_flatpak_lock() {
+    command -v flock &> /dev/null || return 0
+    
+    mkdir -p "$(dirname "$FLATPAK_LOCK_FILE")"
+    exec 9>>"$FLATPAK_LOCK_FILE"
+    if ! flock -n 9; then
+        echo -e "${YELLOW}[WAIT]${NC} Another flatpack process is changing Flatpak apps, waiting for it to finish..."
+        flock 9
+    fi
+    printf '{"pid": %d, "command": "install_flatpaks.sh", "since": %s}' "$$" "$(date +%s)" > "$FLATPAK_LOCK_FILE"
 }
 
-# Function to load previous installation state
-load_installation_state() {
-    if [ -f "$STATE_FILE" ]; then
-        echo -e "${YELLOW}[INFO]${NC} Previous installation state found"
-        
-        # Show previous session info
-        local timestamp=$(grep '"timestamp"' "$STATE_FILE" | cut -d'"' -f4 2>/dev/null || echo "unknown")
-        local prev_successful=$(grep -o '"successful": \[[^\]]*\]' "$STATE_FILE" | grep -o '"[^"]*"' | wc -l 2>/dev/null || echo 0)
-        local prev_failed=$(grep -o '"failed": \[[^\]]*\]' "$STATE_FILE" | grep -o '"[^"]*"' | wc -l 2>/dev/null || echo 0)
-        
-        echo -e "${GRAY}          Last run: $timestamp${NC}"
-        echo -e "${GRAY}          Previous: $prev_successful successful, $prev_failed failed${NC}"
-        echo -e "${GRAY}(Auto-continuing fresh in 10 seconds if no input...)${NC}"
-        echo ""
-        
-        read -t 10 -p "$(echo -e "${WHITE}Resume from previous state? ${GREEN}[y]${WHITE}es/${RED}[N]${WHITE}o: ${NC}")" -r || {
-            echo -e "\n${YELLOW}[AUTO]${NC} No input detected, starting fresh installation..."
-            REPLY="n"
+# Function to close the current run in the journal, so later runs do not
+# resume it (same marker as flatpack_journal.py)
+journal_finish() {
+    printf '{"event": "finished", "timestamp": %s, "pid": %d}\n' "$(date +%s)" "$$" >> "$JOURNAL_FILE"
+    sync "$JOURNAL_FILE" 2>/dev/null || true
+}
+
+# Function to list apps whose latest journal record is "succeeded", within
+# the unfinished run and no older than JOURNAL_MAX_AGE
+journal_succeeded_apps() {
+    [ -f "$JOURNAL_FILE" ] || return 0
+    awk -F'"' -v cutoff="$(( $(date +%s) - JOURNAL_MAX_AGE ))" '{
+        pkg = ""; state = ""; op = ""; event = ""; ts = 0
+        for (i = 1; i < NF; i++) {
+            if ($i == "package" && pkg == "") pkg = $(i + 2)
+            else if ($i == "state" && state == "") state = $(i + 2)
+            else if ($i == "operation" && op == "") op = $(i + 2)
+            else if ($i == "event" && event == "") event = $(i + 2)
+            else if ($i == "timestamp") { ts = $(i + 1); gsub(/[^0-9.]/, "", ts) }
         }
-        if [[ $REPLY =~ ^[Yy]$ ]]; then
-            echo -e "${GREEN}[INFO]${NC} Resuming from previous installation state..."
-            
-            # Extract successful apps and mark them as skipped
-            local prev_successful_apps=$(grep -o '"successful": \[[^\]]*\]' "$STATE_FILE" | \
-                                        sed 's/"successful": \[\|\]//g' | \
-                                        tr ',' '\n' | \
-                                        sed 's/[" ]//g' | \
-                                        grep -v '^$')
-            
-            if [ -n "$prev_successful_apps" ]; then
-                echo -e "${YELLOW}[RESUME]${NC} Skipping previously successful installations:"
-                while IFS= read -r app; do
-                    if [ -n "$app" ]; then
-                        echo -e "  ${GREEN}✓${NC} ${app_names[$app]:-$app}"
-                        skipped_installations+=("$app")
-                    fi
-                done <<< "$prev_successful_apps"
-            fi
-            
-            return 0  # Resume mode
-        else
-            echo -e "${YELLOW}[INFO]${NC} Starting fresh installation (ignoring previous state)"
-            rm -f "$STATE_FILE"
-            return 1  # Fresh mode
-        fi
+        if (event == "finished") { split("", last); next }
+        if (pkg != "" && state != "" && op == "install" && ts + 0 >= cutoff) last[pkg] = state
+    } END {
+        for (pkg in last) if (last[pkg] == "succeeded") print pkg
+    }' "$JOURNAL_FILE" 2>/dev/null
+}
+
+# Function to resume an interrupted installation from the journal
+load_installation_state() {
+    resumed_installations=()
+    [ -f "$JOURNAL_FILE" ] || return 1
+    
+    if [[ "$FRESH_START" == "true" ]]; then
+        echo -e "${YELLOW}[INFO]${NC} Starting fresh installation (discarding the journal)"
+        rm -f "$JOURNAL_FILE"
+        return 1
+    fi
+    
+    # Only apps that are still installed (one listing for all of them)
+    local installed
+    installed=$(flatpak list --app --columns=application 2>/dev/null)
+    local app
+    while IFS= read -r app; do
+        [ -n "$app" ] && grep -qxF "$app" <<< "$installed" && resumed_installations+=("$app")
+    done < <(journal_succeeded_apps)
+    
+    if [ ${#resumed_installations[@]} -gt 0 ]; then
+        echo -e "${YELLOW}[RESUME]${NC} Resuming an interrupted installation: ${#resumed_installations[@]} app(s) already installed will be skipped"
+        echo -e "${GRAY}         (use --fresh to start over)${NC}"
+        log_message "INFO" "Resuming from journal: ${resumed_installations[*]}"
+        return 0  # Resume mode
     fi
-    return 1  # No previous state
+    return 1  # Nothing to resume
 }
 
-# Function to clean up state file after successful completion
+# Function to discard the journal after a fully successful run, or close
+# the run when some installations failed
 clean_installation_state() {
-    if [ -f "$STATE_FILE" ] && [ ${#failed_installations[@]} -eq 0 ]; then
-        echo -e "${GREEN}[CLEANUP]${NC} All installations completed successfully, removing state file"
-        rm -f "$STATE_FILE"
+    [ -f "$JOURNAL_FILE" ] || return 0
+    if [ ${#failed_installations[@]} -eq 0 ]; then
+        echo -e "${GREEN}[CLEANUP]${NC} All installations completed successfully, removing the journal"
+        rm -f "$JOURNAL_FILE"
+    else
+        journal_finish
     fi
 }
 
@@ -1435,14 +1511,17 @@ install_app_background() {
     
     # Mark job as started
     echo "RUNNING" > "$status_file"
+    journal_record "$app_id" "started"
     
     # Run installation and capture result
     if install_flatpak "$app_id" > "$output_file" 2> "$error_file"; then
         echo "SUCCESS" > "$status_file"
         echo "$app_id" >> "$temp_dir/successful_apps"
+        journal_record "$app_id" "succeeded"
     else
         echo "FAILED" > "$status_file"
         echo "$app_id" >> "$temp_dir/failed_apps"
+        journal_record "$app_id" "failed"
     fi
 }
 
@@ -1535,6 +1614,108 @@ install_apps_parallel() {
     echo ""
 }
 
+# Function to install applications through the Python installation engine
+# (flatpack_installer.py): one inventory snapshot, event-driven parallel
+# installs and per-app retries across repositories
+install_apps_with_engine() {
+    local result_file="/tmp/flatpack_engine_$$"
+    register_cleanup_file "$result_file"
+    
+    local engine_args=(--jobs "$PARALLEL_JOBS" --retries "$MAX_RETRIES" --result-file "$result_file")
+    local repos=($(get_installation_repositories "$REPOSITORY_PRIORITY"))
+    if [ ${#repos[@]} -gt 0 ]; then
+        engine_args+=(--repositories "${repos[@]}")
+    fi
+    if [[ "$SKIP_ALREADY_INSTALLED" != "true" ]]; then
+        engine_args+=(--no-skip-installed)
+    fi
+    if [[ "$FRESH_START" == "true" ]]; then
+        engine_args+=(--fresh)
+    fi
+    
+    log_message "INFO" "Installing $# applications with the Python installation engine"
+    rm -f "$result_file"
+    python3 "$INSTALLER_ENGINE" "${engine_args[@]}" --apps "$@"
+    local engine_status=$?
+    
+    # The engine writes its results last; without them it crashed
+    if [ ! -f "$result_file" ]; then
+        log_message "ERROR" "Installation engine exited with status $engine_status without results"
+        echo -e "${RED}[ERROR]${NC} The installation engine failed (exit status $engine_status)"
+        return 1
+    fi
+    
+    # Collect results
+    local -A reported=()
+    while read -r status app; do
+        case "$status" in
+            successful) successful_installations+=("$app") ;;
+            failed) failed_installations+=("$app") ;;
+            skipped) skipped_installations+=("$app") ;;
+            *) continue ;;
+        esac
+        reported[$app]=1
+    done < "$result_file"
+    
+    # Apps the engine reported nothing for count as failed
+    local app_spec app_id
+    for app_spec in "$@"; do
+        app_id="${app_spec##*:}"
+        if [[ -z "${reported[$app_id]:-}" ]]; then
+            log_message "ERROR" "Installation engine reported no result for $app_id"
+            failed_installations+=("$app_id")
+        fi
+    done
+    
+    rm -f "$result_file"
+    echo ""
+}
+
+# Function to run the shell implementation of the install path (used when
+# python3 or the installation engine is not available)
+install_apps_shell() {
+    # First pass: determine which apps need installation
+    for app in "${applications[@]}"; do
+        # Skip apps an interrupted run already installed
+        if [[ " ${resumed_installations[*]} " == *" $app "* ]]; then
+            echo -e "${GREEN}[RESUME]${NC} ${app_names[$app]} was installed by an interrupted run"
+            skipped_installations+=("$app")
+        # Check if app is already installed (if enabled in config)
+        elif [[ "$SKIP_ALREADY_INSTALLED" == "true" ]] && check_already_installed "$app"; then
+            echo -e "${GREEN}[SKIP]${NC} ${app_names[$app]} is already installed"
+            skipped_installations+=("$app")
+        else
+            apps_to_install+=("$app")
+            journal_record "$app" "queued"
+        fi
+    done
+
+    echo ""
+
+    # Install apps (parallel if PARALLEL_JOBS > 1, sequential otherwise)
+    if [ ${#apps_to_install[@]} -gt 0 ]; then
+        if [ "$PARALLEL_JOBS" -gt 1 ]; then
+            echo -e "${CYAN}[INFO]${NC} Using parallel installation with $PARALLEL_JOBS concurrent jobs"
+            install_apps_parallel "${apps_to_install[@]}"
+        else
+            echo -e "${CYAN}[INFO]${NC} Using sequential installation (PARALLEL_JOBS=1)"
+            for app in "${apps_to_install[@]}"; do
+                journal_record "$app" "started"
+                if install_flatpak "$app"; then
+                    successful_installations+=("$app")
+                    journal_record "$app" "succeeded"
+                else
+                    failed_installations+=("$app")
+                    journal_record "$app" "failed"
+                fi
+                echo ""
+            done
+        fi
+    else
+        echo -e "${YELLOW}[INFO]${NC} No applications need installation - all are already installed or skipped"
+    fi
+}
+
 # Main execution starts here
 # Setup signal handlers first for proper cleanup
 setup_signal_handlers
@@ -1566,7 +1747,13 @@ fi
 show_title_screen
 show_loading_screen
 
-# Check for previous installation state and offer resume
+# Install each application
+failed_installations=()
+successful_installations=()
+skipped_installations=()
+apps_to_install=()
+
+# Resume an interrupted installation from the journal (non-interactive)
 load_installation_state
 
 echo -e "${CYAN}╔════════════════════════════════════════════════════════════════════╗"
@@ -1603,7 +1790,7 @@ fi
 # Check if Flathub repository is added
 echo -e "${YELLOW}[INFO]${NC} Checking Flathub repository..."
 log_message "DEBUG" "Checking Flathub repository configuration"
-if ! flatpak remotes | grep -q "flathub"; then
+if ! flatpak remotes --columns=name | grep -qxF "flathub"; then
     echo -e "${YELLOW}[INFO]${NC} Adding Flathub repository..."
     log_message "INFO" "Adding Flathub repository"
     flatpak remote-add --if-not-exists flathub https://flathub.org/repo/flathub.flatpakrepo
@@ -1629,43 +1816,16 @@ echo -e "${WHITE}Installing ${#applications[@]} applications...${NC}"
 echo -e "${CYAN}════════════════════════════════════════════════════════════════════${NC}"
 echo ""
 
-# Install each application
-failed_installations=()
-successful_installations=()
-skipped_installations=()
-apps_to_install=()
-
-# First pass: determine which apps need installation
-for app in "${applications[@]}"; do
-    # Check if app is already installed (if enabled in config)
-    if [[ "$SKIP_ALREADY_INSTALLED" == "true" ]] && check_already_installed "$app"; then
-        echo -e "${GREEN}[SKIP]${NC} ${app_names[$app]} is already installed"
-        skipped_installations+=("$app")
-    else
-        apps_to_install+=("$app")
-    fi
-done
-
-echo ""
-
-# Install apps (parallel if PARALLEL_JOBS > 1, sequential otherwise)
-if [ ${#apps_to_install[@]} -gt 0 ]; then
-    if [ "$PARALLEL_JOBS" -gt 1 ]; then
-        echo -e "${CYAN}[INFO]${NC} Using parallel installation with $PARALLEL_JOBS concurrent jobs"
-        install_apps_parallel "${apps_to_install[@]}"
-    else
-        echo -e "${CYAN}[INFO]${NC} Using sequential installation (PARALLEL_JOBS=1)"
-        for app in "${apps_to_install[@]}"; do
-            if install_flatpak "$app"; then
-                successful_installations+=("$app")
-            else
-                failed_installations+=("$app")
-            fi
-            echo ""
-        done
+# Hand the core install path to the Python engine when it is available
+if command -v python3 &> /dev/null && [[ -f "$INSTALLER_ENGINE" ]]; then
+    if ! install_apps_with_engine "${applications[@]}"; then
+        echo -e "${YELLOW}[FALLBACK]${NC} Installing with the shell implementation instead"
+        acquire_flatpak_lock
+        install_apps_shell
     fi
 else
-    echo -e "${YELLOW}[INFO]${NC} No applications need installation - all are already installed or skipped"
+    acquire_flatpak_lock
+    install_apps_shell
 fi
 
 # Installation summary
@@ -1737,10 +1897,7 @@ fi
 
 echo ""
 echo -e "${CYAN}════════════════════════════════════════════════════════════════════${NC}"
-# Save installation state for potential resume
-save_installation_state
-
-# Clean up state file if all successful
+# Discard the journal if all installations succeeded
 clean_installation_state
 
 echo -e "${WHITE}Installation completed by ${YELLOW}ShadowHarvy's${WHITE} Flatpak Auto-Installer${NC}"
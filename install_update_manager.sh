@@ -7,8 +7,11 @@ set -e
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 INSTALL_DIR="/usr/local/bin"
+LIB_DIR="/usr/local/lib/flatpack"  # flatpack.py imports its sibling modules from here
 SCRIPT_NAME="flatpack"
 PYTHON_SCRIPT="flatpack.py"
+DAEMON_NAME="flatpackd"
+DAEMON_SCRIPT="flatpack_daemon.py"
 
 # Colors for output
 RED='\033[0;31m'
@@ -74,11 +77,16 @@ install_update_manager() {
         SUDO=""
     fi
     
-    # Copy the Python script
-    $SUDO cp "$SCRIPT_DIR/$PYTHON_SCRIPT" "$INSTALL_DIR/$SCRIPT_NAME"
+    # Copy the Python script together with the modules it imports
+    $SUDO mkdir -p "$LIB_DIR"
+    $SUDO cp "$SCRIPT_DIR"/*.py "$LIB_DIR/"
     
     # Make it executable
-    $SUDO chmod +x "$INSTALL_DIR/$SCRIPT_NAME"
+    $SUDO chmod +x "$LIB_DIR/$PYTHON_SCRIPT" "$LIB_DIR/$DAEMON_SCRIPT"
+    
+    # Link it into the PATH (Python resolves the link to find the modules)
+    $SUDO ln -sf "$LIB_DIR/$PYTHON_SCRIPT" "$INSTALL_DIR/$SCRIPT_NAME"
+    $SUDO ln -sf "$LIB_DIR/$DAEMON_SCRIPT" "$INSTALL_DIR/$DAEMON_NAME"
     
     print_success "Flatpack Update Manager installed to $INSTALL_DIR/$SCRIPT_NAME"
 }
@@ -90,6 +98,7 @@ show_usage_info() {
     echo -e "  ${GREEN}flatpack --smart-update${NC}  # Update only apps that need updates"
     echo -e "  ${GREEN}flatpack --list${NC}          # List installed applications" 
     echo -e "  ${GREEN}flatpack --help${NC}          # Show all available options"
+    echo -e "  ${GREEN}flatpackd &${NC}              # Optional: serve --list/--check from warm caches"
     echo
     print_status "For detailed documentation, see the README.md file"
 }
@@ -97,7 +106,7 @@ show_usage_info() {
 uninstall_update_manager() {
     print_status "Uninstalling Flatpack Update Manager..."
     
-    if [[ -f "$INSTALL_DIR/$SCRIPT_NAME" ]]; then
+    if [[ -e "$INSTALL_DIR/$SCRIPT_NAME" ]]; then
         # Check if we need sudo
         if [[ ! -w "$INSTALL_DIR" ]]; then
             if command -v sudo &> /dev/null; then
@@ -111,6 +120,8 @@ uninstall_update_manager() {
         fi
         
         $SUDO rm "$INSTALL_DIR/$SCRIPT_NAME"
+        $SUDO rm -f "$INSTALL_DIR/$DAEMON_NAME"
+        $SUDO rm -rf "$LIB_DIR"
         print_success "Flatpack Update Manager uninstalled from $INSTALL_DIR/$SCRIPT_NAME"
     else
         print_warning "Flatpack Update Manager not found in $INSTALL_DIR"
@@ -10,8 +10,8 @@ import subprocess
 import sys
 import os
 from typing import List, Dict, Optional, Tuple
-import json
-from pathlib import Path
+
+from flatpack_startup import StartupTimer
 
 # Colors for output
 class Colors:
@@ -25,6 +25,18 @@ class Colors:
     GRAY = '\033[0;37m'
     NC = '\033[0m'  # No Color
 
+# Download-only commands: fill the package cache without installing, so the
+# lock-holding install that follows only unpacks from the local cache (they
+# run outside flatpack's native store lock, but pacman -Sw and apt-get still
+# take the package manager's own lock while downloading)
+PREFETCH_COMMANDS = {
+    'pacman': ['pacman', '-Sw', '--needed', '--noconfirm'],
+    'apt': ['apt-get', 'install', '--download-only', '-y'],
+    'dnf': ['dnf', 'install', '--downloadonly', '-y'],
+    'zypper': ['zypper', '--non-interactive', 'install', '--download-only'],
+    'apk': ['apk', 'fetch', '--recursive', '--output', '/var/cache/apk']
+}
+
 # Package definitions organized by purpose
 PACKAGE_CATEGORIES = {
     "gaming": {
@@ -171,7 +183,17 @@ class PackageManagerIntegration:
         return False
     
     def install_packages(self, packages: List[str], category: str = "packages") -> bool:
-        """Install a list of packages"""
+        """Install a list of packages
+        
+        Packages matching excluded_packages are skipped and packages matching
+        priority_packages are installed first.
+        """
+        from flatpack_patterns import get_package_filter
+        
+        packages, excluded = get_package_filter().apply(packages)
+        for package in excluded:
+            print(f"{Colors.YELLOW}[SKIP]{Colors.NC} {package} (excluded)")
+        
         if not packages:
             return True
             
@@ -227,6 +249,40 @@ class PackageManagerIntegration:
             print(f"{Colors.RED}[FAILED]{Colors.NC} Failed to install {category} packages")
             return False
     
+    def get_category_packages(self, categories: List[str]) -> List[str]:
+        """Packages of the given categories for this distribution, without duplicates"""
+        packages = []
+        for category in categories:
+            for package in PACKAGE_CATEGORIES.get(category, {}).get("packages", {}).get(self.distro, []):
+                if package not in packages:
+                    packages.append(package)
+        return packages
+    
+    def prefetch_packages(self, packages: List[str], quiet: bool = True) -> bool:
+        """Download packages into the package cache without installing them
+        
+        Already installed packages are left out. With quiet the package
+        manager's output is captured, so the download can run alongside
+        other work without interleaving its progress bars.
+        """
+        prefetch_cmd = list(PREFETCH_COMMANDS.get(self.package_manager['name'], []))
+        if not prefetch_cmd:
+            return False
+        
+        to_fetch = [package for package in packages if not self.is_package_installed(package)]
+        if not to_fetch:
+            return True
+        
+        # Add sudo if available and not root
+        if self.sudo_available and os.geteuid() != 0:
+            prefetch_cmd.insert(0, 'sudo')
+        prefetch_cmd.extend(to_fetch)
+        
+        if not quiet:
+            print(f"{Colors.YELLOW}[CMD]{Colors.NC} Running: {' '.join(prefetch_cmd)}")
+        result = self.run_command(prefetch_cmd, capture_output=quiet)
+        return result.returncode == 0
+    
     def update_package_database(self) -> bool:
         """Update package database/cache"""
         if self.package_manager['name'] == 'unknown':
@@ -289,9 +345,11 @@ class PackageManagerIntegration:
             print(f"  Packages ({len(packages)}): {', '.join(packages[:5])}{'...' if len(packages) > 5 else ''}")
             print()
 
-def main():
+def main(argv: Optional[List[str]] = None, started: Optional[float] = None):
     import argparse
     
+    timer = StartupTimer('flatpack-pkgmgr', started)
+    
     parser = argparse.ArgumentParser(
         description="Package Manager Integration for Flatpack",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -303,6 +361,8 @@ Examples:
   %(prog)s --install media system     Install media codecs and system tools
   %(prog)s --install-all              Install all package categories
   %(prog)s --update                   Update package database only
+  %(prog)s --install-all --download-only
+                                      Download all packages without installing
         """
     )
     
@@ -343,14 +403,36 @@ Examples:
         help='Skip package database update before installation'
     )
     
+    parser.add_argument(
+        '--download-only',
+        action='store_true',
+        help='With --install/--install-all: only download the packages into the package cache'
+    )
+    
+    parser.add_argument(
+        '--timing',
+        action='store_true',
+        help='Report startup and per-phase timing on stderr'
+    )
+    
     parser.add_argument(
         '--version', '-v',
         action='version',
         version='Package Manager Integration 1.0.0'
     )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    timer.mark('argument parsing')
     
+    try:
+        run(args, parser)
+    finally:
+        if args.timing:
+            timer.mark('command')
+            timer.report(argv)
+
+def run(args, parser):
+    """Run the command selected on the command line"""
     # Initialize integration
     pmi = PackageManagerIntegration()
     
@@ -363,42 +445,67 @@ Examples:
         pmi.show_categories()
         return
     
+    # Changes queue behind other flatpack processes using the package manager
+    from flatpack_lock import get_store_lock
+    
     if args.update:
-        pmi.update_package_database()
+        with get_store_lock('native'):
+            pmi.update_package_database()
         return
     
-    if args.install or args.install_all:
+    if (args.install or args.install_all) and args.download_only:
         pmi.show_system_info()
         
-        # Update package database unless explicitly skipped
+        # Only the database update changes the store; the download runs
+        # without the lock so it can overlap with other flatpack work
         if not args.no_update:
-            pmi.update_package_database()
+            with get_store_lock('native'):
+                pmi.update_package_database()
             print()
         
-        success = True
-        
-        if args.install_all:
-            # Install all categories
-            for category in PACKAGE_CATEGORIES.keys():
-                if not pmi.install_category(category):
-                    success = False
-                print()
-        elif args.install:
-            # Install specific categories
-            for category in args.install:
-                if not pmi.install_category(category):
-                    success = False
-                print()
-        
-        if success:
-            print(f"{Colors.GREEN}[COMPLETE]{Colors.NC} Package installation completed successfully!")
-            print(f"{Colors.YELLOW}[INFO]{Colors.NC} You may want to reboot or re-login for some changes to take effect.")
+        categories = list(PACKAGE_CATEGORIES.keys()) if args.install_all else args.install
+        packages = pmi.get_category_packages(categories)
+        print(f"{Colors.BLUE}[DOWNLOAD]{Colors.NC} Downloading {len(packages)} packages into the package cache...")
+        if pmi.prefetch_packages(packages, quiet=False):
+            print(f"{Colors.GREEN}[COMPLETE]{Colors.NC} Packages downloaded; install them with --install --no-update")
         else:
-            print(f"{Colors.RED}[FAILED]{Colors.NC} Some package installations failed")
+            print(f"{Colors.RED}[FAILED]{Colors.NC} Package download failed")
             sys.exit(1)
-        
         return
     
+    if args.install or args.install_all:
+        with get_store_lock('native'):
+            pmi.show_system_info()
+            
+            # Update package database unless explicitly skipped
+            if not args.no_update:
+                pmi.update_package_database()
+                print()
+            
+            success = True
+            
+            if args.install_all:
+                # Install all categories
+                for category in PACKAGE_CATEGORIES.keys():
+                    if not pmi.install_category(category):
+                        success = False
+                    print()
+            elif args.install:
+                # Install specific categories
+                for category in args.install:
+                    if not pmi.install_category(category):
+                        success = False
+                    print()
+            
+            if success:
+                print(f"{Colors.GREEN}[COMPLETE]{Colors.NC} Package installation completed successfully!")
+                print(f"{Colors.YELLOW}[INFO]{Colors.NC} You may want to reboot or re-login for some changes to take effect.")
+            else:
+                print(f"{Colors.RED}[FAILED]{Colors.NC} Some package installations failed")
+                sys.exit(1)
+            
+            return
+    
     # No arguments provided
     parser.print_help()
     print(f"\n{Colors.BLUE}For a quick start, try:{Colors.NC}")